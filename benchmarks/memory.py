@@ -0,0 +1,118 @@
+"""
+Compare the per-instance memory use of regular and compact models.
+
+Usage: python benchmarks/memory.py [count]
+
+The first number counts the bytes of the instance itself and of the
+containers that the instance owns for storage (its __dict__ and its
+_trait_values dict), but not the trait values, which are the same for both
+layouts. The second number, when tracemalloc is available (python 3), is the
+total memory allocated per instance, trait values included.
+
+The times are for creating an instance, reading a trait, reading a trait
+through ``_trait_values`` and ``__getstate__``. The traits of compact models
+read their slot directly, which takes about as long as reading the dict of a
+regular instance on python 2, and up to 1.5 times as long on python 3. But
+``_trait_values`` is a new ``SlotValues`` view of the slots on each access,
+which makes reading through it several times slower than reading the dict of
+a regular instance. Code that reads many values of compact instances should
+go through the traits, or the slots in ``_meta.slots``.
+"""
+
+import gc
+import os
+import sys
+import timeit
+
+# run from a checkout, without installing the package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+from modelo.model.model import Model
+import modelo.trait.trait_types as field
+
+class Record(Model):
+    identifier = field.Integer()
+    name = field.String()
+    score = field.Float()
+    active = field.Bool()
+    code = field.String()
+    rank = field.Integer()
+
+class CompactRecord(Model):
+    identifier = field.Integer()
+    name = field.String()
+    score = field.Float()
+    active = field.Bool()
+    code = field.String()
+    rank = field.Integer()
+
+    class Meta:
+        compact = True
+
+def storage_size(inst):
+    """
+    Bytes used by an instance and by its storage containers.
+    """
+    size = sys.getsizeof(inst)
+    # don't count an empty __dict__, python creates those on first access
+    if getattr(inst, "__dict__", None):
+        size += sys.getsizeof(inst.__dict__)
+    if type(inst._trait_values) is dict:
+        size += sys.getsizeof(inst._trait_values)
+    return size
+
+def make_data(count):
+    return [{
+        "identifier": index,
+        "name": u"name %d" % index,
+        "score": index / 3.0,
+        "active": bool(index % 2),
+        "code": u"c%d" % (index % 100),
+        "rank": index % 7,
+    } for index in range(count)]
+
+def allocated_size(model, data):
+    """
+    Bytes allocated per instance, measured with tracemalloc.
+    """
+    gc.collect()
+    tracemalloc.start()
+    instances = [model.create(item) for item in data]
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size / float(len(instances))
+
+def main(count=100000):
+    data = make_data(count)
+
+    for model in (Record, CompactRecord):
+        inst = model.create(data[0])
+        line = "%-14s storage: %4d bytes" % (model.__name__, storage_size(inst))
+
+        if tracemalloc is not None:
+            line += "  allocated: %6.1f bytes" % allocated_size(model, data)
+
+        seconds = timeit.timeit(lambda: model.create(data[0]), number=10000) / 10000
+        line += "  create: %5.2f us" % (seconds * 1e6)
+
+        seconds = timeit.timeit(lambda: inst.name, number=100000) / 100000
+        line += "  get: %5.3f us" % (seconds * 1e6)
+
+        seconds = timeit.timeit(lambda: inst._trait_values["name"], number=100000) / 100000
+        line += "  view: %5.3f us" % (seconds * 1e6)
+
+        seconds = timeit.timeit(inst.__getstate__, number=10000) / 10000
+        line += "  state: %5.2f us" % (seconds * 1e6)
+
+        print(line)
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        main(int(sys.argv[1]))
+    else:
+        main()
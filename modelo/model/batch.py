@@ -0,0 +1,357 @@
+"""
+Columnar storage for many instances of one :class:`Model` class.
+
+A :class:`ModelBatch` keeps one column per trait instead of one object per
+instance. ``Int``, ``Float`` and ``Bool`` columns are ``array.array`` objects
+and all other columns are lists:
+
+``` python
+batch = ModelBatch(User, records)
+
+total = sum(batch.column("registration_number"))
+user = batch[0]
+print user.name
+```
+"""
+
+from array import array
+
+import modelo.trait.py3compat as py3compat
+from modelo.trait.trait_type import TraitError
+import modelo.trait.trait_types as field
+from modelo.trait.trait_types import INT_TYPECODE
+
+from modelo.model.serialize import make_dumper
+from modelo.model.bulk import RecordError
+
+if py3compat.PY3:
+    IntTraits = (field.Int,)
+else:
+    IntTraits = (field.Int, field.Integer)
+
+def get_typecode(trait):
+    """
+    Return the ``array.array`` typecode for a column of values of the given
+    trait, or None if the column should be a list.
+    """
+    if isinstance(trait, field.Bool):
+        return "b"
+    elif isinstance(trait, field.Float):
+        return "d"
+    elif isinstance(trait, IntTraits):
+        return INT_TYPECODE
+    return None
+
+def make_column(typecode, values):
+    """
+    Make a column of the given typecode. Integers that don't fit in an array
+    make a list column instead.
+    """
+    if typecode is None:
+        return list(values)
+    try:
+        return array(typecode, values)
+    except OverflowError:
+        return list(values)
+
+def validate_column(trait, values, typecode):
+    """
+    Validate a whole column of values for a trait, and return the column.
+
+    An ``array.array`` that already has the right typecode is used as it is.
+    When every value has one of the exact types of the trait (see
+    :meth:`TraitType.get_exact_types`) the values aren't validated one by one.
+    """
+    if typecode is not None and isinstance(values, array) and values.typecode == typecode:
+        return values
+
+    values = list(values)
+    exact_types = trait.get_exact_types()
+    validator = trait.get_validator()
+    if validator is not None and not (exact_types and set(map(type, values)) <= set(exact_types)):
+        validated = []
+        for (index, value) in enumerate(values):
+            try:
+                validated.append(validator(None, value))
+            except TraitError as error:
+                raise TraitError("Invalid value in row %d of the %r column: %s" % (index, trait.name, error))
+        values = validated
+
+        if isinstance(trait, field.CodedEnumStorage):
+            # columns hold values, not the codes that instances store
+            values = [trait.decode(value) for value in values]
+
+    return make_column(typecode, values)
+
+class BatchRow(object):
+    """
+    A view of one row of a :class:`ModelBatch`, with the same attributes as
+    an instance of the model. Setting an attribute validates the value and
+    writes it to the batch. Subclasses are made for each model class by
+    :func:`get_row_class`.
+    """
+
+    __slots__ = ("_batch", "_index")
+
+    def __init__(self, batch, index):
+        self._batch = batch
+        self._index = index
+
+    def __repr__(self):
+        return "<%s row %d>" % (self._batch.model.__name__, self._index)
+
+    def to_dict(self):
+        """
+        Build a dictionary of the row, like :meth:`Model.to_dict`.
+        """
+        return self._batch.row_dict(self._index)
+
+    def to_model(self):
+        """
+        Build a model instance from the row.
+        """
+        return self._batch.model.create(self._batch.row_dict(self._index, dump=False))
+
+def make_property(name, trait, typecode):
+    """
+    Make the property of a :class:`BatchRow` subclass for a trait.
+    """
+    if typecode == "b":
+        def getter(row):
+            return bool(row._batch._columns[name][row._index])
+    else:
+        def getter(row):
+            return row._batch._columns[name][row._index]
+
+    def setter(row, value):
+        row._batch.set_value(row._index, name, value)
+
+    return property(getter, setter)
+
+def get_row_class(model):
+    """
+    Return the :class:`BatchRow` subclass for a model class, with a property
+    for each trait.
+    """
+    meta = model._meta
+    if meta.row_class is None:
+        classdict = {"__slots__": ()}
+        for (name, trait) in meta.trait_items:
+            classdict[name] = make_property(name, trait, get_typecode(trait))
+        meta.row_class = type("%sRow" % model.__name__, (BatchRow,), classdict)
+    return meta.row_class
+
+class ModelBatch(object):
+    """
+    A collection of instances of one :class:`Model` class, stored as one
+    column per trait.
+
+    :param model: the :class:`Model` subclass
+    :param records: dictionaries or model instances to start with
+    """
+
+    def __init__(self, model, records=None):
+        self.model = model
+        meta = model._meta
+
+        # make sure the shareable default values are known
+        if meta.shared_defaults is None:
+            model.create()
+
+        self._length = 0
+        self._columns = {}
+        self._typecodes = {}
+        self._dumpers = {}
+        for (name, trait) in meta.trait_items:
+            typecode = get_typecode(trait)
+            self._typecodes[name] = typecode
+            if typecode is None:
+                self._dumpers[name] = make_dumper(trait)
+            self._columns[name] = make_column(typecode, [])
+
+        self._row_class = get_row_class(model)
+
+        if records is not None:
+            self.extend(records)
+
+    @classmethod
+    def from_columns(cls, model, columns):
+        """
+        Build a batch from a dictionary of trait name to a sequence of values.
+        All of the columns must have the same length. Columns that aren't given
+        are filled with default values.
+        """
+        batch = cls(model)
+        lengths = set([len(values) for values in columns.values()])
+        if len(lengths) > 1:
+            raise ValueError("All of the columns must have the same length.")
+        length = lengths.pop() if lengths else 0
+
+        traits = model._meta.traits
+        for name in columns:
+            if name not in traits:
+                raise KeyError("%s has no trait named %r" % (model.__name__, name))
+
+        for name in traits:
+            if name in columns:
+                values = validate_column(traits[name], columns[name], batch._typecodes[name])
+            else:
+                values = make_column(batch._typecodes[name], batch.default_values(name, length))
+            batch._columns[name] = values
+
+        batch._length = length
+        return batch
+
+    def default_values(self, name, count):
+        """
+        Make ``count`` default values for a trait.
+        """
+        shared_defaults = self.model._meta.shared_defaults
+        if name in shared_defaults:
+            return [shared_defaults[name]] * count
+        return [getattr(self.model.create(), name) for index in range(count)]
+
+    def __len__(self):
+        return self._length
+
+    def __iter__(self):
+        row_class = self._row_class
+        for index in range(self._length):
+            yield row_class(self, index)
+
+    def __getitem__(self, key):
+        """
+        ``batch[index]`` is a row view and ``batch[name]`` is a column.
+        """
+        if isinstance(key, py3compat.string_types):
+            return self.column(key)
+
+        if key < 0:
+            key += self._length
+        if not 0 <= key < self._length:
+            raise IndexError("batch index out of range")
+        return self._row_class(self, key)
+
+    def __setitem__(self, name, values):
+        """
+        Replace a whole column, ``batch[name] = values``.
+        """
+        self.set_column(name, values)
+
+    def column(self, name):
+        """
+        Return the column of a trait. Int, Float and Bool columns are arrays.
+        """
+        return self._columns[name]
+
+    def set_column(self, name, values):
+        """
+        Validate and replace the whole column of a trait.
+        """
+        trait = self.model._meta.traits[name]
+        if len(values) != self._length:
+            raise ValueError("The %r column must have %d values, not %d." % (name, self._length, len(values)))
+        self._columns[name] = validate_column(trait, values, self._typecodes[name])
+
+    def set_value(self, index, name, value):
+        """
+        Validate and set the value of a trait in one row.
+        """
+        trait = self.model._meta.traits[name]
+        value = trait._validate(None, value)
+        if isinstance(trait, field.CodedEnumStorage):
+            value = trait.decode(value)
+
+        column = self._columns[name]
+        try:
+            column[index] = value
+        except OverflowError:
+            column = self._columns[name] = list(column)
+            column[index] = value
+
+    def append(self, record):
+        """
+        Add a row, from a dictionary or from an instance of the model.
+        """
+        self.extend([record])
+
+    def extend(self, records, errors=None):
+        """
+        Add rows, from dictionaries or instances of the model. Dictionaries are
+        validated with :meth:`Model.create_many`, and ``errors`` works the same
+        way as it does there.
+        """
+        model = self.model
+        records = list(records)
+
+        # only the dictionaries need to be validated
+        positions = [index for (index, record) in enumerate(records) if not isinstance(record, model)]
+        record_errors = []
+        created = model.create_many([records[index] for index in positions],
+                                    errors=None if errors is None else record_errors)
+
+        for error in record_errors:
+            records[positions[error.index]] = None
+            errors.append(RecordError(positions[error.index], error.record, error.errors))
+
+        created = iter(created)
+        for index in positions:
+            if records[index] is not None:
+                records[index] = next(created)
+
+        # references are stored as their keys, without loading them
+        meta = model._meta
+        names = meta.trait_names
+        rows = [[meta.peek(record, name) for name in names] for record in records if record is not None]
+
+        if not rows:
+            return
+
+        for (name, values) in zip(names, zip(*rows)):
+            column = self._columns[name]
+            try:
+                column.extend(values)
+            except OverflowError:
+                column = self._columns[name] = list(column)
+                column.extend(values)
+
+        self._length += len(rows)
+
+    def row_dict(self, index, dump=True):
+        """
+        Build a dictionary of the values of one row. With ``dump`` the values
+        are converted like :meth:`Model.to_dict` does.
+        """
+        meta = self.model._meta
+        result = {}
+        for name in meta.state_names:
+            value = self._columns[name][index]
+            if self._typecodes[name] == "b":
+                value = bool(value)
+            elif dump and self._dumpers.get(name) is not None:
+                value = self._dumpers[name](value)
+            result[name] = value
+        return result
+
+    def to_dicts(self):
+        """
+        Build a list of dictionaries, one per row, like :meth:`Model.to_dict`.
+        """
+        names = self.model._meta.state_names
+        columns = []
+        for name in names:
+            column = self._columns[name]
+            typecode = self._typecodes[name]
+            if typecode == "b":
+                column = [bool(value) for value in column]
+            elif self._dumpers.get(name) is not None:
+                column = [self._dumpers[name](value) for value in column]
+            columns.append(column)
+
+        return [dict(zip(names, row)) for row in zip(*columns)] if names else [{} for index in range(self._length)]
+
+    def to_models(self):
+        """
+        Build a model instance for each row.
+        """
+        return [self.model.create(self.row_dict(index, dump=False)) for index in range(self._length)]
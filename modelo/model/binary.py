@@ -0,0 +1,787 @@
+"""
+Encode models in a compact binary format.
+
+The layout of a record is derived from the traits of its model class, so a
+record holds only the values, without names or type tags:
+
+* the values of ``Int``, ``Float`` and ``Bool`` traits come first, packed
+  together with one struct
+* the other traits follow in declaration order: ``Complex`` values are packed
+  with a struct, ``Bytes`` and ``Unicode`` values are prefixed with their
+  length, enums are stored as the index of their value, arrays as their
+  bytes, and models, lists, sets, tuples and dicts are encoded recursively
+  with the layout of their element traits
+* values of untyped traits (``Any``, ``List()``, ...) are tagged with their
+  type
+
+Traits that allow None have one more byte that says whether the value is
+None. Every encoded value starts with the fingerprint of the layout, a hash of
+the description of the traits, so that data written for another version of a
+model fails right away with :class:`SchemaMismatchError` instead of being
+misread.
+"""
+
+import hashlib
+import struct
+import sys
+from array import array
+
+import modelo.trait.py3compat as py3compat
+import modelo.trait.trait_types as field
+
+from modelo.model.codegen import compile_function
+from modelo.model.options import ModelOptions
+from modelo.model.serialize import is_model
+
+#: first bytes of a stream written by dump_binary_many
+MAGIC = b"MDLB"
+
+#: size of a schema fingerprint, in bytes
+FINGERPRINT_SIZE = 8
+
+LENGTH = struct.Struct("<I")
+INT64 = struct.Struct("<q")
+DOUBLE = struct.Struct("<d")
+COMPLEX = struct.Struct("<dd")
+
+NONE = b"\x00"
+PRESENT = b"\x01"
+
+#: struct formats of the traits that are packed together at the start of a
+#: record; checked in order, because Bool isn't an Int but CBool could be
+FixedFormats = ((field.Bool, "?"), (field.Int, "q"), (field.Float, "d"))
+if not py3compat.PY3:
+    FixedFormats += ((field.Integer, "q"),)
+
+BIG_ENDIAN = sys.byteorder == "big"
+
+class SchemaMismatchError(ValueError):
+    """
+    Binary data was written for another layout than the one of the model that
+    reads it.
+    """
+
+class Codec(object):
+    """
+    How the values of one trait are encoded.
+
+    :param schema: description of the layout, for the fingerprint
+    :param encode: ``encode(value, write)`` writes the bytes of a value with
+        the ``write`` function
+    :param decode: ``decode(data, position)`` returns the value that starts at
+        ``position`` and the position after it
+    :param fixed: struct format of values that can be packed with the other
+        fixed size values of a record
+    :param none: whether the codec encodes None itself
+    :param text: encoding of strings, which are encoded inline by the
+        generated model functions
+    """
+
+    def __init__(self, schema, encode, decode, fixed=None, none=False, text=None):
+        self.schema = schema
+        self.encode = encode
+        self.decode = decode
+        self.fixed = fixed
+        self.none = none
+        self.text = text
+
+def read_length(data, position):
+    """
+    Read a length prefix, and check that that many bytes follow it.
+    """
+    (size,) = LENGTH.unpack_from(data, position)
+    position += LENGTH.size
+    if position + size > len(data):
+        raise ValueError("The binary data is truncated at byte %d" % position)
+    return (size, position)
+
+def make_fixed_codec(fixed):
+    """
+    Encode values with a struct format, when they aren't packed together with
+    other values.
+    """
+    packer = struct.Struct("<" + fixed)
+
+    def encode(value, write):
+        write(packer.pack(value))
+
+    def decode(data, position):
+        return (packer.unpack_from(data, position)[0], position + packer.size)
+
+    return Codec(fixed, encode, decode, fixed=fixed)
+
+def encode_bytes(value, write):
+    write(LENGTH.pack(len(value)))
+    write(value)
+
+def decode_bytes(data, position):
+    (size, position) = read_length(data, position)
+    end = position + size
+    return (data[position:end], end)
+
+def encode_unicode(value, write):
+    encode_bytes(value.encode("utf-8"), write)
+
+def decode_unicode(data, position):
+    (value, position) = decode_bytes(data, position)
+    return (value.decode("utf-8"), position)
+
+def encode_complex(value, write):
+    write(COMPLEX.pack(value.real, value.imag))
+
+def decode_complex(data, position):
+    (real, imag) = COMPLEX.unpack_from(data, position)
+    return (complex(real, imag), position + COMPLEX.size)
+
+def nullable(codec):
+    """
+    Wrap a codec for a trait that allows None.
+    """
+    (encode, decode) = (codec.encode, codec.decode)
+
+    def encode_nullable(value, write):
+        if value is None:
+            write(NONE)
+        else:
+            write(PRESENT)
+            encode(value, write)
+
+    def decode_nullable(data, position):
+        if data[position:position + 1] == NONE:
+            return (None, position + 1)
+        return decode(data, position + 1)
+
+    return Codec("?" + codec.schema, encode_nullable, decode_nullable)
+
+def allows_none(trait):
+    """
+    Whether a trait can hold None. Only the traits that are known not to are
+    encoded without the None byte.
+    """
+    if isinstance(trait, (field.Bytes, field.Unicode, field.Complex)):
+        return False
+    return getattr(trait, "_allow_none", True)
+
+# Values of untyped traits start with a tag for their type.
+
+def encode_none(value, write):
+    write(b"N")
+
+def encode_bool(value, write):
+    write(b"T" if value else b"F")
+
+def encode_int(value, write):
+    if -2 ** 63 <= value < 2 ** 63:
+        write(b"i")
+        write(INT64.pack(value))
+    else:
+        write(b"L")
+        encode_bytes(str(value).encode("ascii"), write)
+
+def encode_float(value, write):
+    write(b"d")
+    write(DOUBLE.pack(value))
+
+def encode_tagged(tag, encode):
+    def encode_value(value, write):
+        write(tag)
+        encode(value, write)
+    return encode_value
+
+def encode_sequence(tag):
+    def encode(value, write):
+        write(tag)
+        write(LENGTH.pack(len(value)))
+        for element in value:
+            encode_any(element, write)
+    return encode
+
+def encode_dict(value, write):
+    write(b"D")
+    write(LENGTH.pack(len(value)))
+    for (key, element) in py3compat.iteritems(value):
+        encode_any(key, write)
+        encode_any(element, write)
+
+def encode_typed_array(value, write):
+    write(b"a")
+    write(value.typecode.encode("ascii"))
+    encode_array(value, write)
+
+#: encoders of untyped values, by type; subclasses are encoded like the
+#: first of these types that they are an instance of
+AnyEncoders = (
+    (type(None), encode_none),
+    (bool, encode_bool),
+    (int, encode_int),
+    (float, encode_float),
+    (complex, encode_tagged(b"c", encode_complex)),
+    (bytes, encode_tagged(b"b", encode_bytes)),
+    (py3compat.unicode_type, encode_tagged(b"u", encode_unicode)),
+    (dict, encode_dict),
+    (list, encode_sequence(b"l")),
+    (tuple, encode_sequence(b"t")),
+    (set, encode_sequence(b"s")),
+    (frozenset, encode_sequence(b"f")),
+    (array, encode_typed_array),
+)
+if not py3compat.PY3:
+    AnyEncoders += ((long, encode_int),)
+AnyEncodersByType = dict(AnyEncoders)
+
+def encode_any(value, write):
+    """
+    Encode a value of an untyped trait. Models are encoded like
+    :meth:`Model.to_dict` dumps them, as dictionaries.
+    """
+    encoder = AnyEncodersByType.get(type(value))
+    if encoder is not None:
+        return encoder(value, write)
+
+    if is_model(value):
+        return encode_dict(value.__getstate__(), write)
+    for (klass, encoder) in AnyEncoders:
+        if isinstance(value, klass):
+            return encoder(value, write)
+    raise TypeError("Can't encode a value of type %s in binary" % type(value).__name__)
+
+def decode_sequence(kind):
+    def decode(data, position):
+        (size,) = LENGTH.unpack_from(data, position)
+        position += LENGTH.size
+        elements = []
+        for index in range(size):
+            (element, position) = decode_any(data, position)
+            elements.append(element)
+        return (kind(elements), position)
+    return decode
+
+def decode_dict(data, position):
+    (size,) = LENGTH.unpack_from(data, position)
+    position += LENGTH.size
+    result = {}
+    for index in range(size):
+        (key, position) = decode_any(data, position)
+        (result[key], position) = decode_any(data, position)
+    return (result, position)
+
+def decode_big_int(data, position):
+    (value, position) = decode_bytes(data, position)
+    return (int(value), position)
+
+def decode_typed_array(data, position):
+    typecode = data[position:position + 1].decode("ascii")
+    return make_array_codec(typecode).decode(data, position + 1)
+
+AnyDecoders = {
+    b"N": lambda data, position: (None, position),
+    b"T": lambda data, position: (True, position),
+    b"F": lambda data, position: (False, position),
+    b"i": lambda data, position: (INT64.unpack_from(data, position)[0], position + INT64.size),
+    b"L": decode_big_int,
+    b"d": lambda data, position: (DOUBLE.unpack_from(data, position)[0], position + DOUBLE.size),
+    b"c": decode_complex,
+    b"b": decode_bytes,
+    b"u": decode_unicode,
+    b"l": decode_sequence(list),
+    b"t": decode_sequence(tuple),
+    b"s": decode_sequence(set),
+    b"f": decode_sequence(frozenset),
+    b"D": decode_dict,
+    b"a": decode_typed_array,
+}
+
+def decode_any(data, position):
+    tag = data[position:position + 1]
+    try:
+        decoder = AnyDecoders[tag]
+    except KeyError:
+        raise ValueError("Invalid type tag %r at byte %d of the binary data" % (tag, position))
+    return decoder(data, position + 1)
+
+AnyCodec = Codec("any", encode_any, decode_any, none=True)
+
+def describe_values(values):
+    """
+    Describe the values of an enum for a schema.
+    """
+    chunks = []
+    try:
+        encode_any(list(values), chunks.append)
+    except TypeError:
+        return repr(list(values))
+    return hashlib.sha1(b"".join(chunks)).hexdigest()
+
+def make_enum_codec(trait):
+    """
+    Encode the values of an enum as their index, in as few bytes as needed.
+    The index is shifted by one, so that None is 0.
+    """
+    values = list(trait._sequence)
+    index = trait.index
+    code = struct.Struct("<B" if len(values) < 0xff else "<H" if len(values) < 0xffff else "<I")
+
+    def encode(value, write):
+        if value is None:
+            write(code.pack(0))
+            return
+        position = index(value)
+        if position < 0:
+            raise ValueError("%r isn't a value of the %r trait" % (value, trait.name))
+        write(code.pack(position + 1))
+
+    def decode(data, position):
+        (number,) = code.unpack_from(data, position)
+        return (values[number - 1] if number else None, position + code.size)
+
+    return Codec("enum(%s)" % describe_values(values), encode, decode, none=True)
+
+if hasattr(array, "tobytes"):
+    array_bytes = array.tobytes
+    array_extend = array.frombytes
+else:
+    array_bytes = array.tostring
+    array_extend = array.fromstring
+
+def encode_array(value, write):
+    if BIG_ENDIAN:
+        value = array(value.typecode, value)
+        value.byteswap()
+    encode_bytes(array_bytes(value), write)
+
+def make_array_codec(typecode):
+    """
+    Encode ``array.array`` values as their bytes, in little endian order.
+    """
+    def encode(value, write):
+        if type(value) is not array or value.typecode != typecode:
+            # frozen models keep arrays as tuples
+            value = array(typecode, value)
+        encode_array(value, write)
+
+    def decode(data, position):
+        (raw, position) = decode_bytes(data, position)
+        value = array(typecode)
+        array_extend(value, raw)
+        if BIG_ENDIAN:
+            value.byteswap()
+        return (value, position)
+
+    # the fingerprint doesn't depend on the platform's name for the type
+    itemsize = array(typecode).itemsize
+    kind = "f" if typecode in "fd" else "i"
+    return Codec("array(%s%d)" % (kind, itemsize), encode, decode)
+
+def make_ndarray_codec(trait):
+    """
+    Encode numpy arrays as their dtype, their shape and their bytes.
+    """
+    def encode(value, write):
+        numpy = field.import_numpy()
+        value = numpy.ascontiguousarray(value, dtype=trait.get_dtype())
+        if value.dtype.hasobject:
+            raise TypeError("Can't encode an array of objects in binary")
+        encode_bytes(value.dtype.str.encode("ascii"), write)
+        write(LENGTH.pack(value.ndim))
+        for size in value.shape:
+            write(INT64.pack(size))
+        encode_bytes(value.tobytes(), write)
+
+    def decode(data, position):
+        numpy = field.import_numpy()
+        (dtype, position) = decode_bytes(data, position)
+        (ndim,) = LENGTH.unpack_from(data, position)
+        position += LENGTH.size
+        shape = struct.unpack_from("<%dq" % ndim, data, position)
+        position += ndim * INT64.size
+        (raw, position) = decode_bytes(data, position)
+        # a bytearray makes the array writable
+        value = numpy.frombuffer(bytearray(raw), dtype=numpy.dtype(dtype.decode("ascii")))
+        return (value.reshape(shape), position)
+
+    return Codec("ndarray(%s,%r)" % (trait._dtype, trait._shape), encode, decode)
+
+def make_sequence_codec(element, kind, name):
+    """
+    Encode a list or a set as its length and its elements. Elements of a fixed
+    size are packed with one struct.
+    """
+    fixed = element.fixed
+    (encode_element, decode_element) = (element.encode, element.decode)
+
+    if fixed is not None:
+        size = struct.calcsize("<" + fixed)
+
+        def encode(value, write):
+            write(LENGTH.pack(len(value)))
+            write(struct.pack("<%d%s" % (len(value), fixed), *value))
+
+        def decode(data, position):
+            (count,) = LENGTH.unpack_from(data, position)
+            position += LENGTH.size
+            values = struct.unpack_from("<%d%s" % (count, fixed), data, position)
+            return (kind(values), position + count * size)
+    else:
+        def encode(value, write):
+            write(LENGTH.pack(len(value)))
+            for item in value:
+                encode_element(item, write)
+
+        def decode(data, position):
+            (count,) = LENGTH.unpack_from(data, position)
+            position += LENGTH.size
+            values = []
+            for index in range(count):
+                (item, position) = decode_element(data, position)
+                values.append(item)
+            return (kind(values), position)
+
+    return Codec("%s(%s)" % (name, element.schema), encode, decode)
+
+def make_tuple_codec(elements):
+    """
+    Encode a tuple with a trait for each element.
+    """
+    def encode(value, write):
+        if len(value) != len(elements):
+            raise ValueError("Expected a tuple of %d elements, got %d" % (len(elements), len(value)))
+        for (codec, item) in zip(elements, value):
+            codec.encode(item, write)
+
+    def decode(data, position):
+        values = []
+        for codec in elements:
+            (item, position) = codec.decode(data, position)
+            values.append(item)
+        return (tuple(values), position)
+
+    return Codec("tuple(%s)" % ",".join([codec.schema for codec in elements]), encode, decode)
+
+def make_dict_codec(keys, values):
+    """
+    Encode a dict as its size and its items.
+    """
+    (encode_key, decode_key) = (keys.encode, keys.decode)
+    (encode_value, decode_value) = (values.encode, values.decode)
+
+    def encode(value, write):
+        write(LENGTH.pack(len(value)))
+        for (key, item) in py3compat.iteritems(value):
+            encode_key(key, write)
+            encode_value(item, write)
+
+    def decode(data, position):
+        (count,) = LENGTH.unpack_from(data, position)
+        position += LENGTH.size
+        result = {}
+        for index in range(count):
+            (key, position) = decode_key(data, position)
+            (result[key], position) = decode_value(data, position)
+        return (result, position)
+
+    return Codec("dict(%s,%s)" % (keys.schema, values.schema), encode, decode)
+
+def make_instance_codec(klass, building):
+    """
+    Encode a model with the layout of its class. Instances of subclasses
+    could have other traits, so they can't be encoded.
+    """
+    codec = get_model_codec(klass, building)
+    if codec.ready:
+        (encode_model, decode) = (codec.encode, codec.decode)
+    else:
+        # a model that contains itself, whose functions aren't made yet
+        encode_model = lambda value, write: codec.encode(value, write)
+        decode = lambda data, position: codec.decode(data, position)
+
+    def encode(value, write):
+        if type(value) is not klass:
+            raise TypeError("Can't encode a %s instance with the binary layout of %s"
+                            % (type(value).__name__, klass.__name__))
+        encode_model(value, write)
+
+    return Codec(codec.schema, encode, decode)
+
+def make_codec(trait, building):
+    """
+    Make the codec of a trait, from its type.
+    """
+    codec = make_value_codec(trait, building)
+    if codec.fixed is None and not codec.none and allows_none(trait):
+        codec = nullable(codec)
+    return codec
+
+def make_value_codec(trait, building):
+    """
+    Make the codec of the values of a trait other than None.
+    """
+    for (klass, fixed) in FixedFormats:
+        if isinstance(trait, klass):
+            return make_fixed_codec(fixed)
+
+    if isinstance(trait, field.Complex):
+        return Codec("complex", encode_complex, decode_complex)
+    elif isinstance(trait, field.Bytes):
+        return Codec("bytes", encode_bytes, decode_bytes, text="bytes")
+    elif isinstance(trait, field.Unicode):
+        return Codec("unicode", encode_unicode, decode_unicode, text="utf-8")
+    elif isinstance(trait, field.Enum):
+        return make_enum_codec(trait)
+    elif isinstance(trait, field.IntArray):
+        return make_array_codec(trait.typecode)
+    elif isinstance(trait, field.NDArray):
+        return make_ndarray_codec(trait)
+    elif isinstance(trait, field.This):
+        return make_instance_codec(trait.this_class, building)
+    elif isinstance(trait, field.Ref):
+        # the key is encoded, not the model
+        if trait._key_trait is None:
+            return AnyCodec
+        codec = make_value_codec(trait._key_trait, building)
+        # keys aren't packed with the fixed values, so that make_codec
+        # makes the codec of a reference that allows None nullable
+        return Codec(codec.schema, codec.encode, codec.decode, text=codec.text)
+    elif isinstance(trait, field.Tuple):
+        if not trait._traits:
+            return AnyCodec
+        return make_tuple_codec([make_codec(element, building) for element in trait._traits])
+    elif isinstance(trait, field.List):
+        element = AnyCodec if trait._trait is None else make_codec(trait._trait, building)
+        if isinstance(trait, field.Set):
+            return make_sequence_codec(element, set, "set")
+        return make_sequence_codec(element, list, "list")
+    elif isinstance(trait, field.Dict):
+        (keys, values) = [AnyCodec if element is None else make_codec(element, building)
+                          for element in (trait._key_trait, trait._value_trait)]
+        return make_dict_codec(keys, values)
+    elif isinstance(trait, field.Instance) and not isinstance(trait, field.Container):
+        trait._resolve_classes()
+        if isinstance(getattr(trait.klass, "_meta", None), ModelOptions):
+            return make_instance_codec(trait.klass, building)
+    return AnyCodec
+
+class ModelCodec(object):
+    """
+    The binary layout of a model class, see :func:`get_model_codec`.
+    """
+
+    def __init__(self, model, building):
+        self.model = model
+        meta = model._meta
+
+        building[model] = self
+        self.schema = "ref(%s)" % model.__name__
+        self.ready = False
+
+        codecs = [(name, make_codec(meta.traits[name], building)) for name in meta.state_names]
+        del building[model]
+
+        #: traits packed together at the start of a record
+        self.fixed_names = tuple([name for (name, codec) in codecs if codec.fixed is not None])
+        self.fixed = struct.Struct("<" + "".join([codec.fixed for (name, codec) in codecs
+                                                  if codec.fixed is not None]))
+
+        #: (name, codec) pairs of the other traits, in declaration order
+        self.codecs = tuple([(name, codec) for (name, codec) in codecs if codec.fixed is None])
+
+        self.schema = "model{%s}" % ",".join(["%s:%s" % (name, codec.schema)
+                                             for (name, codec) in codecs])
+        self.fingerprint = hashlib.sha1(self.schema.encode("utf-8")).digest()[:FINGERPRINT_SIZE]
+
+        self.encode = self.make_encoder(codecs)
+        self.decode = self.make_decoder(codecs)
+        self.ready = True
+
+    def make_encoder(self, codecs):
+        """
+        Generate ``encode(inst, write)``, which writes the bytes of a model
+        instance with the ``write`` function.
+        """
+        namespace = {"struct_error": struct.error, "fixed_error": self.fixed_error,
+                     "pack_length": LENGTH.pack, "len": len}
+        lines = [
+            "def encode(inst, write):",
+            "    state = inst.__getstate__()",
+        ]
+
+        if self.fixed_names:
+            namespace["pack_fixed"] = self.fixed.pack
+            lines.extend([
+                "    try:",
+                "        write(pack_fixed(%s))" % ", ".join(["state[%r]" % name
+                                                          for name in self.fixed_names]),
+                "    except struct_error as error:",
+                "        fixed_error(inst, error)",
+            ])
+
+        for (index, (name, codec)) in enumerate(self.codecs):
+            if codec.text is None:
+                namespace["encode_%d" % index] = codec.encode
+                lines.append("    encode_%d(state[%r], write)" % (index, name))
+                continue
+
+            # strings are the most common variable size values
+            if codec.text == "bytes":
+                lines.append("    value = state[%r]" % name)
+            else:
+                lines.append("    value = state[%r].encode(%r)" % (name, codec.text))
+            lines.extend([
+                "    write(pack_length(len(value)))",
+                "    write(value)",
+            ])
+
+        return compile_function("encode", lines, namespace)
+
+    def make_decoder(self, codecs):
+        """
+        Generate ``decode(data, position)``, which returns the model instance
+        that starts at ``position`` and the position after it. The values
+        aren't validated, like with :meth:`Model.from_trusted`.
+        """
+        namespace = {"from_trusted": self.model.from_trusted, "unpack_length": LENGTH.unpack_from}
+        lines = [
+            "def decode(data, position):",
+        ]
+
+        items = []
+        if self.fixed_names:
+            namespace["unpack_fixed"] = self.fixed.unpack_from
+            names = ["fixed_%d" % index for index in range(len(self.fixed_names))]
+            lines.extend([
+                "    (%s,) = unpack_fixed(data, position)" % ", ".join(names),
+                "    position += %d" % self.fixed.size,
+            ])
+            items.extend(zip(self.fixed_names, names))
+
+        for (index, (name, codec)) in enumerate(self.codecs):
+            items.append((name, "value_%d" % index))
+            if codec.text is None:
+                namespace["decode_%d" % index] = codec.decode
+                lines.append("    (value_%d, position) = decode_%d(data, position)" % (index, index))
+                continue
+
+            # a string that is cut short moves the position past the end of
+            # the data, which the callers check
+            lines.extend([
+                "    end = position + %d + unpack_length(data, position)[0]" % LENGTH.size,
+                "    value_%d = data[position + %d:end]" % (index, LENGTH.size),
+                "    position = end",
+            ])
+            if codec.text != "bytes":
+                lines.append("    value_%d = value_%d.decode(%r)" % (index, index, codec.text))
+
+        lines.append("    return (from_trusted({%s}), position)"
+                     % ", ".join(["%r: %s" % item for item in items]))
+        return compile_function("decode", lines, namespace)
+
+    def fixed_error(self, inst, error):
+        raise ValueError("Can't encode the %s of %s instance in binary: %s"
+                         % (", ".join(self.fixed_names), type(inst).__name__, error))
+
+def get_model_codec(model, building=None):
+    """
+    Return the binary layout of a model class. It is made on first use and
+    kept in the options of the class.
+
+    ``building`` maps the classes whose layout is being made to their codecs,
+    so that models that contain themselves refer to their own codec. The
+    layouts of nested models are always made again as part of the outer
+    layout, so that the fingerprint of a class doesn't depend on which
+    layouts were made first.
+    """
+    if building is not None:
+        if model in building:
+            return building[model]
+        return ModelCodec(model, building)
+
+    meta = model._meta
+    if meta.binary_codec is None:
+        meta.binary_codec = ModelCodec(model, {})
+    return meta.binary_codec
+
+def check_fingerprint(codec, fingerprint):
+    if fingerprint != codec.fingerprint:
+        raise SchemaMismatchError("The binary data was written for another layout of %s"
+                                  % codec.model.__name__)
+
+def dumps(inst):
+    """
+    Encode a model instance, see :meth:`Model.to_bytes`.
+    """
+    codec = get_model_codec(type(inst))
+    chunks = [codec.fingerprint]
+    codec.encode(inst, chunks.append)
+    return b"".join(chunks)
+
+def loads(model, data):
+    """
+    Decode a model instance, see :meth:`Model.from_bytes`.
+    """
+    codec = get_model_codec(model)
+    if not isinstance(data, bytes):
+        data = memoryview(data).tobytes()
+    check_fingerprint(codec, data[:FINGERPRINT_SIZE])
+    try:
+        (inst, position) = codec.decode(data, FINGERPRINT_SIZE)
+    except struct.error:
+        raise ValueError("The binary data of %s is truncated" % model.__name__)
+    if position != len(data):
+        raise ValueError("Extra data after the %s instance at byte %d" % (model.__name__, position))
+    return inst
+
+def dump_binary_many(model, instances, fp):
+    """
+    Write the model instances of the iterable ``instances`` to the file-like
+    object ``fp``, one at a time. The stream starts with :data:`MAGIC` and the
+    fingerprint of the model, and each record has a length prefix.
+
+    :return: the number of instances written
+    """
+    codec = get_model_codec(model)
+    fp.write(MAGIC + codec.fingerprint)
+
+    count = 0
+    for inst in instances:
+        if type(inst) is not model:
+            raise TypeError("Can't write a %s instance in a stream of %s"
+                            % (type(inst).__name__, model.__name__))
+        chunks = []
+        codec.encode(inst, chunks.append)
+        record = b"".join(chunks)
+        fp.write(LENGTH.pack(len(record)))
+        fp.write(record)
+        count += 1
+
+    return count
+
+def iter_binary(model, fp):
+    """
+    Yield the model instances of a stream written by
+    :func:`dump_binary_many`, one at a time.
+    """
+    codec = get_model_codec(model)
+    header = fp.read(len(MAGIC) + FINGERPRINT_SIZE)
+    if header[:len(MAGIC)] != MAGIC:
+        raise ValueError("Not a binary stream of models")
+    check_fingerprint(codec, header[len(MAGIC):])
+
+    count = 0
+    while True:
+        prefix = fp.read(LENGTH.size)
+        if not prefix:
+            break
+        if len(prefix) < LENGTH.size:
+            raise ValueError("The binary stream is truncated after record %d" % count)
+        (size,) = LENGTH.unpack(prefix)
+        record = fp.read(size)
+        if len(record) < size:
+            raise ValueError("The binary stream is truncated in record %d" % count)
+
+        try:
+            (inst, position) = codec.decode(record, 0)
+        except struct.error:
+            raise ValueError("Record %d of the binary stream is truncated" % count)
+        if position != size:
+            raise ValueError("Extra data in record %d of the binary stream" % count)
+        yield inst
+        count += 1
@@ -0,0 +1,207 @@
+"""
+Create many instances of a :class:`Model` class at once.
+
+Records are processed in chunks. For each chunk the instances are made
+first, and then each trait validates its whole column of values in one tight
+loop, so that all of the per-class work (finding traits, validators and
+default values) is only done once per chunk instead of once per record.
+"""
+
+from itertools import islice
+
+from modelo.trait.interning import (
+    InternPool,
+    get_pool,
+    interning,
+)
+from modelo.trait.trait_type import TraitError
+
+from modelo.model.codegen import (
+    get_init_setattr,
+    has_default_set,
+    has_plain_setattr,
+)
+from modelo.model.frozen import freeze
+
+#: default number of records validated together by create_many
+CHUNK_SIZE = 1000
+
+class RecordError(TraitError):
+    """
+    A record given to :meth:`Model.create_many` could not be used to create
+    an instance.
+
+    :attr:`index` is the position of the record in the input, :attr:`record`
+    is the record itself and :attr:`errors` maps each invalid key to the
+    exception that it caused.
+    """
+
+    def __init__(self, index, record, errors):
+        self.index = index
+        self.record = record
+        self.errors = errors
+
+        details = []
+        for key in sorted(errors, key=str):
+            if key is None:
+                details.append(str(errors[key]))
+            else:
+                details.append("%s: %s" % (key, errors[key]))
+        details = "; ".join(details)
+        message = "Invalid record at index %d: %s" % (index, details)
+        super(RecordError, self).__init__(message)
+
+def get_columns(meta):
+    """
+    Return a tuple of ``(name, validator, exact_types, direct)`` for every
+    trait of the model class. When ``direct`` is False the value has to be
+    set with setattr because the trait or the class customizes assignment.
+    """
+    plain_setattr = has_plain_setattr(meta.model)
+
+    columns = []
+    for (name, trait) in meta.trait_items:
+        direct = plain_setattr and has_default_set(trait)
+        exact_types = frozenset(trait.get_exact_types())
+        columns.append((name, trait.get_validator(), exact_types, direct))
+    return tuple(columns)
+
+def create_chunk(cls, records, failures):
+    """
+    Create instances for a list of records, column by column. Invalid values
+    are added to ``failures``, a dict of record position to a dict of key to
+    exception. Returns the list of instances, in the same order as records.
+    """
+    meta = cls._meta
+    names = frozenset(meta.trait_names)
+    setattr = get_init_setattr(cls)
+
+    instances = []
+    rows = []
+    new = object.__new__
+    for (position, record) in enumerate(records):
+        if not isinstance(record, dict):
+            error = TraitError("a record must be a dict, not %s" % type(record).__name__)
+            failures[position] = {None: error}
+            instances.append(None)
+            continue
+
+        inst = new(cls)
+        if meta.compact or meta.shared_defaults is None or meta.eager_traits:
+            meta.init_instance(inst, record)
+        else:
+            # the same as init_instance, for the common case
+            object.__setattr__(inst, "_trait_values", meta.shared_defaults.copy())
+        instances.append(inst)
+        rows.append((position, record, inst))
+
+    if not meta.compact:
+        rows = [(position, record, inst, inst._trait_values) for (position, record, inst) in rows]
+
+    for (name, validator, exact_types, direct) in get_columns(meta):
+        if direct and not meta.compact:
+            if validator is None:
+                for (position, record, inst, values) in rows:
+                    if name in record:
+                        values[name] = record[name]
+                continue
+
+            # Validate the whole column in one go, and only go through it
+            # record by record to find out which ones are invalid.
+            try:
+                if exact_types:
+                    for (position, record, inst, values) in rows:
+                        if name in record:
+                            value = record[name]
+                            if type(value) not in exact_types:
+                                value = validator(inst, value)
+                            values[name] = value
+                else:
+                    for (position, record, inst, values) in rows:
+                        if name in record:
+                            values[name] = validator(inst, record[name])
+                continue
+            except TraitError:
+                pass
+
+        for row in rows:
+            (position, record, inst) = row[:3]
+            if name not in record:
+                continue
+            try:
+                if not direct:
+                    setattr(inst, name, record[name])
+                elif validator is None:
+                    inst._trait_values[name] = record[name]
+                else:
+                    inst._trait_values[name] = validator(inst, record[name])
+            except TraitError as error:
+                failures.setdefault(position, {})[name] = error
+
+    # keys that aren't traits are set as plain attributes
+    for row in rows:
+        (position, record, inst) = row[:3]
+        if names.issuperset(record):
+            continue
+        for key in record:
+            if key not in names:
+                try:
+                    setattr(inst, key, record[key])
+                except (TraitError, AttributeError) as error:
+                    failures.setdefault(position, {})[key] = error
+
+    if meta.frozen:
+        for row in rows:
+            (position, record, inst) = row[:3]
+            if position not in failures:
+                freeze(inst)
+
+    return instances
+
+def create_each(cls, records, failures):
+    """
+    Create instances one record at a time, for model classes that customize
+    instance construction.
+    """
+    instances = []
+    for (position, record) in enumerate(records):
+        try:
+            instances.append(cls.create(record))
+        except TraitError as error:
+            failures[position] = {None: error}
+            instances.append(None)
+    return instances
+
+def iter_create_many(cls, records, errors=None, chunk_size=CHUNK_SIZE, direct=True):
+    """
+    Create an instance of ``cls`` for each record in the iterable ``records``,
+    yielding the instances in order. See :meth:`Model.create_many`.
+
+    Interned traits share equal values across the whole load, see
+    :mod:`modelo.trait.interning`.
+    """
+    records = iter(records)
+    start = 0
+    pool = get_pool() or InternPool()
+    while True:
+        chunk = list(islice(records, chunk_size))
+        if not chunk:
+            break
+
+        failures = {}
+        with interning(pool):
+            if direct:
+                instances = create_chunk(cls, chunk, failures)
+            else:
+                instances = create_each(cls, chunk, failures)
+
+        for (position, inst) in enumerate(instances):
+            if position in failures:
+                error = RecordError(start + position, chunk[position], failures[position])
+                if errors is None:
+                    raise error
+                errors.append(error)
+            else:
+                yield inst
+
+        start += len(chunk)
@@ -0,0 +1,130 @@
+"""
+Track which traits of model instances were changed.
+
+A model class with the ``track_changes`` option records each trait that is
+assigned after the instance was created, as a bit of an integer in the order
+of the traits of the class:
+
+``` python
+class User(Model):
+    name = field.Unicode()
+    address = field.Instance(Address)
+
+    class Meta:
+        track_changes = True
+
+user.name = u"x"
+user.changed_fields()            # ["name"]
+user.to_dict(only_changed=True)  # {"name": u"x"}
+user.mark_clean()
+```
+
+A trait that holds models (directly, or in a container) also counts as
+changed when one of those models has changes. Changes made to containers in
+place, like ``user.tags.append(u"x")``, aren't seen.
+"""
+
+from modelo.model.serialize import is_model
+
+def get_mask(inst):
+    """
+    Return the bits of the traits of a model instance that were assigned since
+    it was created or last marked clean.
+    """
+    return getattr(inst, "_changed", 0)
+
+def has_changes(value, seen):
+    """
+    Whether the value is a model with changes, or a container of them.
+    ``seen`` has the ids of the models that are already being checked.
+    """
+    if is_model(value):
+        if id(value) in seen or not value._meta.track_changes:
+            return False
+        seen.add(id(value))
+        return bool(get_mask(value)) or bool(nested_changes(value, seen))
+    elif isinstance(value, dict):
+        return any(has_changes(element, seen) for element in value.values())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        return any(has_changes(element, seen) for element in value)
+    return False
+
+def nested_changes(inst, seen):
+    """
+    Return the names of the traits of a model instance that hold models with
+    changes. Traits whose default value hasn't been made yet are skipped.
+    """
+    values = inst._trait_values
+    names = []
+    for name in inst._meta.nested_names:
+        value = values.get(name)
+        if value is not None and has_changes(value, seen):
+            names.append(name)
+    return names
+
+def changed_fields(inst):
+    """
+    Return the names of the changed traits of a model instance, in the order of
+    the traits of its class.
+    """
+    meta = inst._meta
+    mask = get_mask(inst)
+    changed = set(nested_changes(inst, set([id(inst)])))
+    return [name for (index, name) in enumerate(meta.trait_names)
+            if mask & (1 << index) or name in changed]
+
+def mark_clean(inst, seen=None):
+    """
+    Forget the changes of a model instance and of the models in its traits.
+    """
+    if seen is None:
+        seen = set()
+    seen.add(id(inst))
+
+    object.__setattr__(inst, "_changed", 0)
+
+    values = inst._trait_values
+    for name in inst._meta.nested_names:
+        for model in iter_models(values.get(name)):
+            if id(model) not in seen and model._meta.track_changes:
+                mark_clean(model, seen)
+
+def iter_models(value):
+    """
+    Yield the models in a value, which can be a model or a container.
+    """
+    if is_model(value):
+        yield value
+    elif isinstance(value, dict):
+        for element in value.values():
+            for model in iter_models(element):
+                yield model
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        for element in value:
+            for model in iter_models(element):
+                yield model
+
+def dump_changes(inst, names):
+    """
+    Build the dictionary of the changes of a model instance, limited to the
+    given trait names. Assigned traits are dumped whole. Models with changes
+    in traits that weren't assigned are dumped with only their changes, and
+    containers of such models are dumped whole.
+    """
+    meta = inst._meta
+    mask = get_mask(inst)
+
+    assigned = [name for name in names if mask & (1 << meta.trait_index[name])]
+    result = inst.to_dict(include=assigned)
+
+    nested = set(nested_changes(inst, set([id(inst)])))
+    for name in names:
+        if name not in nested or name in result:
+            continue
+        value = inst._trait_values.get(name)
+        if is_model(value):
+            result[name] = value.to_dict(only_changed=True)
+        else:
+            result.update(inst.to_dict(include=[name]))
+
+    return result
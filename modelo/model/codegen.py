@@ -0,0 +1,149 @@
+"""
+Generate specialized functions for a :class:`Model` class from its trait
+table.
+
+The generated functions have the trait names and validators of the class
+baked in, which avoids the generic descriptor and validation dispatch that
+happens for every attribute assignment.
+"""
+
+from modelo.trait.trait_type import TraitType
+from modelo.model.compact import CompactStorage
+
+def get_function(method):
+    """
+    Return the plain function behind a method, on both python 2 and 3.
+    """
+    return getattr(method, "__func__", method)
+
+# the traits of compact classes store values in slots, in the same way
+DefaultGetFunctions = (get_function(TraitType.__get__), get_function(CompactStorage.__get__))
+DefaultSetFunctions = (get_function(TraitType.__set__), get_function(CompactStorage.__set__))
+
+def get_base_setattr(model):
+    """
+    Return the ``__setattr__`` function of the model class, without the hook
+    that sends change notifications (see :mod:`modelo.model.observe`).
+    """
+    method = get_function(model.__setattr__)
+    return get_function(getattr(method, "base_setattr", method))
+
+def is_frozen_setattr(method):
+    """
+    Whether the ``__setattr__`` function is the one of frozen model classes,
+    see :mod:`modelo.model.frozen`.
+    """
+    return getattr(method, "frozen", False)
+
+def has_plain_setattr(model):
+    """
+    Whether instances of the model class set attributes with the standard
+    ``object.__setattr__`` while they are being created, in which case trait
+    values can be stored directly.
+    """
+    method = get_base_setattr(model)
+    return method is get_function(object.__setattr__) or is_frozen_setattr(method)
+
+def get_init_setattr(model):
+    """
+    Return the function that sets attributes on instances of the model class
+    while they are being created. Frozen instances can only be changed then.
+    """
+    if is_frozen_setattr(get_base_setattr(model)):
+        return object.__setattr__
+    return setattr
+
+def has_default_set(trait):
+    """
+    Whether the trait uses the standard :meth:`TraitType.__set__`, in which
+    case assignment can be done directly into the trait storage.
+    """
+    return get_function(type(trait).__set__) in DefaultSetFunctions
+
+def has_default_get(trait):
+    """
+    Whether the trait uses the standard :meth:`TraitType.__get__`, which
+    makes default values on first access.
+    """
+    return get_function(type(trait).__get__) in DefaultGetFunctions
+
+def compile_function(name, lines, namespace):
+    """
+    Compile the given source lines and return the function called ``name``
+    that they define.
+    """
+    source = "\n".join(lines) + "\n"
+    code = compile(source, "<modelo %s>" % name, "exec")
+    exec(code, namespace)
+    return namespace[name]
+
+def make_assign(meta):
+    """
+    Generate ``assign(inst, data)`` which validates and stores every item of
+    ``data`` on the model instance ``inst``, equivalent to calling
+    ``setattr(inst, key, value)`` for each item.
+
+    Traits with a customized :meth:`__set__` and keys that aren't traits are
+    still assigned with setattr.
+    """
+    namespace = {
+        "setattr": get_init_setattr(meta.model),
+        "len": len,
+        "type": type,
+        "trait_names": frozenset(meta.trait_names),
+    }
+
+    plain_setattr = has_plain_setattr(meta.model)
+
+    lines = [
+        "def assign(inst, data):",
+        "    count = 0",
+    ]
+    if not meta.compact:
+        lines.append("    values = inst._trait_values")
+
+    for (index, (name, trait)) in enumerate(meta.trait_items):
+        key = repr(name)
+        lines.append("    if %s in data:" % key)
+
+        if not plain_setattr or not has_default_set(trait):
+            lines.append("        setattr(inst, %s, data[%s])" % (key, key))
+            lines.append("        count += 1")
+            continue
+
+        lines.append("        value = data[%s]" % key)
+
+        validator = trait.get_validator()
+        if validator is not None:
+            namespace["validate_%d" % index] = validator
+
+            # values of the exact types don't need to go through the validator
+            exact_types = trait.get_exact_types()
+            if len(exact_types) == 1:
+                namespace["exact_%d" % index] = exact_types[0]
+                lines.append("        if type(value) is not exact_%d:" % index)
+                lines.append("            value = validate_%d(inst, value)" % index)
+            elif exact_types:
+                namespace["exact_%d" % index] = frozenset(exact_types)
+                lines.append("        if type(value) not in exact_%d:" % index)
+                lines.append("            value = validate_%d(inst, value)" % index)
+            else:
+                lines.append("        value = validate_%d(inst, value)" % index)
+
+        if meta.compact:
+            # compact instances keep trait values in slots
+            namespace["store_%d" % index] = meta.slots[name].__set__
+            lines.append("        store_%d(inst, value)" % index)
+        else:
+            lines.append("        values[%s] = value" % key)
+
+        lines.append("        count += 1")
+
+    lines.extend([
+        "    if count != len(data):",
+        "        for key in data:",
+        "            if key not in trait_names:",
+        "                setattr(inst, key, data[key])",
+    ])
+
+    return compile_function("assign", lines, namespace)
@@ -0,0 +1,141 @@
+"""
+Compact storage for model instances.
+
+A model class with the ``compact`` option keeps each trait value in a slot of
+the instance instead of in a per-instance ``_trait_values`` dict, and its
+instances have no ``__dict__``:
+
+``` python
+class Point(Model):
+    x = field.Float()
+    y = field.Float()
+
+    class Meta:
+        compact = True
+```
+
+Compact instances can't have attributes other than their traits.
+
+The traits declared by a compact class read and write their slot directly,
+see :class:`CompactStorage`. Other code that goes through ``_trait_values``
+gets a :class:`SlotValues` view of the slots.
+"""
+
+from modelo.trait.trait_type import TraitType
+
+def slot_name(name):
+    """
+    Return the name of the slot that holds the value of the given trait on
+    compact model instances.
+    """
+    return "_trait_value_%s" % name
+
+class SlotValues(object):
+    """
+    A mapping of trait names to trait values that reads and writes the slots
+    of a compact model instance. This stands in for the ``_trait_values`` dict
+    of regular model instances. A slot that hasn't been set is a missing key.
+    """
+
+    __slots__ = ("obj", "slots", "loads")
+
+    def __init__(self, obj):
+        meta = type(obj)._meta
+        self.obj = obj
+        self.slots = meta.slots
+        self.loads = meta.slot_loads
+
+    def __getitem__(self, name):
+        try:
+            return self.loads[name](self.obj)
+        except AttributeError:
+            raise KeyError(name)
+
+    def __setitem__(self, name, value):
+        self.slots[name].__set__(self.obj, value)
+
+    def __delitem__(self, name):
+        try:
+            self.slots[name].__delete__(self.obj)
+        except AttributeError:
+            raise KeyError(name)
+
+    def __contains__(self, name):
+        try:
+            self[name]
+        except KeyError:
+            return False
+        return True
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def get(self, name, default=None):
+        try:
+            return self[name]
+        except KeyError:
+            return default
+
+    def keys(self):
+        return [name for name in self.slots if name in self]
+
+    def items(self):
+        return [(name, self[name]) for name in self.keys()]
+
+    def values(self):
+        return [self[name] for name in self.keys()]
+
+    def copy(self):
+        return dict(self.items())
+
+    def update(self, other):
+        for (name, value) in dict(other).items():
+            self[name] = value
+
+class CompactStorage(object):
+    """
+    Mixin of the traits of compact model classes, which reads and writes the
+    slot of the trait instead of making a :class:`SlotValues` view on every
+    access. Subclasses are made for each trait class by
+    :func:`compact_class`, and :class:`ModelOptions` sets the slot with
+    :meth:`set_slot`.
+    """
+
+    _slot = None
+
+    def _load(self, obj):
+        # replaced by the __get__ of the slot, see set_slot
+        raise AttributeError(self.name)
+
+    def set_slot(self, slot):
+        self._slot = slot
+        self._load = slot.__get__
+
+    def __get__(self, obj, cls=None):
+        if obj is None:
+            return self
+        try:
+            return self._load(obj)
+        except AttributeError:
+            # the default value hasn't been made yet
+            return TraitType.__get__(self, obj, cls)
+
+    def __set__(self, obj, value):
+        if self._slot is None:
+            TraitType.__set__(self, obj, value)
+        else:
+            self._slot.__set__(obj, self._validate(obj, value))
+
+# compact subclasses of the trait classes, see compact_class
+_compact_classes = {}
+
+def compact_class(cls):
+    """
+    Return the subclass of a trait class that stores values in slots.
+    """
+    if cls not in _compact_classes:
+        _compact_classes[cls] = type("Compact%s" % cls.__name__, (CompactStorage, cls), {})
+    return _compact_classes[cls]
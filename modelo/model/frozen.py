@@ -0,0 +1,146 @@
+"""
+Immutable model instances.
+
+A model class with the ``frozen`` option can't be changed after an instance
+has been created:
+
+``` python
+class Point(Model):
+    x = field.Float()
+    tags = field.List(field.Unicode)
+
+    class Meta:
+        frozen = True
+```
+
+When an instance is created, all of its default values are made, and its
+containers are converted to immutable ones: lists and arrays become tuples,
+sets become frozensets and dicts become :class:`FrozenDict`. Frozen instances
+compare equal when they have the same class and trait values. They are
+hashable, and the hash is computed only once. Copying a frozen instance returns the
+instance itself.
+
+Models nested in a frozen model are compared by their own equality, so they
+should be frozen too for the outer model to be a good dict key. ``Ref``
+traits are compared by the keys of their models, which aren't loaded.
+"""
+
+from array import array
+
+from modelo.trait.trait_type import TraitError
+
+class FrozenModelError(AttributeError, TraitError):
+    """
+    A frozen model instance was going to be changed.
+    """
+
+class FrozenDict(dict):
+    """
+    A dict that can't be changed, and that is hashable.
+    """
+
+    def _immutable(self, *args, **kwargs):
+        raise TypeError("FrozenDict objects can't be changed.")
+
+    __setitem__ = __delitem__ = _immutable
+    clear = pop = popitem = setdefault = update = _immutable
+
+    def __hash__(self):
+        return hash(frozenset(self.items()))
+
+    def __reduce__(self):
+        return (FrozenDict, (dict(self),))
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+def freeze_value(value):
+    """
+    Return an immutable counterpart of a trait value. Containers are converted
+    recursively, other values are returned as they are.
+    """
+    kind = type(value)
+    if kind is list or kind is tuple:
+        return tuple([freeze_value(element) for element in value])
+    elif kind is set or kind is frozenset:
+        return frozenset([freeze_value(element) for element in value])
+    elif kind is dict or kind is FrozenDict:
+        return FrozenDict([(key, freeze_value(element)) for (key, element) in value.items()])
+    elif kind is array:
+        return tuple(value)
+    return value
+
+def freeze(inst):
+    """
+    Make the default values of a newly created frozen instance, and convert
+    its containers to immutable ones.
+    """
+    meta = inst._meta
+    values = inst._trait_values
+    for name in meta.trait_names:
+        value = meta.peek(inst, name)
+        frozen = freeze_value(value)
+        if frozen is not value:
+            values[name] = frozen
+
+def get_key(inst):
+    """
+    Return the values of the state traits of a frozen instance, computed once.
+    """
+    try:
+        return inst._frozen_key
+    except AttributeError:
+        meta = inst._meta
+        key = tuple([meta.peek(inst, name) for name in meta.state_names])
+        object.__setattr__(inst, "_frozen_key", key)
+        return key
+
+def __setattr__(self, name, value):
+    raise FrozenModelError("Can't set %r, %s instances are frozen." % (name, type(self).__name__))
+
+def __delattr__(self, name):
+    raise FrozenModelError("Can't delete %r, %s instances are frozen." % (name, type(self).__name__))
+
+def __eq__(self, other):
+    if self is other:
+        return True
+    if type(self) is not type(other):
+        return NotImplemented
+    return hash(self) == hash(other) and get_key(self) == get_key(other)
+
+def __ne__(self, other):
+    result = __eq__(self, other)
+    if result is NotImplemented:
+        return result
+    return not result
+
+def __hash__(self):
+    try:
+        return self._frozen_hash
+    except AttributeError:
+        result = hash((type(self).__name__, get_key(self)))
+        object.__setattr__(self, "_frozen_hash", result)
+        return result
+
+def return_self(self, *args):
+    return self
+
+# instances are only ever changed while they are being created
+__setattr__.frozen = True
+
+FrozenMethods = {
+    "__setattr__": __setattr__,
+    "__delattr__": __delattr__,
+    "__eq__": __eq__,
+    "__ne__": __ne__,
+    "__hash__": __hash__,
+    "__copy__": return_self,
+    "__deepcopy__": return_self,
+    "fork": return_self,
+}
+
+#: attributes that frozen instances cache
+CacheSlots = ("_frozen_key", "_frozen_hash")
@@ -0,0 +1,309 @@
+"""
+Stream models to and from JSON files.
+
+The encoder converts models as the JSON encoder reaches them, instead of
+building the dictionary of a whole record (or of a whole export) first, and
+writes each record to the file as soon as it is encoded.
+
+The decoders read files in chunks and decode one record at a time, so the
+memory they use doesn't depend on the size of the file.
+"""
+
+import codecs
+import json
+import re
+
+from array import array
+
+import modelo.trait.py3compat as py3compat
+import modelo.trait.trait_types as field
+
+from modelo.model.serialize import is_model
+
+#: number of characters read from a file at a time by the decoders
+READ_SIZE = 64 * 1024
+
+WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+#: the characters that change the nesting of a JSON value, outside of strings
+STRUCTURE = re.compile(r'["\[\]{}]')
+
+#: the characters that end a string, or escape the next character
+STRING_END = re.compile(r'["\\]')
+
+#: the characters that can follow a number or a literal
+SCALAR_END = re.compile(r'[\s,:\[\]{}"]')
+
+#: separators of the regular and of the compact output
+SEPARATORS = (", ", ": ")
+COMPACT_SEPARATORS = (",", ":")
+
+class ModelEncoder(json.JSONEncoder):
+    """
+    JSON encoder that converts models, and the sets in them, when it gets to
+    them.
+    """
+
+    def default(self, value):
+        if is_model(value):
+            # the values are encoded (and converted) one at a time
+            return value.__getstate__()
+        elif isinstance(value, (set, frozenset)):
+            return list(value)
+        elif isinstance(value, array) or field.is_ndarray(value):
+            return value.tolist()
+        return super(ModelEncoder, self).default(value)
+
+def make_encoder(compact=False):
+    """
+    Make a :class:`ModelEncoder`. The compact output has no whitespace.
+    """
+    return ModelEncoder(separators=COMPACT_SEPARATORS if compact else SEPARATORS)
+
+def dump_json(value, fp, compact=False):
+    """
+    Write a model (or any value that can have models in it) to the file-like
+    object ``fp`` as JSON.
+    """
+    encoder = make_encoder(compact)
+    fp.write("".join(encoder.iterencode(value)))
+
+def dump_json_many(values, fp, compact=False):
+    """
+    Write the models of the iterable ``values`` to the file-like object ``fp``
+    as a JSON array. The models are written one at a time, so ``values`` can
+    be a generator that makes them as they are needed. Unless the output is
+    compact, each model is written on its own line.
+
+    :return: the number of models written
+    """
+    encoder = make_encoder(compact)
+    (start, separator, end) = ("[", ",", "]") if compact else ("[\n", ",\n", "\n]\n")
+
+    count = 0
+    fp.write(start)
+    for value in values:
+        if count:
+            fp.write(separator)
+        fp.write("".join(encoder.iterencode(value)))
+        count += 1
+    fp.write(end)
+
+    return count
+
+def read_chunks(fp, read_size=READ_SIZE):
+    """
+    Read the file-like object ``fp`` in chunks of text. Files opened in binary
+    mode are decoded as UTF-8.
+    """
+    decoder = None
+    while True:
+        chunk = fp.read(read_size)
+        if not chunk:
+            break
+        if py3compat.PY3 and isinstance(chunk, bytes):
+            if decoder is None:
+                decoder = codecs.getincrementaldecoder("utf-8")()
+            chunk = decoder.decode(chunk)
+        yield chunk
+
+class ArrayReader(object):
+    """
+    Decode the elements of a top level JSON array from a file-like object, one
+    at a time. Only the element being decoded and the rest of the current
+    chunk of the file are kept in memory.
+
+    The end of an element is found by scanning each chunk once, keeping the
+    nesting and string state from one chunk to the next, and the element is
+    only decoded once all of it was read. So an element that spans many
+    chunks takes as long to read as one that doesn't.
+    """
+
+    def __init__(self, fp, read_size=READ_SIZE):
+        self.chunks = read_chunks(fp, read_size)
+        self.decoder = json.JSONDecoder()
+        self.buffer = ""
+        self.position = 0
+        self.offset = 0
+
+        # the state of the scan of the element being read, see scan
+        self.scalar = False
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+
+    def read_more(self):
+        """
+        Replace the buffer with the next chunk of the file. Everything before
+        the position has to be decoded already, and the part of the element
+        being read after it kept by the caller. Returns False at the end of
+        the file.
+        """
+        try:
+            chunk = next(self.chunks)
+        except StopIteration:
+            return False
+
+        self.offset += len(self.buffer)
+        self.buffer = chunk
+        self.position = 0
+        return True
+
+    def next_char(self):
+        """
+        Skip whitespace, and return the next character, or an empty string at
+        the end of the file.
+        """
+        while True:
+            self.position = WHITESPACE.match(self.buffer, self.position).end()
+            if self.position < len(self.buffer):
+                return self.buffer[self.position]
+            if not self.read_more():
+                return ""
+
+    def expect(self, chars):
+        """
+        Consume one of the given characters, and return it.
+        """
+        char = self.next_char()
+        if not char or char not in chars:
+            raise ValueError("Expected %s at character %d of the JSON array, not %r"
+                             % (" or ".join([repr(c) for c in chars]),
+                                self.offset + self.position, char or "the end of the file"))
+        self.position += 1
+        return char
+
+    def start_scan(self):
+        """
+        Start the scan of the value at the position.
+        """
+        self.scalar = self.buffer[self.position] not in '[{"'
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+
+    def scan(self, index):
+        """
+        Scan the buffer from ``index`` for the end of the value that is being
+        read, going on from the state that the scan of the previous chunks
+        ended with. Returns the index after the value, or None if it goes on
+        in the next chunk.
+        """
+        buffer = self.buffer
+        if self.scalar:
+            # numbers and literals end with the first character that can't
+            # be part of them
+            match = SCALAR_END.search(buffer, index)
+            return match.start() if match is not None else None
+
+        if self.escaped:
+            if index >= len(buffer):
+                return None
+            # the character after a backslash at the end of the last chunk
+            index += 1
+            self.escaped = False
+
+        while True:
+            if self.in_string:
+                match = STRING_END.search(buffer, index)
+                if match is None:
+                    return None
+                index = match.end()
+                if match.group() == "\\":
+                    if index == len(buffer):
+                        self.escaped = True
+                        return None
+                    index += 1
+                    continue
+                self.in_string = False
+                if self.depth == 0:
+                    return index
+            else:
+                match = STRUCTURE.search(buffer, index)
+                if match is None:
+                    return None
+                index = match.end()
+                char = match.group()
+                if char == '"':
+                    self.in_string = True
+                elif char in "[{":
+                    self.depth += 1
+                else:
+                    self.depth -= 1
+                    if self.depth <= 0:
+                        return index
+
+    def decode_value(self):
+        """
+        Decode the JSON value that starts at the next character.
+        """
+        if not self.next_char():
+            raise ValueError("Expected a value at the end of the file")
+
+        start = self.position
+        self.start_scan()
+        if self.scan(start) is not None:
+            # all of the value is in the buffer
+            (value, self.position) = self.decoder.raw_decode(self.buffer, start)
+            return value
+
+        # the value goes on in the next chunks, which are kept until its end
+        pieces = [self.buffer[start:]]
+        while True:
+            if not self.read_more():
+                # the value ends with the file, or it isn't complete
+                self.position = len(self.buffer)
+                break
+            end = self.scan(0)
+            if end is not None:
+                pieces.append(self.buffer[:end])
+                self.position = end
+                break
+            pieces.append(self.buffer)
+
+        text = "".join(pieces)
+        (value, size) = self.decoder.raw_decode(text)
+        if size < len(text):
+            # extra characters in the last chunk are left for expect, those
+            # in the previous ones can't be
+            self.position -= len(text) - size
+            if self.position < 0:
+                raise ValueError("Extra data in the JSON value at character %d"
+                                 % (self.offset + self.position))
+        return value
+
+    def __iter__(self):
+        self.expect("[")
+        if self.next_char() == "]":
+            self.position += 1
+        else:
+            while True:
+                yield self.decode_value()
+                if self.expect(",]") == "]":
+                    break
+
+        if self.next_char():
+            raise ValueError("Extra data after the JSON array at character %d"
+                             % (self.offset + self.position))
+
+def iter_json(fp, read_size=READ_SIZE):
+    """
+    Yield the elements of the JSON array in the file-like object ``fp``, one
+    at a time.
+    """
+    return iter(ArrayReader(fp, read_size))
+
+def iter_ndjson(fp):
+    """
+    Yield the JSON value on each line of the file-like object ``fp``. Blank
+    lines are skipped.
+    """
+    for (number, line) in enumerate(fp):
+        if py3compat.PY3 and isinstance(line, bytes):
+            line = line.decode("utf-8")
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as error:
+            raise ValueError("Invalid JSON on line %d: %s" % (number + 1, error))
@@ -1,4 +1,5 @@
 import inspect
+import random
 
 from copy import (
     copy,
@@ -8,10 +9,107 @@ from copy import (
 import modelo.trait.py3compat as py3compat
 iteritems = py3compat.iteritems
 
+from modelo.trait.interning import interning
+from modelo.trait.references import loading
 from modelo.trait.trait_type import TraitType
-import modelo.trait.trait_types as field
 
-from modelo.model.util import getmembers
+from modelo.model.options import (
+    ModelOptions,
+    get_option,
+)
+from modelo.model.compact import (
+    CompactStorage,
+    SlotValues,
+    compact_class,
+    slot_name,
+)
+from modelo.model.codegen import (
+    get_function,
+    has_default_get,
+    has_default_set,
+)
+from modelo.model.frozen import (
+    CacheSlots,
+    FrozenMethods,
+)
+from modelo.model.bulk import (
+    CHUNK_SIZE,
+    iter_create_many,
+)
+from modelo.model.serialize import make_to_dict
+from modelo.model import jsonstream
+from modelo.model import binary
+from modelo.model import changes
+from modelo.model import parallel
+from modelo.model import patch
+from modelo.model import pickling
+from modelo.model import sharing
+from modelo.model.observe import (
+    hold_notifications,
+    install_setattr_hook,
+    observe as add_observer,
+    unobserve as remove_observer,
+)
+
+def make_compact(classdict, bases):
+    """
+    Set up the classdict of a compact model class: every trait gets a slot
+    for its value, the instances don't get a __dict__, and ``_trait_values``
+    becomes a view of the slots.
+    """
+    names = [key for (key, value) in iteritems(classdict) if isinstance(value, TraitType)]
+    for base in bases:
+        options = getattr(base, "_meta", None)
+        if options is not None:
+            names.extend(options.trait_names)
+
+    slots = classdict.get("__slots__", ())
+    if isinstance(slots, py3compat.string_types):
+        slots = (slots,)
+    slots = list(slots)
+
+    for name in names:
+        slots.append(slot_name(name))
+
+    classdict["__slots__"] = ()
+    for key in slots:
+        add_slot(classdict, bases, key)
+    classdict["_trait_values"] = property(SlotValues)
+
+    # the traits of the class read and write their slots directly, unless
+    # they customize how values are read or stored. A trait instance can also
+    # be used by other classes, so the class of a copy is changed instead.
+    for (key, value) in list(iteritems(classdict)):
+        if isinstance(value, TraitType) and has_default_get(value) and has_default_set(value):
+            trait = copy(value)
+            # the cached validator is bound to the original trait
+            trait.__dict__.pop("_validator", None)
+            if not isinstance(trait, CompactStorage):
+                trait.__class__ = compact_class(type(value))
+            classdict[key] = trait
+
+def make_frozen(classdict, bases):
+    """
+    Set up the classdict of a frozen model class, see
+    :mod:`modelo.model.frozen`. Methods that the class defines itself are
+    kept.
+    """
+    for (key, method) in iteritems(FrozenMethods):
+        classdict.setdefault(key, method)
+
+    if "__slots__" in classdict:
+        for key in CacheSlots:
+            add_slot(classdict, bases, key)
+
+def add_slot(classdict, bases, key):
+    """
+    Add a slot to the classdict, unless it or a base class already has it.
+    """
+    slots = classdict.get("__slots__", ())
+    if isinstance(slots, py3compat.string_types):
+        slots = (slots,)
+    if key not in slots and not any(hasattr(base, key) for base in bases):
+        classdict["__slots__"] = tuple(slots) + (key,)
 
 class MetaModel(type):
     """
@@ -27,7 +125,10 @@ class MetaModel(type):
         if not isinstance(classdict, dict):
             classdict = dict(classdict)
 
-        for (key, value) in iteritems(classdict):
+        # bare trait classes are instantiated in name order, so that they get
+        # the same order in every process whatever the hash seed is
+        for key in sorted(classdict):
+            value = classdict[key]
             if isinstance(value, TraitType):
                 value.name = key
             elif inspect.isclass(value):
@@ -36,6 +137,16 @@ class MetaModel(type):
                     value_inst.name = key
                     classdict[key] = value_inst
 
+        if get_option("compact", classdict, bases, False):
+            make_compact(classdict, bases)
+
+        if get_option("track_changes", classdict, bases, False) and "__slots__" in classdict:
+            # instances without a __dict__ need a slot for their changes
+            add_slot(classdict, bases, "_changed")
+
+        if get_option("frozen", classdict, bases, False):
+            make_frozen(classdict, bases)
+
         return super(MetaModel, metacls).__new__(metacls, name, bases, classdict)
 
     def __init__(cls, name, bases, classdict):
@@ -53,6 +164,49 @@ class MetaModel(type):
 
         super(MetaModel, cls).__init__(name, bases, classdict)
 
+        # build the trait table once, instead of on every instantiation
+        cls._meta = ModelOptions(cls)
+
+        if cls._meta.track_changes:
+            install_setattr_hook(cls)
+
+    def __setattr__(cls, key, value):
+        """
+        Keep the trait table up to date when a trait is added to (or replaced
+        on) a class after it has been created.
+        """
+        if "_meta" not in cls.__dict__:
+            # the class is still being set up
+            return super(MetaModel, cls).__setattr__(key, value)
+
+        if isinstance(value, TraitType):
+            if cls._meta.compact and not hasattr(cls, slot_name(key)):
+                raise TypeError("Traits can't be added to the compact model %s "
+                                "after it has been created." % cls.__name__)
+            value.name = key
+            value.this_class = cls
+
+        rebuild = isinstance(value, TraitType) or key in cls._meta.traits
+        super(MetaModel, cls).__setattr__(key, value)
+
+        if rebuild:
+            cls._rebuild_meta()
+
+    def __delattr__(cls, key):
+        rebuild = key in cls._meta.traits
+        super(MetaModel, cls).__delattr__(key)
+
+        if rebuild:
+            cls._rebuild_meta()
+
+    def _rebuild_meta(cls):
+        """
+        Rebuild the trait table of this class and of all of its subclasses.
+        """
+        cls._meta.build()
+        for subclass in cls.__subclasses__():
+            subclass._rebuild_meta()
+
 class Model(py3compat.with_metaclass(MetaModel, object)):
     """
     Model allows the definition of a type where instances have a specific
@@ -64,6 +218,9 @@ class Model(py3compat.with_metaclass(MetaModel, object)):
     # TODO: is this necessary with the py3compat definition of Model?
     __metaclass__ = MetaModel
 
+    # Subclasses get a __dict__ unless they are compact, see make_compact.
+    __slots__ = ("_trait_values",)
+
     def __new__(cls, *args, **kwargs):
         """
         Make the TraitType instances set their default values on the instance.
@@ -76,22 +233,17 @@ class Model(py3compat.with_metaclass(MetaModel, object)):
         else:
             inst = new_meth(cls, **kwargs)
 
-        inst._trait_values = {}
-        inst._trait_dyn_inits = {}
-
         # Make the TraitType instances set their default values on the
-        # instance.
-        for key in dir(cls):
-            # Some attributes raise AttributeError like zope.interface's
-            # __provides__ attributes even though they exist. This causes
-            # AttributeErrors even though they are listed in dir(cls).
-            try:
-                value = getattr(cls, key)
-            except AttributeError:
-                pass
-            else:
-                if isinstance(value, TraitType):
-                    value.instance_init(inst)
+        # instance. When the keyword arguments are going straight to
+        # Model.__init__ there is no need to make defaults for them.
+        meta = cls._meta
+        if meta.direct_create is None:
+            meta.direct_create = has_default_construction(cls)
+
+        if meta.direct_create:
+            meta.init_instance(inst, kwargs)
+        else:
+            meta.init_instance(inst)
 
         return inst
 
@@ -102,108 +254,300 @@ class Model(py3compat.with_metaclass(MetaModel, object)):
         """
         super(Model, self).__init__(**kwargs)
 
-        for (key, value) in kwargs.iteritems():
-            # use setattr so that validation is triggered
-            setattr(self, key, value)
+        # Validate and set the values. This is the same as using setattr for
+        # each item, but it is generated for each class, see make_assign.
+        self._meta.assign(self, kwargs)
 
     @classmethod
     def class_traits(cls):
         """
-        Build a list of all the defined class traits.
+        Build a list of all the defined class traits, in declaration order.
         """
-        members = [member for member in getmembers(cls) if isinstance(member[1], TraitType)]
-        traits = dict(members)
-        return traits
+        return cls._meta.traits.copy()
 
     def traits(self):
         """
         Create a list of all the traits on this class. To get the equivalent of
         "trait_names", call keys() on the returned dict.
         """
-        members = [member for member in getmembers(self.__class__) if isinstance(member[1], TraitType)]
-        traits = dict(members)
-        return traits
+        return self._meta.traits.copy()
+
+    @classmethod
+    def observe(cls, handler, names=None):
+        """
+        Call ``handler`` when traits of instances of this Model change.
+
+        The handler is called with a list of :class:`Change` objects (with
+        ``owner``, ``name``, ``old`` and ``new``) of one instance. Classes
+        without observers don't pay anything for notifications.
+
+        :param handler: callable that takes a list of changes
+        :param names: name or names of the traits to observe, or None for all
+        """
+        add_observer(cls, handler, names=names)
+
+    @classmethod
+    def unobserve(cls, handler, names=None):
+        """
+        Stop calling a handler registered with :meth:`observe`.
+        """
+        remove_observer(cls, handler, names=names)
+
+    #: context manager that batches the notifications of all of the changes in
+    #: its block into one call per handler and instance
+    hold_notifications = staticmethod(hold_notifications)
+
+    #: context manager that shares equal values of interned traits for all of
+    #: the instances created in its block, see modelo.trait.interning
+    interning = staticmethod(interning)
+
+    #: context manager that loads the references of Ref traits in batches,
+    #: see modelo.trait.references
+    loading = staticmethod(loading)
 
     def __copy__(self):
         """
         Create a new instance of this model. The trait values on this new
-        instance will be the same values as on the original instance, with the
-        exception of immutable types like integers.
+        instance will be the same values as on the original instance. They are
+        not validated again.
         """
-        trait_data = self.__getstate__()
-        inst = self.__class__.create(trait_data)
-        return inst
+        return self.__class__.from_trusted(self._get_values())
 
     def __deepcopy__(self, memo):
         """
         Create a new instance of this model. The trait values on this new
         instance will be created by deepcopying the original trait values from
-        the original instance.
+        the original instance, and are not validated again. See :meth:`fork`
+        for a copy that only copies what gets used.
         """
+        cls = self.__class__
+        meta = cls._meta
+        if meta.direct_create is None:
+            meta.direct_create = has_default_construction(cls)
+
         # insert self into memo
-        inst = self.__class__.__new__(self.__class__)
+        inst = cls.__new__(cls)
         memo[id(self)] = inst
 
         # data is later passed into the create method for this class
         data = {}
 
         # get current values
-        trait_data = self.__getstate__()
+        trait_data = self._get_values()
 
         for (trait_name, value) in trait_data.iteritems():
             data[trait_name] = deepcopy(value, memo)
 
-        # data is prepared and ready for __init__
-        self.__class__.__init__(inst, **data)
+        if meta.direct_create:
+            meta.assign_trusted(inst, data)
+        else:
+            # data is prepared and ready for __init__
+            cls.__init__(inst, **data)
 
         return inst
 
+    def fork(self):
+        """
+        Create a copy-on-write copy of this model instance. The copy shares
+        all of the trait values of this instance, so forking takes the same
+        time for any amount of data. Containers and models that are shared
+        are copied by either instance when they are first changed through
+        it, so changes made through one instance don't affect the other, see
+        :mod:`modelo.model.sharing`.
+        """
+        return sharing.fork(self)
+
     def __getstate__(self):
         """
-        Build a dictionary of traits and their current values.
+        Build a dictionary of traits and their current values. References are
+        given as the keys of their models.
         """
-        # grab all the traits
-        traits = self.traits()
+        result = self._get_values()
 
-        # filter out transient traits
-        traits = [trait for trait in traits if traits[trait].get_metadata("transient") in [None, False]]
+        traits = self._meta.traits
+        for traitname in self._meta.ref_names:
+            if traitname in result:
+                result[traitname] = traits[traitname].to_key(result[traitname])
 
-        # build a dictionary
-        # TODO: use self.__dict__ instead of self._trait_values ?
-        result = dict([(traitname, self._trait_values[traitname]) for traitname in traits])
+        return result
+
+    def _get_values(self):
+        """
+        Build a dictionary of traits and their current values, with the models
+        that were assigned to references.
+        """
+        meta = self._meta
+
+        # build a dictionary, transient traits are already filtered out of
+        # the state names
+        result = {}
+        if meta.compact:
+            # the slots are read directly, without a SlotValues view
+            for (traitname, load) in meta.state_slots:
+                try:
+                    result[traitname] = load(self)
+                except AttributeError:
+                    # the default value hasn't been made yet
+                    result[traitname] = getattr(self, traitname)
+        else:
+            values = self._trait_values
+            if type(values) is sharing.SharedValues:
+                # the values are only read, they don't need to be copied
+                values = dict(values)
+
+            for traitname in meta.state_names:
+                try:
+                    result[traitname] = values[traitname]
+                except KeyError:
+                    # the default value hasn't been made yet
+                    result[traitname] = getattr(self, traitname)
+
+        # coded traits store the index of their value
+        traits = meta.traits
+        for traitname in meta.coded_names:
+            if traitname in result:
+                result[traitname] = traits[traitname].decode(result[traitname])
 
         return result
 
-    def to_dict(self):
-        """
-        Build a dictionary representation of this Model instance.
-        """
-        state = self.__getstate__()
-
-        for (trait_name, trait_value) in state.iteritems():
-            if isinstance(trait_value, list):
-                new_list = []
-                for element in trait_value:
-                    if isinstance(element, Model):
-                        element_dict = element.to_dict()
-                        new_list.append(element_dict)
-                    else:
-                        new_list.append(element)
-                state[trait_name] = new_list
-            elif isinstance(trait_value, dict):
-                new_dict = {}
-                for (key, value) in trait_value.iteritems():
-                    if isinstance(value, Model):
-                        value_dict = value.to_dict()
-                        new_dict[key] = value_dict
-                    else:
-                        new_dict[key] = value
-                state[trait_name] = new_dict
-            elif isinstance(trait_value, Model):
-                value_dict = trait_value.to_dict()
-                state[trait_name] = value_dict
-
-        return state
+    @classmethod
+    def _get_pickle_layout(cls):
+        """
+        Return how instances of this Model are pickled, see
+        :mod:`modelo.model.pickling`.
+        """
+        meta = cls._meta
+        if meta.pickle_layout is None:
+            if meta.direct_create is None:
+                meta.direct_create = has_default_construction(cls)
+            meta.pickle_layout = pickling.PickleLayout(cls)
+        return meta.pickle_layout
+
+    def __reduce_ex__(self, protocol):
+        """
+        Pickle the trait values as a tuple in the order of the traits, instead
+        of as a dictionary.
+        """
+        return (self._meta.pickle_layout or self._get_pickle_layout()).reduce(self, protocol)
+
+    def __setstate__(self, state):
+        """
+        Restore the trait values of an unpickled instance, without validating
+        them.
+        """
+        (self._meta.pickle_layout or self._get_pickle_layout()).set_state(self, state)
+
+    def to_dict(self, include=None, exclude=None, only_changed=False):
+        """
+        Build a dictionary representation of this Model instance. Models are
+        converted to dictionaries wherever they are nested in the values.
+
+        :param include: names of the traits to dump, instead of all of them
+        :param exclude: names of the traits to leave out
+        :param only_changed: only dump the changes, see :meth:`changed_fields`
+        """
+        plans = self._meta.to_dict_plans
+        if include is None and exclude is None:
+            key = None
+        else:
+            key = (include if include is None else frozenset(include),
+                   frozenset(exclude or ()))
+
+        try:
+            (names, plan) = plans[key]
+        except KeyError:
+            # transient traits are already filtered out of the state names
+            names = self._meta.state_names
+            if key is not None:
+                (include, exclude) = key
+                names = tuple([name for name in names
+                               if (include is None or name in include) and name not in exclude])
+            plan = make_to_dict(self._meta, names)
+            plans[key] = (names, plan)
+
+        if only_changed:
+            self._check_track_changes()
+            return changes.dump_changes(self, names)
+
+        return plan(self)
+
+    def changed_fields(self):
+        """
+        List the names of the traits that were assigned since this instance
+        was created or marked clean, or that hold models with changes. The
+        model class needs the ``track_changes`` option.
+        """
+        self._check_track_changes()
+        return changes.changed_fields(self)
+
+    def mark_clean(self):
+        """
+        Forget the changes of this instance and of the models in its traits,
+        after they have been saved.
+        """
+        self._check_track_changes()
+        changes.mark_clean(self)
+
+    def _check_track_changes(self):
+        if not self._meta.track_changes:
+            raise TypeError("%s doesn't track changes, set track_changes = True "
+                            "in its Meta class." % type(self).__name__)
+
+    def dump_json(self, fp, compact=False):
+        """
+        Write this Model instance to the file-like object ``fp`` as JSON, the
+        same as ``json.dump(self.to_dict(), fp)`` but without building the
+        dictionary first. The compact output has no whitespace.
+        """
+        jsonstream.dump_json(self, fp, compact=compact)
+
+    @classmethod
+    def dump_json_many(cls, instances, fp, compact=False):
+        """
+        Write the model instances of the iterable ``instances`` to the
+        file-like object ``fp`` as a JSON array, one at a time, so that only
+        one instance at a time has to be in memory.
+
+        :return: the number of instances written
+        """
+        return jsonstream.dump_json_many(instances, fp, compact=compact)
+
+    def to_bytes(self):
+        """
+        Encode this Model instance in a compact binary format that is derived
+        from the traits of the class, see :mod:`modelo.model.binary`. The
+        bytes start with a fingerprint of the traits.
+        """
+        return binary.dumps(self)
+
+    @classmethod
+    def from_bytes(cls, data):
+        """
+        Decode an instance of this Model from bytes made by :meth:`to_bytes`.
+        Data written for other traits raises a
+        :class:`modelo.model.binary.SchemaMismatchError`. Like with
+        :meth:`from_trusted`, the values are not validated again.
+        """
+        return binary.loads(cls, data)
+
+    @classmethod
+    def dump_binary_many(cls, instances, fp):
+        """
+        Write the instances of this Model in the iterable ``instances`` to the
+        binary file-like object ``fp``, one at a time, in the format of
+        :meth:`to_bytes`.
+
+        :return: the number of instances written
+        """
+        return binary.dump_binary_many(cls, instances, fp)
+
+    @classmethod
+    def iter_binary(cls, fp):
+        """
+        Read a file written by :meth:`dump_binary_many` and yield its instances
+        one at a time.
+        """
+        return binary.iter_binary(cls, fp)
 
     @classmethod
     def create(cls, data=None):
@@ -214,77 +558,145 @@ class Model(py3compat.with_metaclass(MetaModel, object)):
         if not data:
             data = {}
 
+        meta = cls._meta
+        if meta.direct_create is None:
+            meta.direct_create = has_default_construction(cls)
+
+        if meta.direct_create:
+            # skip building and unpacking keyword arguments
+            inst = object.__new__(cls)
+            meta.init_instance(inst, data)
+            meta.assign(inst, data)
+            return inst
+
         return cls(**data)
 
+    @classmethod
+    def from_trusted(cls, data=None):
+        """
+        Build an instance of this Model from data that is known to be valid,
+        such as data that was dumped by :meth:`to_dict` and stored. The values
+        are not validated and containers are not copied, so the instance shares
+        them with ``data``.
+
+        Set the ``trusted_sample`` option of the model to a fraction between 0
+        and 1 to validate that fraction of the data anyway, like
+        :meth:`create` would. Models that customize :meth:`__new__` or
+        :meth:`__init__` are always built with :meth:`create`.
+        """
+        if not data:
+            data = {}
+
+        meta = cls._meta
+        if meta.direct_create is None:
+            meta.direct_create = has_default_construction(cls)
+
+        if not meta.direct_create or (meta.trusted_sample and random.random() < meta.trusted_sample):
+            return cls.create(data)
+
+        inst = object.__new__(cls)
+        meta.init_instance(inst, data)
+        meta.assign_trusted(inst, data)
+        return inst
+
+    @classmethod
+    def create_many(cls, records, errors=None, chunk_size=CHUNK_SIZE, workers=None):
+        """
+        Build an instance of this Model for each dictionary in ``records``.
+
+        Records are validated in chunks of ``chunk_size``, one trait at a time.
+        A record that fails validation raises a :class:`RecordError`, unless
+        ``errors`` is a list, in which case the :class:`RecordError` is
+        appended to it and the record is skipped. Each :class:`RecordError`
+        has the index of the record and the errors of each invalid key.
+
+        With ``workers``, the chunks are validated in that many processes
+        at once, see :mod:`modelo.model.parallel`. The model class and the
+        records have to be picklable then.
+
+        :param records: iterable of dictionaries, like the data of :meth:`create`
+        :param errors: list to collect errors in, or None to raise them
+        :type errors: list
+        :param workers: number of worker processes, or None to validate the
+            records in this process
+        :type workers: int
+        :return: list of instances, in the same order as the records
+        """
+        return list(cls.iter_create_many(records, errors=errors, chunk_size=chunk_size,
+                                         workers=workers))
+
+    @classmethod
+    def iter_create_many(cls, records, errors=None, chunk_size=CHUNK_SIZE, workers=None):
+        """
+        Like :meth:`create_many`, but yield the instances as each chunk of
+        records is done instead of returning a list.
+        """
+        meta = cls._meta
+        if meta.direct_create is None:
+            meta.direct_create = has_default_construction(cls)
+
+        if workers is not None and workers > 1:
+            return parallel.iter_create_parallel(cls, records, workers, errors=errors,
+                                                 chunk_size=chunk_size, direct=meta.direct_create)
+        return iter_create_many(cls, records, errors=errors, chunk_size=chunk_size,
+                                direct=meta.direct_create)
+
+    @classmethod
+    def iter_json(cls, fp, errors=None):
+        """
+        Read a JSON array of records from the file-like object ``fp`` and yield
+        an instance of this Model for each of them. The file is decoded
+        incrementally, so its size doesn't matter. The records are validated
+        like :meth:`create_many` does, and ``errors`` works the same way.
+        """
+        return cls.iter_create_many(jsonstream.iter_json(fp), errors=errors)
+
+    @classmethod
+    def iter_ndjson(cls, fp, errors=None):
+        """
+        Like :meth:`iter_json`, for files with one JSON record per line.
+        """
+        return cls.iter_create_many(jsonstream.iter_ndjson(fp), errors=errors)
+
     def update(self, data):
         """
-        Update this model instance using the given data.
+        Update this model instance using the given data. Only the traits in
+        ``data`` are looked at.
+
+        A dictionary given for a trait that holds a model updates that model,
+        and a dictionary given for a ``Dict`` trait is merged into the current
+        dictionary, recursively. Dictionaries in a list of models become new
+        model instances.
 
         :param data: update the model with this data
         :type data: dict
         """
-        # get a dictionary of traits based on the class definition
-        traits = self.traits()
-
-        # process update data based on model traits
-        for (trait_name, trait) in iteritems(traits):
-            # skip traits that aren't going to be updated
-            if trait_name not in data.keys():
-                continue
-
-            # based on input to this function
-            given_value   = data[trait_name]
-
-            # based on the existing value on the model
-            current_value = getattr(self, trait_name)
-
-            # Use this to defer assignment on to self. By default, assume it
-            # should be the new value.
-            deferred_value = given_value
-
-            # The only special cases worth handling are field.Instance,
-            # field.List and field.Dict, the other cases can probably be
-            # handled by just directly setting the value.
-            if isinstance(trait, field.Instance):
-                # Use recursion to call the current model instance or value's
-                # update method (Model.update) with this dictionary data.
-                if isinstance(given_value, dict):
-                    current_value.update(given_value)
-                    deferred_value = current_value
-            else:
-                if isinstance(trait, field.List):
-                    # make a new list
-                    deferred_value = []
-
-                    # Grab the inner trait type for this list. Could be None.
-                    # This is the specific type that should be used for each of
-                    # the elements of the list. In the case of None, it may be
-                    # any value, although model instances can't be
-                    # reconstructed in that scenario.
-                    inner_trait_type = trait._trait
-
-                    # Determine if inner_trait_type is a field.Instance, and
-                    # then whether or not it is a Model.
-                    is_model = False
-                    if isinstance(inner_trait_type, TraitType) and hasattr(inner_trait_type, "klass"):
-                        if issubclass(inner_trait_type.klass, Model):
-                            is_model = True
-
-                    # Append each value to the new list. Create new model
-                    # instances if necessary.
-                    for some_given_value in given_value:
-                        # handle model instances that need to be created
-                        if is_model:
-                            # Can't use Model.update here because the list is
-                            # probably unordered, and updating the wrong
-                            # elements is very wrong. Another implementation
-                            # could be created for ordered collections, though.
-                            some_given_value = inner_trait_type.klass.create(**some_given_value)
-                        deferred_value.append(some_given_value)
-                elif isinstance(trait, field.Dict):
-                    # TODO
-                    pass
-
-            # Set the deferred_value on to the current model at the appropriate
-            # trait key (trait_name).
-            setattr(self, trait_name, deferred_value)
+        patch.apply(self, data)
+
+    def apply_patch(self, data):
+        """
+        Apply a patch made by :meth:`diff`. This is the same as :meth:`update`,
+        except that keys of ``Dict`` traits that are None in the patch are
+        removed.
+        """
+        patch.apply(self, data, remove_none=True)
+
+    def diff(self, other):
+        """
+        Build the smallest patch that turns this Model instance into ``other``,
+        which must be an instance of the same class. Traits holding models and
+        dictionaries get nested patches, and other changed values are dumped
+        like :meth:`to_dict` dumps them.
+        """
+        return patch.diff(self, other)
+
+def has_default_construction(cls):
+    """
+    Whether instances of the given :class:`Model` class are constructed with
+    the plain :meth:`Model.__new__` and :meth:`Model.__init__`, in which case
+    :meth:`Model.create` can take some shortcuts.
+    """
+    return (get_function(cls.__new__) is get_function(Model.__new__) and
+            get_function(cls.__init__) is get_function(Model.__init__) and
+            super(Model, cls).__new__ is object.__new__ and
+            type(cls).__call__ is type.__call__)
@@ -0,0 +1,226 @@
+"""
+Trait change notifications.
+
+Handlers are registered on a model class with :meth:`Model.observe`. Only
+then does the class get an ``__setattr__`` hook that looks at the old and new
+values and calls the handlers, so classes that aren't observed (and don't
+track changes) pay nothing for notifications. Values given to :meth:`Model.create` don't cause
+notifications; assignments after that (including :meth:`Model.update`) do.
+
+A handler is called with a list of :class:`Change` objects, all for the same
+instance. Outside of :func:`hold_notifications` the list has one change. The
+changes of ``Ref`` traits have the keys of the models, which aren't loaded.
+"""
+
+import threading
+from collections import (
+    OrderedDict,
+    namedtuple,
+)
+from contextlib import contextmanager
+
+import modelo.trait.py3compat as py3compat
+
+from modelo.model.codegen import get_function
+
+#: a change of the trait ``name`` of the model instance ``owner``
+Change = namedtuple("Change", ["owner", "name", "old", "new"])
+
+# changes that are being held back, per thread
+held = threading.local()
+
+def is_changed(old, new):
+    """
+    Whether assigning ``new`` over ``old`` is a change.
+    """
+    if old is new:
+        return False
+    try:
+        return bool(old != new)
+    except Exception:
+        # the values can't be compared
+        return True
+
+def make_setattr_hook(base_setattr, replaced):
+    """
+    Make the ``__setattr__`` of a model class that is observed or that tracks
+    changes (see :mod:`modelo.model.changes`). It calls ``base_setattr``, and
+    then records the change and notifies the handlers of the class.
+    ``replaced`` is the ``__setattr__`` that was defined on the class itself,
+    if any.
+    """
+    def __setattr__(self, name, value):
+        meta = type(self)._meta
+        index = meta.trait_index.get(name)
+        if index is None:
+            return base_setattr(self, name, value)
+
+        old = meta.peek(self, name) if meta.observers else None
+        base_setattr(self, name, value)
+        record_change(self, meta, index, old)
+
+    __setattr__.base_setattr = base_setattr
+    __setattr__.replaced = replaced
+    return __setattr__
+
+def record_change(inst, meta, index, old):
+    """
+    Record that the trait at ``index`` of a model instance was assigned, and
+    notify the observers if its value changed from ``old``, which is only
+    looked at when the class is observed.
+    """
+    if meta.track_changes:
+        object.__setattr__(inst, "_changed", getattr(inst, "_changed", 0) | (1 << index))
+
+    if meta.observers:
+        name = meta.trait_names[index]
+        new = meta.peek(inst, name)
+        if is_changed(old, new):
+            notify(Change(inst, name, old, new))
+
+def is_setattr_hook(method):
+    """
+    Whether the ``__setattr__`` method was made by :func:`make_setattr_hook`.
+    """
+    return hasattr(get_function(method), "base_setattr")
+
+def iter_subclasses(model):
+    """
+    Yield the model class and all of its subclasses.
+    """
+    yield model
+    for subclass in model.__subclasses__():
+        for klass in iter_subclasses(subclass):
+            yield klass
+
+def install_setattr_hook(model):
+    """
+    Make sure that instances of the model class set attributes through the
+    ``__setattr__`` hook, which may already be inherited.
+    """
+    if is_setattr_hook(model.__setattr__):
+        return
+    replaced = model.__dict__.get("__setattr__")
+    type.__setattr__(model, "__setattr__", make_setattr_hook(model.__setattr__, replaced))
+
+def remove_setattr_hook(model):
+    """
+    Remove the ``__setattr__`` hook of the model class when neither the class
+    nor its subclasses need it anymore.
+    """
+    method = model.__dict__.get("__setattr__")
+    if method is None or not is_setattr_hook(method):
+        return
+
+    for klass in iter_subclasses(model):
+        if klass._meta.observers or klass._meta.track_changes:
+            return
+
+    replaced = get_function(method).replaced
+    if replaced is None:
+        type.__delattr__(model, "__setattr__")
+    else:
+        type.__setattr__(model, "__setattr__", replaced)
+
+def collect_observers(model):
+    """
+    Build the tuple of ``(handler, names)`` registered on a model class and
+    on its base classes.
+    """
+    observers = []
+    for klass in reversed(model.__mro__):
+        observers.extend(klass.__dict__.get("_observers", ()))
+    return tuple(observers)
+
+def observe(model, handler, names=None):
+    """
+    Call ``handler`` with the changes of the traits ``names`` (all of them when
+    None) of every instance of the model class and its subclasses.
+    """
+    if names is not None:
+        names = frozenset([names] if isinstance(names, py3compat.string_types) else names)
+
+    if "_observers" not in model.__dict__:
+        type.__setattr__(model, "_observers", [])
+    model._observers.append((handler, names))
+
+    install_setattr_hook(model)
+    model._rebuild_meta()
+
+def unobserve(model, handler, names=None):
+    """
+    Stop calling ``handler`` for the model class. With ``names``, only the
+    registration for those names is removed.
+    """
+    if names is not None:
+        names = frozenset([names] if isinstance(names, py3compat.string_types) else names)
+
+    observers = model.__dict__.get("_observers", [])
+    remaining = [(each, each_names) for (each, each_names) in observers
+                 if not (each == handler and (names is None or names == each_names))]
+    if len(remaining) == len(observers):
+        raise ValueError("%r isn't observing %s" % (handler, model.__name__))
+    observers[:] = remaining
+
+    model._rebuild_meta()
+
+    # go back to the original __setattr__ when nothing is observed anymore
+    remove_setattr_hook(model)
+
+def deliver(owner, changes):
+    """
+    Call the handlers of the class of ``owner`` with the changes that they
+    observe.
+    """
+    for (handler, names) in type(owner)._meta.observers:
+        if names is None:
+            selected = changes
+        else:
+            selected = [change for change in changes if change.name in names]
+        if selected:
+            handler(selected)
+
+def notify(change):
+    """
+    Deliver a change, or keep it for later inside of :func:`hold_notifications`.
+    """
+    pending = getattr(held, "pending", None)
+    if pending is None:
+        deliver(change.owner, [change])
+        return
+
+    key = id(change.owner)
+    if key not in pending:
+        pending[key] = (change.owner, OrderedDict())
+    changes = pending[key][1]
+
+    # several changes of a trait become one
+    if change.name in changes:
+        change = change._replace(old=changes[change.name].old)
+    changes[change.name] = change
+
+@contextmanager
+def hold_notifications():
+    """
+    Hold back notifications until the end of the block, and then call each
+    handler once per changed instance, with all of the changes that it
+    observes. Several changes of the same trait are coalesced into one, and
+    traits that were changed back to their old value are left out.
+    """
+    if getattr(held, "pending", None) is not None:
+        # already holding
+        yield
+        return
+
+    held.pending = OrderedDict()
+    try:
+        yield
+    finally:
+        # the assignments were made even if the block failed
+        pending = held.pending
+        held.pending = None
+
+        for (owner, changes) in pending.values():
+            changes = [change for change in changes.values() if is_changed(change.old, change.new)]
+            if changes:
+                deliver(owner, changes)
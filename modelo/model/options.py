@@ -0,0 +1,337 @@
+from collections import OrderedDict
+
+import modelo.trait.py3compat as py3compat
+from modelo.trait.trait_type import TraitType
+import modelo.trait.trait_types as field
+
+from modelo.model.codegen import (
+    get_function,
+    get_init_setattr,
+    has_default_get,
+    has_default_set,
+    has_plain_setattr,
+    make_assign,
+)
+from modelo.model.frozen import freeze
+from modelo.model.compact import (
+    CompactStorage,
+    slot_name,
+)
+from modelo.model.observe import collect_observers
+
+if py3compat.PY3:
+    ImmutableTypes = (type(None), bool, int, float, complex, bytes, str, type, field.EnumCode)
+else:
+    ImmutableTypes = (type(None), bool, int, long, float, complex, str, unicode, type, field.EnumCode)
+
+# The default value of a trait only depends on the trait itself when none of
+# these methods have been customized.
+StaticDefaultMethods = {
+    "get_default_value": (TraitType.get_default_value, field.Type.get_default_value,
+                          field.Instance.get_default_value),
+    "instance_init": (TraitType.instance_init, field.Type.instance_init,
+                      field.Instance.instance_init),
+    "set_default_value": (TraitType.set_default_value,),
+}
+StaticDefaultMethods = dict([(name, set([get_function(method) for method in methods]))
+                             for (name, methods) in StaticDefaultMethods.items()])
+
+def is_immutable(value):
+    """
+    Whether the value is of a builtin immutable type, so that a single object
+    can safely be shared between any number of model instances.
+    """
+    kind = type(value)
+    if kind is tuple or kind is frozenset:
+        return all(is_immutable(element) for element in value)
+    return kind in ImmutableTypes
+
+def has_static_default(trait):
+    """
+    Whether the default value of the trait is computed the standard way.
+    """
+    kind = type(trait)
+    for (name, methods) in StaticDefaultMethods.items():
+        if get_function(getattr(kind, name)) not in methods:
+            return False
+    return True
+
+def get_option(name, classdict, bases, default=None):
+    """
+    Look up a model option. Options are set as attributes of an inner
+    ``Meta`` class in the class body, and are otherwise inherited from the
+    first base class that is a model.
+    """
+    meta = classdict.get("Meta")
+    if meta is not None and hasattr(meta, name):
+        return getattr(meta, name)
+
+    for base in bases:
+        options = getattr(base, "_meta", None)
+        if isinstance(options, ModelOptions):
+            return getattr(options, name)
+
+    return default
+
+def collect_traits(cls):
+    """
+    Build an ordered mapping of all the traits defined on a class.
+
+    Traits are ordered by declaration, with the traits of base classes coming
+    before the traits of subclasses. A trait that is redefined in a subclass
+    keeps the position of the original definition. An attribute that shadows
+    an inherited trait with a non-trait value removes that trait.
+    """
+    names = []
+    seen = set()
+    for klass in reversed(cls.__mro__):
+        declared = [(value._order, key) for (key, value) in list(klass.__dict__.items())
+                    if isinstance(value, TraitType)]
+        for (order, key) in sorted(declared):
+            if key not in seen:
+                seen.add(key)
+                names.append(key)
+
+    traits = OrderedDict()
+    for key in names:
+        # resolve the name the same way that attribute lookup would
+        for klass in cls.__mro__:
+            if key in klass.__dict__:
+                value = klass.__dict__[key]
+                break
+        if isinstance(value, TraitType):
+            traits[key] = value
+
+    return traits
+
+class ModelOptions(object):
+    """
+    Per-class trait registry, built once by :class:`MetaModel` and stored on
+    the class as :attr:`_meta`.
+
+    Everything that used to be discovered by walking ``dir(cls)`` on every
+    instantiation or serialization is resolved here instead, so that the cost
+    of those operations depends on the number of traits rather than on the
+    number of attributes on the class.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.build()
+
+    def build(self):
+        """
+        (Re)build the trait table from the class hierarchy.
+        """
+        model = self.model
+
+        #: whether instances keep their trait values in slots, see
+        #: :mod:`modelo.model.compact`
+        self.compact = get_option("compact", model.__dict__, model.__bases__, False)
+
+        #: whether instances are immutable, see :mod:`modelo.model.frozen`
+        self.frozen = get_option("frozen", model.__dict__, model.__bases__, False)
+
+        #: whether instances record which traits were assigned, see
+        #: :mod:`modelo.model.changes`
+        self.track_changes = get_option("track_changes", model.__dict__, model.__bases__, False)
+
+        #: fraction of the records given to :meth:`Model.from_trusted` that
+        #: are validated anyway, to find bad data while debugging
+        self.trusted_sample = get_option("trusted_sample", model.__dict__, model.__bases__, 0.0)
+
+        #: ordered mapping of trait name to trait instance
+        self.traits = collect_traits(model)
+
+        #: trait names in declaration order
+        self.trait_names = tuple(self.traits)
+
+        #: position of each trait in declaration order
+        self.trait_index = dict([(name, index) for (index, name) in enumerate(self.trait_names)])
+
+        #: (name, trait) pairs in declaration order
+        self.trait_items = tuple(self.traits.items())
+
+        #: names of the traits that are part of the instance state, which
+        #: excludes traits with "transient" metadata
+        self.state_names = tuple([name for (name, trait) in self.trait_items
+                                  if trait.get_metadata("transient") in [None, False]])
+
+        #: dynamic initializers (``_<name>_default`` methods) by trait name
+        self.dynamic_defaults = {}
+        for (name, trait) in self.trait_items:
+            initializer = trait.find_dynamic_default(model)
+            if initializer is not None:
+                self.dynamic_defaults[name] = initializer
+
+        # dynamic initializers are the same for all instances of the class
+        type.__setattr__(model, "_trait_dyn_inits", self.dynamic_defaults)
+
+        #: slot descriptors by trait name, for compact models
+        self.slots = {}
+        if self.compact:
+            for name in self.trait_names:
+                slot = getattr(model, slot_name(name), None)
+                if slot is None:
+                    raise TypeError("The %r trait can't be stored on the compact "
+                                    "model %s, traits of compact models must be "
+                                    "declared in the class body." % (name, model.__name__))
+                self.slots[name] = slot
+                if isinstance(self.traits[name], CompactStorage):
+                    self.traits[name].set_slot(slot)
+
+        #: functions that read the slot of each trait, by trait name
+        self.slot_loads = dict([(name, slot.__get__) for (name, slot) in self.slots.items()])
+
+        #: (name, load) pairs of the state names, for compact models
+        self.state_slots = tuple([(name, self.slot_loads[name]) for name in self.state_names
+                                  if name in self.slot_loads])
+
+        # These are filled in when the first instance is created, see
+        # init_instance and share_defaults.
+        self.shared_defaults = None
+        self.eager_traits = ()
+
+        # generated lazily, on first use
+        self.assign = self._compile_assign
+        self.direct_create = None
+
+        #: names of the traits that store codes instead of values, see
+        #: :class:`modelo.trait.trait_types.Enum`
+        self.coded_names = tuple([name for (name, trait) in self.trait_items
+                                  if isinstance(trait, field.CodedEnumStorage)])
+
+        #: names of the traits that refer to other models, which are dumped
+        #: as their keys, see :class:`modelo.trait.trait_types.Ref`
+        self.ref_names = tuple([name for (name, trait) in self.trait_items
+                                if isinstance(trait, field.Ref)])
+
+        #: names of the traits that trusted values can be stored into
+        #: directly, bypassing __set__
+        plain_setattr = has_plain_setattr(model)
+        self.raw_names = frozenset([name for (name, trait) in self.trait_items
+                                    if plain_setattr and has_default_set(trait)
+                                    and name not in self.coded_names])
+
+        #: (handler, names) pairs of the observers of the class, see
+        #: :mod:`modelo.model.observe`
+        self.observers = collect_observers(model)
+
+        #: names of the traits that can hold models, whose changes count as
+        #: changes of the trait
+        self.nested_names = tuple([name for (name, trait) in self.trait_items
+                                   if isinstance(trait, (field.Instance, field.This, field.Container))])
+
+        # row view class of ModelBatch, see batch.get_row_class
+        self.row_class = None
+
+        #: generated to_dict functions, by the names of the traits they dump,
+        #: see Model.to_dict
+        self.to_dict_plans = {}
+
+        #: binary layout of the class, see modelo.model.binary
+        self.binary_codec = None
+
+        #: how instances are pickled, see modelo.model.pickling
+        self.pickle_layout = None
+
+    def peek(self, inst, name):
+        """
+        Return the value of a trait of an instance without loading a model:
+        references give the key of their model.
+        """
+        if name in self.ref_names:
+            return self.traits[name].get_key(inst)
+        if not self.compact:
+            values = inst._trait_values
+            if name in getattr(values, "shared", ()):
+                # the value is shared with a fork, and it's only read
+                return dict.__getitem__(values, name)
+        return getattr(inst, name)
+
+    def init_instance(self, inst, data=None):
+        """
+        Set the default values of the traits on a newly created instance.
+
+        Default values that are immutable are validated once and then shared by
+        all instances. Other default values (containers, :class:`Instance`
+        values) are made lazily by :meth:`TraitType.__get__` when the trait is
+        first read, so traits that get assigned a value never make a default.
+        Only traits that customize how their default is made are initialized
+        here, unless they are about to be assigned from ``data``.
+        """
+        if self.shared_defaults is None:
+            if not self.compact:
+                object.__setattr__(inst, "_trait_values", {})
+            for (name, trait) in self.trait_items:
+                trait.instance_init(inst)
+            self.share_defaults(inst)
+            return
+
+        if self.compact:
+            for (store, value) in self.shared_default_slots:
+                store(inst, value)
+        else:
+            object.__setattr__(inst, "_trait_values", self.shared_defaults.copy())
+
+        for (name, trait, skippable) in self.eager_traits:
+            if not (skippable and data and name in data):
+                trait.instance_init(inst)
+
+    def share_defaults(self, inst):
+        """
+        Sort the traits into the ones with a default value that can be shared
+        between instances, the ones with a per-instance default that can be
+        made lazily and the ones that need to be initialized eagerly, using the
+        default values of the first instance of the class.
+        """
+        values = inst._trait_values
+
+        shared_defaults = {}
+        eager_traits = []
+        for (name, trait) in self.trait_items:
+            if not has_static_default(trait) or not has_default_get(trait):
+                eager_traits.append((name, trait, has_default_set(trait)))
+            elif (name in values and name not in self.dynamic_defaults and
+                    is_immutable(values[name])):
+                shared_defaults[name] = values[name]
+
+        self.shared_default_slots = tuple([(self.slots[name].__set__, value)
+                                           for (name, value) in shared_defaults.items()
+                                           if name in self.slots])
+        self.eager_traits = tuple(eager_traits)
+        self.shared_defaults = shared_defaults
+
+    def assign_trusted(self, inst, data):
+        """
+        Store every item of ``data`` on the model instance ``inst`` without
+        validating or copying the values. Traits with a customized
+        :meth:`__set__` and keys that aren't traits are still assigned with
+        setattr.
+        """
+        raw_names = self.raw_names
+        if not self.compact and raw_names.issuperset(data):
+            inst._trait_values.update(data)
+        else:
+            values = inst._trait_values
+            setattr = get_init_setattr(self.model)
+            for (key, value) in data.items():
+                if key in raw_names:
+                    values[key] = value
+                else:
+                    setattr(inst, key, value)
+
+        if self.frozen:
+            freeze(inst)
+
+    def _compile_assign(self, inst, data):
+        """
+        Generate the assign function for this class, and use it.
+        """
+        assign = make_assign(self)
+        if self.frozen:
+            def assign(inst, data, assign=assign):
+                assign(inst, data)
+                freeze(inst)
+        self.assign = assign
+        return self.assign(inst, data)
@@ -0,0 +1,129 @@
+"""
+Create many instances of a :class:`Model` class in a pool of processes.
+
+Validation is pure python, so :meth:`Model.create_many` only uses one core.
+With ``workers``, the records are split into chunks that are validated by a
+``multiprocessing`` pool, each worker making the instances of its chunks the
+same way :func:`modelo.model.bulk.create_chunk` does. The workers send back
+the values of the instances, in the layout they are pickled with (see
+:mod:`modelo.model.pickling`), and the instances are made again from them
+without validating anything, even for classes that customize
+:meth:`__init__`. The chunks are put back in the order of the records.
+
+Records that fit in one chunk, and chunks of fewer than
+:data:`MIN_CHUNK_SIZE` records, are validated in this process instead,
+because sending them to the pool would take longer than validating them.
+
+Only a few chunks per worker are sent ahead, so records can come from a
+generator that is larger than memory. The model class and the records have
+to be picklable: the class has to be defined at the top level of a module.
+"""
+
+from collections import deque
+from itertools import (
+    chain,
+    islice,
+)
+import multiprocessing
+
+from modelo.trait.interning import (
+    InternPool,
+    get_pool,
+    interning,
+)
+
+from modelo.model.bulk import (
+    CHUNK_SIZE,
+    RecordError,
+    create_chunk,
+    create_each,
+    iter_create_many,
+)
+
+#: number of chunks per worker that are sent to the pool before waiting for
+#: the first one to be done
+CHUNKS_AHEAD = 2
+
+#: chunks of fewer records are validated in this process, because sending
+#: them to a worker and back takes longer than validating them
+MIN_CHUNK_SIZE = 100
+
+def create_shard(cls, records, direct):
+    """
+    Validate one chunk of records, in a worker process.
+
+    :return: ``(rows, failures)``: the pickled values of each instance (see
+        :meth:`PickleLayout.get_values`) with its plain attributes, or None
+        for the invalid records, and the errors of the invalid records, by
+        record position
+    """
+    failures = {}
+    with interning(get_pool() or InternPool()):
+        if direct:
+            instances = create_chunk(cls, records, failures)
+        else:
+            instances = create_each(cls, records, failures)
+
+    # the values are sent instead of the instances, so that the instances
+    # can be made again without validating anything
+    get_values = cls._get_pickle_layout().get_values
+    rows = []
+    for (position, inst) in enumerate(instances):
+        if position in failures:
+            rows.append(None)
+            continue
+        # attributes set from keys that aren't traits, or by __init__
+        attributes = getattr(inst, "__dict__", None) or None
+        rows.append((get_values(inst), attributes))
+    return (rows, failures)
+
+def iter_create_parallel(cls, records, workers, errors=None, chunk_size=CHUNK_SIZE, direct=True):
+    """
+    Create an instance of ``cls`` for each record in the iterable ``records``
+    with a pool of ``workers`` processes, yielding the instances in order.
+    See :meth:`Model.create_many`.
+    """
+    records = iter(records)
+    chunks = iter(lambda: list(islice(records, chunk_size)), [])
+    first = next(chunks, [])
+    if chunk_size < MIN_CHUNK_SIZE or len(first) < chunk_size:
+        # the records fit in one chunk, or the chunks are too small to be
+        # worth sending to another process
+        for inst in iter_create_many(cls, chain(first, records), errors=errors,
+                                     chunk_size=chunk_size, direct=direct):
+            yield inst
+        return
+
+    chunks = chain([first], chunks)
+    restore = cls._get_pickle_layout().restore_trusted
+    pool = multiprocessing.Pool(workers)
+    try:
+        pending = deque()
+        start = 0
+        while True:
+            for chunk in islice(chunks, workers * CHUNKS_AHEAD - len(pending)):
+                pending.append((start, chunk, pool.apply_async(create_shard, (cls, chunk, direct))))
+                start += len(chunk)
+            if not pending:
+                break
+
+            (offset, chunk, result) = pending.popleft()
+            (rows, failures) = result.get()
+            for (position, row) in enumerate(rows):
+                if row is None:
+                    error = RecordError(offset + position, chunk[position], failures[position])
+                    if errors is None:
+                        raise error
+                    errors.append(error)
+                    continue
+                (values, attributes) = row
+                inst = restore(values)
+                if attributes:
+                    inst.__dict__.update(attributes)
+                yield inst
+
+        pool.close()
+    finally:
+        # stops the workers when the caller stops early or an error is raised
+        pool.terminate()
+        pool.join()
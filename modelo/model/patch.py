@@ -0,0 +1,221 @@
+"""
+Update models with nested patches, and compute the patch between two models.
+
+A patch is a dictionary of trait names to new values, like the data given to
+:meth:`Model.create`. A dictionary given for a trait that holds a model
+updates that model, and a dictionary given for a ``Dict`` trait is merged
+into a copy of the current dictionary, validating only the merged items.
+Only the traits in the patch are looked at. ``Ref`` traits are patched with
+the key of their model, and :meth:`Model.diff` doesn't load them.
+
+Patches made by :meth:`Model.diff` are applied with :meth:`Model.apply_patch`,
+which also removes the keys of ``Dict`` traits that are None in the patch, as
+in JSON merge patches (RFC 7386). Because of that, None values inside of
+``Dict`` traits don't survive a diff and patch.
+"""
+
+import modelo.trait.py3compat as py3compat
+import modelo.trait.trait_types as field
+
+from modelo.model.codegen import get_function
+from modelo.model.frozen import FrozenModelError
+from modelo.model.observe import record_change
+from modelo.model.options import ModelOptions
+from modelo.model.sharing import own
+from modelo.model.serialize import (
+    dump_value,
+    is_model,
+)
+
+def model_class(trait):
+    """
+    Return the model class of the values of a trait, or None if the trait
+    doesn't hold models.
+    """
+    if isinstance(trait, field.This):
+        return trait.this_class
+    elif isinstance(trait, field.Instance) and not isinstance(trait, (field.Container, field.Dict)):
+        klass = trait.klass
+        if isinstance(klass, type) and isinstance(getattr(klass, "_meta", None), ModelOptions):
+            return klass
+    return None
+
+def merge_dict(current, patch, remove_none):
+    """
+    Return a new dictionary with the items of ``patch`` merged into
+    ``current``. Nested dictionaries are merged too, and only the dictionaries
+    along the merged keys are copied. With ``remove_none``, keys that are None
+    in the patch are removed.
+    """
+    merged = dict(current)
+    for (key, value) in py3compat.iteritems(patch):
+        if value is None and remove_none:
+            merged.pop(key, None)
+        elif isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = merge_dict(merged[key], value, remove_none)
+        else:
+            merged[key] = value
+    return merged
+
+def has_item_validation(trait):
+    """
+    Whether the ``Dict`` trait validates its dictionaries item by item, so that
+    merged items can be validated on their own.
+    """
+    return get_function(type(trait).validate) is get_function(field.Dict.validate)
+
+def merge_items(inst, trait, current, patch, remove_none):
+    """
+    Return a copy of the current value of a ``Dict`` trait with the items of
+    ``patch`` merged into it. Only the patched items are validated, because
+    the rest of the dictionary is valid already. Models in the values are
+    updated in place, like models in traits.
+    """
+    merged = dict(current or ())
+    klass = model_class(trait._value_trait) if trait._value_trait is not None else None
+    # references are replaced by their new key
+    merge = not isinstance(trait._value_trait, field.Ref)
+    for (key, value) in py3compat.iteritems(patch):
+        key = trait.validate_key(inst, key)
+        if value is None and remove_none:
+            merged.pop(key, None)
+            continue
+
+        if isinstance(value, dict) and merge:
+            element = merged.get(key)
+            if klass is not None:
+                if is_model(element):
+                    apply(element, value, remove_none)
+                    continue
+                value = klass.create(value)
+            elif isinstance(element, dict):
+                value = merge_dict(element, value, remove_none)
+
+        merged[key] = trait.validate_value(inst, value)
+    return merged
+
+def store(inst, name, value):
+    """
+    Store a value that is known to be valid into a trait, recording the change
+    and notifying the observers like an assignment does. Traits that customize
+    assignment are assigned as usual.
+    """
+    meta = inst._meta
+    if name not in meta.raw_names:
+        setattr(inst, name, value)
+        return
+
+    old = meta.peek(inst, name) if meta.observers else None
+    inst._trait_values[name] = value
+    if meta.track_changes or meta.observers:
+        record_change(inst, meta, meta.trait_index[name], old)
+
+def apply(inst, patch, remove_none=False):
+    """
+    Apply a patch to a model instance, see :meth:`Model.update`.
+    """
+    if inst._meta.frozen:
+        raise FrozenModelError("Can't update, %s instances are frozen." % type(inst).__name__)
+
+    traits = inst._meta.traits
+    for (name, value) in py3compat.iteritems(patch):
+        trait = traits.get(name)
+        if trait is None:
+            continue
+
+        if isinstance(value, dict) and not isinstance(trait, field.Ref):
+            if isinstance(trait, field.Dict) and has_item_validation(trait):
+                # a dict shared with a fork is merged as a plain dict
+                own(inst, name)
+                current = getattr(inst, name)
+                store(inst, name, merge_items(inst, trait, current, value, remove_none))
+                continue
+
+            klass = model_class(trait)
+            if klass is not None:
+                current = getattr(inst, name)
+                if is_model(current):
+                    # update the model in place
+                    apply(current, value, remove_none)
+                    continue
+                value = klass.create(value)
+            elif isinstance(trait, field.Instance):
+                own(inst, name)
+                current = getattr(inst, name)
+                if isinstance(current, dict):
+                    value = merge_dict(current, value, remove_none)
+        elif isinstance(trait, field.List) and trait._trait is not None:
+            klass = model_class(trait._trait)
+            if klass is not None:
+                value = [klass.create(element) if isinstance(element, dict) else element
+                         for element in value]
+
+        setattr(inst, name, value)
+
+def values_equal(first, second):
+    """
+    Whether two trait values are the same, comparing models by their values.
+    """
+    if first is second:
+        return True
+    elif is_model(first) or is_model(second):
+        return type(first) is type(second) and not diff(first, second)
+
+    try:
+        if first == second:
+            return True
+    except Exception:
+        pass
+
+    if isinstance(first, (list, tuple)) and isinstance(second, (list, tuple)):
+        return (type(first) is type(second) and len(first) == len(second) and
+                all(values_equal(a, b) for (a, b) in zip(first, second)))
+    elif isinstance(first, dict) and isinstance(second, dict):
+        return (len(first) == len(second) and
+                all(key in second and values_equal(value, second[key])
+                    for (key, value) in py3compat.iteritems(first)))
+    return False
+
+def diff_dicts(first, second):
+    """
+    Build the merge patch that turns the dictionary ``first`` into ``second``.
+    """
+    patch = {}
+    for (key, value) in py3compat.iteritems(second):
+        if key not in first:
+            patch[key] = dump_value(value)
+        elif not values_equal(first[key], value):
+            if isinstance(first[key], dict) and isinstance(value, dict):
+                patch[key] = diff_dicts(first[key], value)
+            else:
+                patch[key] = dump_value(value)
+    for key in first:
+        if key not in second:
+            patch[key] = None
+    return patch
+
+def diff(first, second):
+    """
+    Build the patch that turns the model instance ``first`` into ``second``,
+    see :meth:`Model.diff`.
+    """
+    if type(first) is not type(second):
+        raise TypeError("Can't diff a %s with a %s." % (type(first).__name__, type(second).__name__))
+
+    meta = first._meta
+    patch = {}
+    for name in meta.state_names:
+        # references are compared by their keys, without loading them
+        (old, new) = (meta.peek(first, name), meta.peek(second, name))
+        if is_model(old) and is_model(new) and type(old) is type(new):
+            nested = diff(old, new)
+            if nested:
+                patch[name] = nested
+        elif values_equal(old, new):
+            continue
+        elif isinstance(old, dict) and isinstance(new, dict) and type(new) is dict:
+            patch[name] = diff_dicts(old, new)
+        else:
+            patch[name] = dump_value(new)
+
+    return patch
@@ -0,0 +1,276 @@
+"""
+Pickle model instances compactly.
+
+:meth:`Model.__reduce_ex__` pickles an instance as its class, a key of its
+trait names and a tuple of its trait values in the order of
+:attr:`ModelOptions.state_names`, instead of a dictionary that repeats the
+trait names in every pickled instance. Unpickled instances are restored like
+:meth:`Model.from_trusted` restores them, without validating the values
+again. Instances are created before their values are restored, so pickled
+models can refer to each other in cycles.
+
+Coded enums are pickled as the small int of their code, and ``Ref`` traits
+as the key of their model. With pickle protocol
+5, ``Bytes`` values and the arrays of ``IntArray`` and ``FloatArray`` traits
+of at least :data:`OUT_OF_BAND_SIZE` bytes are pickled as ``PickleBuffer``
+objects, which can be sent out of band with the ``buffer_callback`` of the
+pickler. Arrays are sent in the byte order of the machine.
+"""
+
+import zlib
+from array import array
+
+try:
+    from copyreg import __newobj__
+except ImportError:
+    from copy_reg import __newobj__
+
+try:
+    from pickle import PickleBuffer
+except ImportError:
+    PickleBuffer = None
+
+import modelo.trait.trait_types as field
+
+from modelo.model.codegen import (
+    compile_function,
+    has_plain_setattr,
+)
+from modelo.model.sharing import SharedValues
+
+#: size in bytes from which values are pickled as buffers with protocol 5
+OUT_OF_BAND_SIZE = 1024
+
+class PickleLayout(object):
+    """
+    How the instances of a model class are pickled. It is made on first use
+    and kept in the options of the class, see :meth:`Model._get_pickle_layout`.
+    """
+
+    def __init__(self, model):
+        meta = model._meta
+        self.model = model
+        self.names = meta.state_names
+
+        #: changes when traits are added, removed or reordered, so that a
+        #: pickle of another version of the class isn't restored in the wrong
+        #: order
+        self.key = zlib.crc32(",".join(self.names).encode("utf-8")) & 0xffffffff
+
+        traits = [meta.traits[name] for name in self.names]
+        self.coded = tuple([(index, trait) for (index, trait) in enumerate(traits)
+                            if isinstance(trait, field.CodedEnumStorage)])
+        self.refs = tuple([(index, trait) for (index, trait) in enumerate(traits)
+                           if isinstance(trait, field.Ref)])
+        self.bytes = tuple([index for (index, trait) in enumerate(traits)
+                            if isinstance(trait, field.Bytes)])
+        self.arrays = tuple([(index, trait.typecode) for (index, trait) in enumerate(traits)
+                             if isinstance(trait, field.IntArray)])
+
+        self.reduce = make_reduce(meta, self)
+
+        #: whether restored values can go straight into the _trait_values of
+        #: the instance
+        self.plain = not (self.coded or self.bytes or self.arrays or meta.compact or
+                          meta.frozen or not meta.raw_names.issuperset(self.names))
+
+        #: whether the values given by get_values can go straight into the
+        #: _trait_values of the instance, with the codes of coded enums
+        raw_names = meta.raw_names.union(meta.coded_names) if has_plain_setattr(model) else meta.raw_names
+        self.trusted = not (meta.compact or meta.frozen or not raw_names.issuperset(self.names))
+
+    def check_key(self, key):
+        if key != self.key:
+            raise ValueError("The pickle of %s was made with other traits" % self.model.__name__)
+
+    def set_state(self, inst, state):
+        """
+        Restore the values of an unpickled instance, see
+        :meth:`Model.__setstate__`.
+        """
+        (key, values) = state
+        if key == self.key and self.plain and len(values) == len(self.names):
+            inst._trait_values.update(zip(self.names, values))
+            return
+
+        self.check_key(key)
+        inst._meta.assign_trusted(inst, self.restore_values(values))
+
+    def get_values(self, inst):
+        """
+        Return the values of an instance as they are pickled, without
+        buffers.
+        """
+        reduced = self.reduce(inst, 2)
+        if len(reduced) > 2:
+            return reduced[2][1]
+        return reduced[1][2]
+
+    def restore_trusted(self, values):
+        """
+        Make an instance from values given by :meth:`get_values`, without
+        validating them. Models that customize how they are constructed are
+        made without calling :meth:`__init__` too, so their other attributes
+        have to be restored by the caller.
+        """
+        model = self.model
+        meta = model._meta
+        inst = object.__new__(model)
+        if not self.trusted:
+            data = self.restore_values(values)
+            meta.init_instance(inst, data)
+            meta.assign_trusted(inst, data)
+            return inst
+
+        if self.coded:
+            # stored as the code, like the trait stores it
+            values = list(values)
+            for (index, trait) in self.coded:
+                if values[index] is not None:
+                    values[index] = trait._codes[values[index]]
+        data = dict(zip(self.names, values))
+        meta.init_instance(inst, data)
+        inst._trait_values.update(data)
+        return inst
+
+    def restore_values(self, values):
+        """
+        Build the data of an instance from pickled values.
+        """
+        if len(values) != len(self.names):
+            raise ValueError("The pickle of %s has %d values instead of %d"
+                             % (self.model.__name__, len(values), len(self.names)))
+        if not (self.coded or self.bytes or self.arrays):
+            return dict(zip(self.names, values))
+
+        values = list(values)
+        for (index, trait) in self.coded:
+            if values[index] is not None:
+                # assigned through the trait, which stores the code again
+                values[index] = trait._sequence[values[index]]
+        for index in self.bytes:
+            if values[index] is not None and type(values[index]) is not bytes:
+                # a buffer that was sent out of band
+                values[index] = memoryview(values[index]).tobytes()
+        for (index, typecode) in self.arrays:
+            value = values[index]
+            if value is not None and type(value) is not array and not isinstance(value, tuple):
+                values[index] = array(typecode)
+                array_frombytes(values[index], get_bytes(value))
+        return dict(zip(self.names, values))
+
+if hasattr(array, "frombytes"):
+    array_frombytes = array.frombytes
+else:
+    def array_frombytes(values, data):
+        values.fromstring(bytes(data))
+
+def get_bytes(buffer):
+    """
+    Return the contents of a buffer that was sent out of band, such as a
+    ``PickleBuffer``, as bytes that ``array.frombytes`` takes, without a copy
+    when the buffer is contiguous.
+    """
+    view = memoryview(buffer)
+    if hasattr(view, "cast") and view.contiguous:
+        return view.cast("B")
+    return view.tobytes()
+
+def encode_code(trait, value):
+    """
+    Return the int that a coded enum value is pickled as.
+    """
+    if value is None:
+        return None
+    if type(value) is field.EnumCode:
+        return int(value)
+    return trait.index(value)
+
+def as_buffer(value):
+    """
+    Wrap a value in a ``PickleBuffer`` if it is big enough to be sent out of
+    band.
+    """
+    if type(value) is bytes:
+        size = len(value)
+    elif type(value) is array:
+        size = len(value) * value.itemsize
+    else:
+        return value
+    return PickleBuffer(value) if size >= OUT_OF_BAND_SIZE else value
+
+def make_reduce(meta, layout):
+    """
+    Generate ``reduce(inst, protocol)``, the :meth:`Model.__reduce_ex__` of
+    the class. Models with a custom :meth:`__new__` or :meth:`__init__` are
+    restored with :meth:`Model.create`.
+    """
+    namespace = {
+        "SharedValues": SharedValues,
+        "dict": dict,
+        "type": type,
+        "getattr": getattr,
+        "as_buffer": as_buffer,
+        "encode_code": encode_code,
+        "newobj": __newobj__,
+        "restore": restore,
+        "model": meta.model,
+        "key": layout.key,
+        "has_buffers": PickleBuffer is not None,
+    }
+    lines = [
+        "def reduce(inst, protocol):",
+    ]
+    if not meta.compact:
+        lines.extend([
+            "    values = inst._trait_values",
+            "    if type(values) is SharedValues:",
+            "        # pickling only reads the values, they don't need to be copied",
+            "        values = dict(values)",
+        ])
+
+    coded = dict(layout.coded)
+    refs = dict(layout.refs)
+    buffered = set(layout.bytes) | set([index for (index, typecode) in layout.arrays])
+    if buffered:
+        lines.append("    buffers = has_buffers and protocol >= 5")
+
+    for (index, name) in enumerate(layout.names):
+        key = repr(name)
+        lines.append("    try:")
+        if meta.compact:
+            namespace["load_%d" % index] = meta.slots[name].__get__
+            lines.append("        value_%d = load_%d(inst)" % (index, index))
+            lines.append("    except AttributeError:")
+        else:
+            lines.append("        value_%d = values[%s]" % (index, key))
+            lines.append("    except KeyError:")
+        lines.append("        value_%d = getattr(inst, %s)" % (index, key))
+
+        if index in coded:
+            namespace["trait_%d" % index] = coded[index]
+            lines.append("    value_%d = encode_code(trait_%d, value_%d)" % (index, index, index))
+        elif index in refs:
+            namespace["to_key_%d" % index] = refs[index].to_key
+            lines.append("    value_%d = to_key_%d(value_%d)" % (index, index, index))
+        elif index in buffered:
+            lines.append("    if buffers:")
+            lines.append("        value_%d = as_buffer(value_%d)" % (index, index))
+
+    values = "(%s)" % "".join(["value_%d, " % index for index in range(len(layout.names))])
+    if meta.direct_create:
+        # protocol 2 and above make the instance with one opcode, and
+        # Model.__new__ sets its default values
+        lines.append("    return (newobj, (model,), (key, %s))" % values)
+    else:
+        lines.append("    return (restore, (model, key, %s))" % values)
+    return compile_function("reduce", lines, namespace)
+
+def restore(model, key, values):
+    """
+    Make an instance of a model that customizes how it is constructed, from
+    its pickled values. It is made with :meth:`Model.create`.
+    """
+    layout = model._get_pickle_layout()
+    layout.check_key(key)
+    return model.create(layout.restore_values(values))
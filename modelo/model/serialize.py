@@ -0,0 +1,216 @@
+"""
+Convert model instances to plain python data.
+
+A dumper is made once for each trait from its type, including the traits of
+container elements, so that :meth:`Model.to_dict` only does the conversions
+that the declared types need: scalars are used as they are, containers are
+copied, and models are converted wherever they are nested. Values of untyped
+traits are converted by looking at them, with :func:`dump_value`.
+"""
+
+from array import array
+
+import modelo.trait.py3compat as py3compat
+import modelo.trait.trait_types as field
+
+from modelo.model.codegen import compile_function
+from modelo.model.options import ModelOptions
+
+def is_model(value):
+    """
+    Whether the value is a :class:`Model` instance.
+    """
+    return isinstance(getattr(type(value), "_meta", None), ModelOptions)
+
+def dump_model(value):
+    """
+    Dump a model instance, or None.
+    """
+    if value is None:
+        return None
+    return value.to_dict()
+
+def dump_set(elements):
+    """
+    Build the dumped value of a set. Sets of models become lists, because
+    dictionaries can't be in a set.
+    """
+    try:
+        return set(elements)
+    except TypeError:
+        return list(elements)
+
+def dump_value(value):
+    """
+    Convert a value of an untyped trait for :meth:`Model.to_dict`. Models are
+    converted to dictionaries wherever they are nested in lists, tuples, sets
+    and dicts, and containers are copied.
+    """
+    if is_model(value):
+        return value.to_dict()
+    elif isinstance(value, list):
+        return [dump_value(element) for element in value]
+    elif isinstance(value, dict):
+        return dict([(key, dump_value(element)) for (key, element) in py3compat.iteritems(value)])
+    elif isinstance(value, tuple):
+        return tuple([dump_value(element) for element in value])
+    elif isinstance(value, (set, frozenset)):
+        return dump_set([dump_value(element) for element in value])
+    elif isinstance(value, array) or field.is_ndarray(value):
+        return value.tolist()
+    return value
+
+def copy_list(value):
+    if value is None:
+        return None
+    return list(value)
+
+def dump_array(value):
+    """
+    Dump the value of an ``IntArray`` or ``FloatArray`` trait as a list. The
+    values of frozen models are tuples.
+    """
+    if value is None:
+        return None
+    elif type(value) is array:
+        return value.tolist()
+    return list(value)
+
+def dump_ndarray(value):
+    """
+    Dump the value of an ``NDArray`` trait as nested lists, in one call.
+    """
+    if value is None:
+        return None
+    return value.tolist()
+
+def copy_dict(value):
+    if value is None:
+        return None
+    return dict(value)
+
+def copy_set(value):
+    if value is None:
+        return None
+    return set(value)
+
+def make_dumper(trait):
+    """
+    Return a function that converts values of the given trait for
+    :meth:`Model.to_dict`, or None if the values can be used as they are.
+    """
+    if isinstance(trait, field.CodedEnumStorage):
+        return trait.decode
+
+    if isinstance(trait, field.Ref):
+        # references are dumped as their key
+        return trait.to_key
+
+    if trait.get_exact_types() or isinstance(trait, (field.Enum, field.Type, field.ObjectName)):
+        return None
+
+    if isinstance(trait, field.This):
+        return dump_model
+
+    if isinstance(trait, field.IntArray):
+        return dump_array
+
+    if isinstance(trait, field.NDArray):
+        return dump_ndarray
+
+    if isinstance(trait, field.Tuple):
+        if not trait._traits:
+            return dump_value
+        dumpers = [make_dumper(element_trait) for element_trait in trait._traits]
+        if not any(dumpers):
+            return None
+        dumpers = [dumper or (lambda element: element) for dumper in dumpers]
+
+        def dump_tuple(value):
+            if value is None:
+                return None
+            return tuple([dumper(element) for (dumper, element) in zip(dumpers, value)])
+        return dump_tuple
+
+    if isinstance(trait, (field.List, field.Set)):
+        # the values of frozen models are tuples and frozensets, which are
+        # dumped as the declared container type
+        dumper = dump_value if trait._trait is None else make_dumper(trait._trait)
+        if dumper is None:
+            return copy_list if isinstance(trait, field.List) else copy_set
+        if isinstance(trait, field.List):
+            def dump_list(value):
+                if value is None:
+                    return None
+                return [dumper(element) for element in value]
+            return dump_list
+        else:
+            def dump_elements(value):
+                if value is None:
+                    return None
+                return dump_set([dumper(element) for element in value])
+            return dump_elements
+
+    if isinstance(trait, field.Dict) and trait._value_trait is not None:
+        dumper = make_dumper(trait._value_trait)
+        if dumper is None:
+            return copy_dict
+        def dump_items(value):
+            if value is None:
+                return None
+            return dict([(key, dumper(element)) for (key, element) in py3compat.iteritems(value)])
+        return dump_items
+
+    if isinstance(trait, field.Instance):
+        klass = trait.klass
+        if isinstance(klass, type) and isinstance(getattr(klass, "_meta", None), ModelOptions):
+            return dump_model
+
+    return dump_value
+
+def make_to_dict(meta, names):
+    """
+    Generate ``to_dict(inst)`` which builds a dictionary of the values of the
+    given traits of a model instance, converted by the dumper of each trait.
+    """
+    # sharing imports this module
+    from modelo.model.sharing import SharedValues
+
+    namespace = {"getattr": getattr, "SharedValues": SharedValues, "dict": dict, "type": type}
+
+    lines = [
+        "def to_dict(inst):",
+    ]
+    if not meta.compact:
+        lines.extend([
+            "    values = inst._trait_values",
+            "    if type(values) is SharedValues:",
+            "        # the values of a fork are only read, they don't need to be copied",
+            "        values = dict(values)",
+        ])
+    lines.append("    result = {}")
+
+    for (index, name) in enumerate(names):
+        key = repr(name)
+
+        # a missing value is a default value that hasn't been made yet
+        lines.append("    try:")
+        if meta.compact:
+            namespace["load_%d" % index] = meta.slots[name].__get__
+            lines.append("        value = load_%d(inst)" % index)
+            lines.append("    except AttributeError:")
+        else:
+            lines.append("        value = values[%s]" % key)
+            lines.append("    except KeyError:")
+        lines.append("        value = getattr(inst, %s)" % key)
+
+        dumper = make_dumper(meta.traits[name])
+        if dumper is None:
+            lines.append("    result[%s] = value" % key)
+        else:
+            namespace["dump_%d" % index] = dumper
+            lines.append("    result[%s] = dump_%d(value)" % (key, index))
+
+    lines.append("    return result")
+
+    return compile_function("to_dict", lines, namespace)
@@ -0,0 +1,585 @@
+"""
+Copy-on-write copies of model instances.
+
+:meth:`Model.fork` makes a copy that shares the trait values of the original
+instance instead of copying them, which only takes time proportional to the
+number of traits. Shared values that are mutable are marked as shared in
+both instances, and an instance only copies one when it is changed through
+that instance:
+
+* a shared list, dict or set is read through the trait as a
+  :class:`SharedList`, :class:`SharedDict` or :class:`SharedSet` view. Reads
+  go to the shared container, and the first change made through a view
+  copies the value of the trait, with the containers in it, and forks the
+  models in it;
+* a shared model is forked when it is first read through the trait, which
+  only takes time proportional to its number of traits, and models that are
+  read from a shared container copy that container first;
+* other mutable objects, like arrays, are copied when they are first read
+  through the trait.
+
+Reading the values in other ways, like :meth:`Model.to_dict`, pickling and
+:meth:`Model.diff` do, copies nothing. So a whole graph of models is only
+copied as far as it is changed.
+
+A value that something outside of the instance refers to when it is forked,
+like a container that was read from the instance before the fork, or that
+was given to :meth:`Model.from_trusted`, could still be changed behind the
+back of both instances. The copy gets its own copy of such values right
+away, and the original instance keeps the values that are referred to. The
+references are found with the reference counts of CPython, by looking
+through the containers and models in the values, but not at their other
+elements. Where reference counts aren't available, every mutable value is
+copied when an instance is forked.
+
+Compact models can't mark their values as shared, so their containers are
+copied when they are forked. Their submodels are still forked lazily.
+"""
+
+import sys
+import weakref
+from copy import deepcopy
+
+try:
+    from collections.abc import (
+        MutableMapping,
+        MutableSequence,
+        MutableSet,
+    )
+except ImportError:
+    from collections import (
+        MutableMapping,
+        MutableSequence,
+        MutableSet,
+    )
+
+import modelo.trait.py3compat as py3compat
+
+from modelo.model.options import is_immutable
+from modelo.model.serialize import is_model
+
+getrefcount = getattr(sys, "getrefcount", None)
+
+def count_references(value):
+    return getrefcount(value)
+
+def measure_references(value):
+    # called like is_referenced, so the frames refer to the value as often
+    return count_references(value)
+
+def get_reference_limit():
+    """
+    Return what :func:`is_referenced` counts for a value that only its
+    container and one local variable refer to.
+    """
+    for value in [object()]:
+        return measure_references(value)
+
+REFERENCE_LIMIT = get_reference_limit() if getrefcount is not None else None
+
+def is_shareable(value):
+    """
+    Whether a value can be used by any number of instances without copying,
+    because it can't be changed.
+    """
+    return is_immutable(value) or (is_model(value) and value._meta.frozen)
+
+def get_raw_value(inst, meta, name):
+    """
+    Return the stored value of a trait of a model instance, or None.
+    """
+    if meta.compact:
+        try:
+            return meta.slots[name].__get__(inst)
+        except AttributeError:
+            return None
+    return dict.get(inst._trait_values, name)
+
+def is_referenced(value):
+    """
+    Whether something other than its container refers to ``value``, or to a
+    container or model in it. The caller has to hold ``value`` in one local
+    variable, like the loops here do.
+    """
+    if REFERENCE_LIMIT is None or count_references(value) > REFERENCE_LIMIT:
+        return True
+
+    kind = type(value)
+    if kind is dict:
+        # a list of the values would refer to them too
+        for key in list(value):
+            element = value.get(key)
+            if not is_shareable(element) and is_referenced(element):
+                return True
+        return False
+    elif kind is list or kind is tuple or kind is set or kind is frozenset:
+        elements = iter(value)
+    elif is_model(value):
+        meta = value._meta
+        values = value._trait_values if not meta.compact else None
+        # the shared values of a fork are only reachable through views
+        shared = getattr(values, "shared", ())
+        for name in meta.trait_names:
+            if name in shared:
+                continue
+            element = get_raw_value(value, meta, name)
+            if not is_shareable(element) and is_referenced(element):
+                return True
+        return False
+    else:
+        return False
+
+    for element in elements:
+        if not is_shareable(element) and is_referenced(element):
+            return True
+    return False
+
+def clone_value(value, memo=None):
+    """
+    Copy a shared trait value. Models are forked, containers are copied along
+    with the containers in them, and other mutable objects are deep copied.
+    ``memo`` keeps the copy of each container by the id of the original.
+    """
+    if is_shareable(value):
+        return value
+    if memo is None:
+        memo = {}
+    clone = memo.get(id(value))
+    if clone is not None:
+        return clone
+
+    kind = type(value)
+    if is_model(value):
+        clone = value.fork()
+    elif kind is list:
+        clone = memo[id(value)] = []
+        clone.extend([clone_value(element, memo) for element in value])
+    elif kind is dict:
+        clone = memo[id(value)] = {}
+        clone.update([(key, clone_value(element, memo)) for (key, element) in py3compat.iteritems(value)])
+    elif kind is tuple:
+        clone = tuple([clone_value(element, memo) for element in value])
+    elif kind is set or kind is frozenset:
+        clone = kind([clone_value(element, memo) for element in value])
+    else:
+        clone = deepcopy(value)
+    memo[id(value)] = clone
+    return clone
+
+def unwrap(value):
+    """
+    Return a value that can be stored in a container, which isn't a view.
+    """
+    if isinstance(value, SharedView):
+        return value.unshare()
+    return value
+
+def plain(value):
+    """
+    Return the container of a view, to compare it.
+    """
+    if isinstance(value, SharedView):
+        return value._target
+    return value
+
+class SharedValues(dict):
+    """
+    The ``_trait_values`` of a forked model instance. Values whose names are
+    in :attr:`shared` are also used by another instance. Reading them through
+    the trait gives a view or a copy, and they are replaced by a copy the
+    first time they are changed.
+    """
+
+    __slots__ = ("shared", "views")
+
+    def __init__(self, values, shared):
+        dict.__init__(self, values)
+        self.shared = shared
+        #: the views of the shared values by their id, by name
+        self.views = {}
+
+    def __getitem__(self, name):
+        value = dict.__getitem__(self, name)
+        if name in self.shared:
+            return self.wrap(name, value)
+        return value
+
+    def __setitem__(self, name, value):
+        self.release(name)
+        dict.__setitem__(self, name, value)
+
+    def __delitem__(self, name):
+        self.release(name)
+        dict.__delitem__(self, name)
+
+    def update(self, *args, **kwargs):
+        for (name, value) in py3compat.iteritems(dict(*args, **kwargs)):
+            self[name] = value
+
+    def wrap(self, name, value):
+        """
+        Return what reading ``value`` gives, where ``value`` is the shared
+        value of ``name`` or a value in it.
+        """
+        if is_shareable(value):
+            return value
+        kind = type(value)
+        if kind is list:
+            return self.add_view(name, SharedList(self, name, value))
+        elif kind is dict:
+            return self.add_view(name, SharedDict(self, name, value))
+        elif kind is set:
+            return self.add_view(name, SharedSet(self, name, value))
+        return self.own(name)[id(value)]
+
+    def add_view(self, name, view):
+        views = self.views.get(name)
+        if views is None:
+            views = self.views[name] = weakref.WeakValueDictionary()
+        views[id(view)] = view
+        return view
+
+    def own(self, name):
+        """
+        Replace the shared value of ``name`` with a copy. The views of the
+        value are moved to the copy. Returns the memo of :func:`clone_value`.
+        """
+        memo = {}
+        value = clone_value(dict.__getitem__(self, name), memo)
+        self.shared.discard(name)
+        dict.__setitem__(self, name, value)
+        self.move_views(name, memo)
+        return memo
+
+    def release(self, name):
+        """
+        Forget that the value of ``name`` is shared, before it is replaced.
+        Its views get a copy of their own.
+        """
+        if name in self.shared:
+            self.shared.discard(name)
+            if name in self.views:
+                memo = {}
+                clone_value(dict.__getitem__(self, name), memo)
+                self.move_views(name, memo)
+
+    def move_views(self, name, memo):
+        views = self.views.pop(name, None)
+        if views is not None:
+            for view in views.values():
+                view._target = memo[id(view._target)]
+
+class SharedView(object):
+    """
+    A view of a container that is shared by forked instances, see
+    :mod:`modelo.model.sharing`.
+    """
+
+    __hash__ = None
+
+    def __init__(self, values, name, target):
+        self._values = values
+        self._name = name
+        self._target = target
+
+    def _write(self):
+        """
+        Return the container, after copying the shared value that it is in.
+        """
+        if self._name in self._values.shared:
+            self._values.own(self._name)
+        return self._target
+
+    def _wrap(self, element):
+        if self._name in self._values.shared:
+            return self._values.wrap(self._name, element)
+        return element
+
+    def __len__(self):
+        return len(self._target)
+
+    def __contains__(self, value):
+        return plain(value) in self._target
+
+    def __eq__(self, other):
+        return self._target == plain(other)
+
+    def __ne__(self, other):
+        return self._target != plain(other)
+
+    def __repr__(self):
+        return repr(self._target)
+
+    def unshare(self):
+        """
+        Return a copy of the container, which is what assigning the view to
+        a trait stores.
+        """
+        return clone_value(self._target)
+
+    def copy(self):
+        return clone_value(self._target)
+
+    def __copy__(self):
+        return clone_value(self._target)
+
+    def __deepcopy__(self, memo):
+        return deepcopy(self._target, memo)
+
+    def __reduce_ex__(self, protocol):
+        return (type(self._target), (self._target,))
+
+class SharedList(SharedView, MutableSequence):
+    """
+    A view of a shared list.
+    """
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return clone_value(self._target[index])
+        return self._wrap(self._target[index])
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            value = [unwrap(element) for element in value]
+        else:
+            value = unwrap(value)
+        self._write()[index] = value
+
+    def __delitem__(self, index):
+        del self._write()[index]
+
+    def __iter__(self):
+        for element in self._target:
+            yield self._wrap(element)
+
+    def __lt__(self, other):
+        return self._target < plain(other)
+
+    def __le__(self, other):
+        return self._target <= plain(other)
+
+    def __gt__(self, other):
+        return self._target > plain(other)
+
+    def __ge__(self, other):
+        return self._target >= plain(other)
+
+    def __add__(self, other):
+        return self.copy() + list(other)
+
+    def __radd__(self, other):
+        return list(other) + self.copy()
+
+    def __mul__(self, count):
+        return self.copy() * count
+
+    __rmul__ = __mul__
+
+    def __iadd__(self, values):
+        self.extend(values)
+        return self
+
+    def __imul__(self, count):
+        self._write()[:] = self.copy() * count
+        return self
+
+    def insert(self, index, value):
+        self._write().insert(index, unwrap(value))
+
+    def append(self, value):
+        self._write().append(unwrap(value))
+
+    def extend(self, values):
+        values = [unwrap(value) for value in values]
+        self._write().extend(values)
+
+    def pop(self, index=-1):
+        return self._write().pop(index)
+
+    def remove(self, value):
+        self._write().remove(plain(value))
+
+    def index(self, value, *args):
+        return self._target.index(plain(value), *args)
+
+    def count(self, value):
+        return self._target.count(plain(value))
+
+    def reverse(self):
+        self._write().reverse()
+
+    def sort(self, *args, **kwargs):
+        self._write().sort(*args, **kwargs)
+
+class SharedDict(SharedView, MutableMapping):
+    """
+    A view of a shared dict.
+    """
+
+    def __getitem__(self, key):
+        return self._wrap(self._target[key])
+
+    def __setitem__(self, key, value):
+        self._write()[key] = unwrap(value)
+
+    def __delitem__(self, key):
+        del self._write()[key]
+
+    def __iter__(self):
+        return iter(self._target)
+
+    def get(self, key, default=None):
+        if key in self._target:
+            return self[key]
+        return default
+
+    def keys(self):
+        return self._target.keys()
+
+    def values(self):
+        return [self._wrap(element) for element in self._target.values()]
+
+    def items(self):
+        return [(key, self._wrap(element)) for (key, element) in self._target.items()]
+
+    def iterkeys(self):
+        return iter(self._target)
+
+    def itervalues(self):
+        return iter(self.values())
+
+    def iteritems(self):
+        return iter(self.items())
+
+    def has_key(self, key):
+        return key in self._target
+
+    def pop(self, key, *default):
+        return self._write().pop(key, *default)
+
+    def popitem(self):
+        return self._write().popitem()
+
+    def clear(self):
+        self._write().clear()
+
+    def update(self, *args, **kwargs):
+        items = dict(*args, **kwargs)
+        self._write().update([(key, unwrap(value)) for (key, value) in py3compat.iteritems(items)])
+
+    def setdefault(self, key, default=None):
+        if key not in self._target:
+            self._write()[key] = unwrap(default)
+        return self[key]
+
+class SharedSet(SharedView, MutableSet):
+    """
+    A view of a shared set.
+    """
+
+    @classmethod
+    def _from_iterable(cls, elements):
+        return set(elements)
+
+    def __iter__(self):
+        for element in self._target:
+            yield self._wrap(element)
+
+    def add(self, value):
+        self._write().add(value)
+
+    def discard(self, value):
+        self._write().discard(value)
+
+    def remove(self, value):
+        self._write().remove(value)
+
+    def pop(self):
+        return self._write().pop()
+
+    def clear(self):
+        self._write().clear()
+
+    def update(self, *others):
+        self._write().update(*others)
+
+    def difference_update(self, *others):
+        self._write().difference_update(*others)
+
+    def intersection_update(self, *others):
+        self._write().intersection_update(*others)
+
+    def symmetric_difference_update(self, other):
+        self._write().symmetric_difference_update(other)
+
+    def union(self, *others):
+        return self.copy().union(*others)
+
+    def intersection(self, *others):
+        return self.copy().intersection(*others)
+
+    def difference(self, *others):
+        return self.copy().difference(*others)
+
+    def symmetric_difference(self, other):
+        return self.copy().symmetric_difference(other)
+
+    def issubset(self, other):
+        return self._target.issubset(other)
+
+    def issuperset(self, other):
+        return self._target.issuperset(other)
+
+def own(inst, name):
+    """
+    Make the value of a trait of a forked instance its own, so that it can be
+    changed in place.
+    """
+    if inst._meta.compact:
+        return
+    values = inst._trait_values
+    if type(values) is SharedValues and name in values.shared:
+        values.own(name)
+
+def fork(inst):
+    """
+    Make a copy-on-write copy of a model instance, see :meth:`Model.fork`.
+    """
+    cls = type(inst)
+    copy = object.__new__(cls)
+    values = inst._trait_values
+
+    if cls._meta.compact:
+        for (name, value) in values.items():
+            copy._trait_values[name] = clone_value(value)
+    else:
+        known = getattr(values, "shared", ())
+        shared = set()
+        copied = {}
+        for name in list(values):
+            value = dict.get(values, name)
+            if is_shareable(value):
+                continue
+            elif name in known or not is_referenced(value):
+                shared.add(name)
+            else:
+                # something outside of the instance can change the value
+                copied[name] = clone_value(value)
+        value = None
+
+        if shared:
+            if type(values) is SharedValues:
+                values.shared.update(shared)
+            else:
+                object.__setattr__(inst, "_trait_values", SharedValues(values, set(shared)))
+            object.__setattr__(copy, "_trait_values", SharedValues(values, shared))
+        else:
+            object.__setattr__(copy, "_trait_values", dict(values))
+        dict.update(copy._trait_values, copied)
+
+    # other attributes, and the changes of models that track them
+    if hasattr(inst, "__dict__"):
+        copy.__dict__.update(inst.__dict__)
+
+    return copy
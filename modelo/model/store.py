@@ -0,0 +1,349 @@
+"""
+Memory-mapped files of many instances of one :class:`Model` class.
+
+A store file keeps one column per trait:
+
+* ``Int``, ``Float`` and ``Bool`` traits are fixed-width columns of packed
+  numbers
+* ``Unicode`` and ``Bytes`` traits are a table of offsets followed by the
+  encoded strings
+* the values of other traits are encoded with their binary layout (see
+  :mod:`modelo.model.binary`), with a table of offsets
+
+The file is opened with ``mmap``, so opening it takes the same time for any
+number of rows, and processes that open the same file share its pages. An
+instance is only made when its row is read, and columns can be scanned
+without making any instances:
+
+``` python
+ModelStore.write("users.store", User, users)
+
+with ModelStore.open("users.store", User) as store:
+    user = store[12345]
+    oldest = max(store.column("age"))
+```
+"""
+
+import binascii
+import json
+import mmap
+import struct
+import sys
+from array import array
+
+import modelo.trait.py3compat as py3compat
+import modelo.trait.trait_types as field
+from modelo.trait.trait_types import INT_TYPECODE
+
+from modelo.model.binary import (
+    SchemaMismatchError,
+    array_extend,
+    get_model_codec,
+    make_codec,
+)
+
+#: first bytes of a store file
+MAGIC = b"MDLS"
+
+#: version of the file format
+VERSION = 1
+
+HEADER = struct.Struct("<4sII")
+OFFSET = struct.Struct("<Q")
+OFFSET_PAIR = struct.Struct("<QQ")
+
+#: columns start at multiples of this, so that numbers are aligned
+ALIGNMENT = 8
+
+BIG_ENDIAN = sys.byteorder == "big"
+
+if py3compat.PY3:
+    IntTraits = (field.Int,)
+else:
+    IntTraits = (field.Int, field.Integer)
+
+#: array typecodes of the fixed-width columns, when the platform has one with
+#: the right size
+ArrayTypecodes = dict([(format, typecode) for (format, typecode) in
+                       (("q", INT_TYPECODE), ("d", "d"), ("?", "b"))
+                       if array(typecode).itemsize == struct.calcsize(format)])
+
+def get_column_kind(trait):
+    """
+    Return how the column of a trait is stored: ``("fixed", format)``,
+    ``("text", encoding)`` (with None for bytes) or ``("encoded", None)``.
+    """
+    if isinstance(trait, field.Bool):
+        return ("fixed", "?")
+    elif isinstance(trait, IntTraits):
+        return ("fixed", "q")
+    elif isinstance(trait, field.Float):
+        return ("fixed", "d")
+    elif isinstance(trait, field.Unicode):
+        return ("text", "utf-8")
+    elif isinstance(trait, field.Bytes):
+        return ("text", None)
+    return ("encoded", None)
+
+def align(size):
+    return (size + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+def get_fingerprint(model):
+    """
+    Return the fingerprint of the binary layout of a model class, as text.
+    """
+    return binascii.hexlify(get_model_codec(model).fingerprint).decode("ascii")
+
+class ColumnWriter(object):
+    """
+    Collect the values of one column while a store is written.
+    """
+
+    def __init__(self, name, trait):
+        self.name = name
+        (self.kind, self.format) = get_column_kind(trait)
+        self.values = []
+        if self.kind == "encoded":
+            self.encode = make_codec(trait, {}).encode
+
+    def add(self, value):
+        if self.kind == "text":
+            if self.format is not None:
+                value = value.encode(self.format)
+        elif self.kind == "encoded":
+            chunks = []
+            self.encode(value, chunks.append)
+            value = b"".join(chunks)
+        self.values.append(value)
+
+    def get_bytes(self):
+        """
+        Return the bytes of the column.
+        """
+        if self.kind == "fixed":
+            try:
+                return struct.pack("<%d%s" % (len(self.values), self.format), *self.values)
+            except struct.error as error:
+                raise ValueError("Can't store the %r column: %s" % (self.name, error))
+
+        offsets = [0]
+        for value in self.values:
+            offsets.append(offsets[-1] + len(value))
+        table = struct.pack("<%dQ" % len(offsets), *offsets)
+        return table + b"".join(self.values)
+
+    def describe(self, offset, size):
+        return {"name": self.name, "kind": self.kind, "format": self.format,
+                "offset": offset, "size": size}
+
+class ModelStore(object):
+    """
+    A read-only, memory-mapped file of instances of one model class, see
+    :mod:`modelo.model.store`. Use :meth:`open` to open a file written by
+    :meth:`write`.
+
+    ``store[index]`` makes the instance of a row, and ``store[name]`` (or
+    :meth:`column`) reads a whole column. The instances are made with
+    :meth:`Model.from_trusted`, because the values were valid when they were
+    stored.
+    """
+
+    def __init__(self, model, fp):
+        self.model = model
+        self._fp = fp
+        try:
+            self._map = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+            self.read_header()
+        except Exception:
+            fp.close()
+            raise
+
+    def read_header(self):
+        """
+        Check the header of the file, and make the readers of the columns.
+        """
+        model = self.model
+        if len(self._map) < HEADER.size:
+            raise ValueError("Not a model store file")
+        (magic, version, header_size) = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise ValueError("Not a model store file")
+        if version != VERSION:
+            raise ValueError("Version %d of the model store format isn't supported" % version)
+        header = json.loads(self._map[HEADER.size:HEADER.size + header_size].decode("utf-8"))
+
+        if header["fingerprint"] != get_fingerprint(model):
+            raise SchemaMismatchError("The store was written for another layout of %s" % model.__name__)
+
+        self._length = header["rows"]
+        start = align(HEADER.size + header_size)
+        self._columns = dict([(column["name"], column) for column in header["columns"]])
+        self._readers = []
+        for column in header["columns"]:
+            column["offset"] += start
+            self._readers.append((column["name"], self.make_reader(column)))
+
+    @classmethod
+    def open(cls, path, model):
+        """
+        Open the store file at ``path``, written for the ``model`` class.
+        """
+        return cls(model, open(path, "rb"))
+
+    @staticmethod
+    def write(path, model, records):
+        """
+        Write a store file of ``records``, which are instances of ``model`` or
+        dictionaries that are validated with :meth:`Model.create`.
+
+        :return: the number of rows written
+        """
+        meta = model._meta
+        writers = [ColumnWriter(name, meta.traits[name]) for name in meta.state_names]
+
+        count = 0
+        for record in records:
+            if not isinstance(record, model):
+                record = model.create(record)
+            state = record.__getstate__()
+            for writer in writers:
+                writer.add(state[writer.name])
+            count += 1
+
+        columns = []
+        chunks = []
+        offset = 0
+        for writer in writers:
+            data = writer.get_bytes()
+            columns.append(writer.describe(offset, len(data)))
+            chunks.append(data)
+            chunks.append(b"\0" * (align(len(data)) - len(data)))
+            offset += align(len(data))
+
+        header = json.dumps({
+            "model": model.__name__,
+            "fingerprint": get_fingerprint(model),
+            "rows": count,
+            "columns": columns,
+        }).encode("utf-8")
+        padding = align(HEADER.size + len(header)) - HEADER.size - len(header)
+
+        with open(path, "wb") as fp:
+            fp.write(HEADER.pack(MAGIC, VERSION, len(header)))
+            fp.write(header)
+            fp.write(b"\0" * padding)
+            for chunk in chunks:
+                fp.write(chunk)
+
+        return count
+
+    def make_reader(self, column):
+        """
+        Make the function that reads the value of a column in one row.
+        """
+        data = self._map
+        (kind, format, offset) = (column["kind"], column["format"], column["offset"])
+
+        if kind == "fixed":
+            unpack = struct.Struct("<" + format).unpack_from
+            size = struct.calcsize(format)
+
+            def read(index):
+                return unpack(data, offset + index * size)[0]
+            return read
+
+        # the strings or encoded values follow the table of offsets
+        start = offset + (self._length + 1) * OFFSET.size
+        if kind == "text":
+            def read(index):
+                (begin, end) = OFFSET_PAIR.unpack_from(data, offset + index * OFFSET.size)
+                return data[start + begin:start + end]
+
+            if format is not None:
+                read_bytes = read
+
+                def read(index):
+                    return read_bytes(index).decode(format)
+            return read
+
+        decode = make_codec(self.model._meta.traits[column["name"]], {}).decode
+
+        def read(index):
+            (begin,) = OFFSET.unpack_from(data, offset + index * OFFSET.size)
+            return decode(data, start + begin)[0]
+        return read
+
+    def close(self):
+        self._map.close()
+        self._fp.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self):
+        return self._length
+
+    def __iter__(self):
+        for index in range(self._length):
+            yield self.get_row(index)
+
+    def __getitem__(self, key):
+        """
+        ``store[index]`` is an instance, ``store[start:stop]`` a list of
+        instances and ``store[name]`` a column.
+        """
+        if isinstance(key, py3compat.string_types):
+            return self.column(key)
+        if isinstance(key, slice):
+            return [self.get_row(index) for index in range(*key.indices(self._length))]
+
+        if key < 0:
+            key += self._length
+        if not 0 <= key < self._length:
+            raise IndexError("store index out of range")
+        return self.get_row(key)
+
+    def get_row(self, index):
+        """
+        Make the instance of a row.
+        """
+        return self.model.from_trusted(dict([(name, read(index)) for (name, read) in self._readers]))
+
+    def column(self, name):
+        """
+        Read the values of a trait in every row, without making instances.
+        Int, Float and Bool columns are arrays, like in a :class:`ModelBatch`,
+        and other columns are lists.
+        """
+        try:
+            column = self._columns[name]
+        except KeyError:
+            raise KeyError("The store has no %r column" % name)
+
+        (kind, format, offset) = (column["kind"], column["format"], column["offset"])
+        data = self._map
+        count = self._length
+
+        if kind == "fixed":
+            typecode = ArrayTypecodes.get(format)
+            if typecode is None:
+                return list(struct.unpack_from("<%d%s" % (count, format), data, offset))
+            values = array(typecode)
+            array_extend(values, data[offset:offset + column["size"]])
+            if BIG_ENDIAN:
+                values.byteswap()
+            return values
+
+        offsets = struct.unpack_from("<%dQ" % (count + 1), data, offset)
+        start = offset + (count + 1) * OFFSET.size
+        if kind == "text":
+            values = [data[start + offsets[index]:start + offsets[index + 1]] for index in range(count)]
+            if format is not None:
+                values = [value.decode(format) for value in values]
+            return values
+
+        decode = make_codec(self.model._meta.traits[name], {}).decode
+        return [decode(data, start + offsets[index])[0] for index in range(count)]
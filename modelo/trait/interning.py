@@ -0,0 +1,182 @@
+"""
+Share one object between equal trait values.
+
+A trait with the ``intern`` metadata stores the same object for all of the
+equal values that it is given, instead of one object per value:
+
+``` python
+class Reading(Model):
+    country = field.Unicode(intern=True)
+    unit = field.Instance(Unit, intern=True)
+    tags = field.List(field.Unicode(intern=True))
+```
+
+Equal values are found with an :class:`InternPool`. :meth:`Model.create_many`
+and the JSON readers use a new pool for each load, unless one is already in
+use in the thread, and :func:`interning` uses a pool for a whole block:
+
+``` python
+with interning() as pool:
+    readings = Reading.create_many(records)
+print pool.stats()
+```
+
+Only immutable values are pooled: strings, numbers, tuples and frozensets,
+and instances of frozen models (see :mod:`modelo.model.frozen`). Other values
+are kept as they are. Outside of a pool, native ``str`` values are interned
+with the builtin ``intern``, which doesn't keep them alive.
+"""
+
+import sys
+import threading
+from contextlib import contextmanager
+
+import modelo.trait.py3compat as py3compat
+
+# the pool in use, per thread
+current = threading.local()
+
+#: types of the values that can be pooled, besides frozen models
+PooledTypes = frozenset([bool, int, type(sys.maxsize + 1), float, complex, bytes, str,
+                         py3compat.unicode_type, tuple, frozenset])
+
+def is_frozen_model(value):
+    """
+    Whether the value is an instance of a frozen model class.
+    """
+    return getattr(getattr(type(value), "_meta", None), "frozen", False)
+
+def get_key(value):
+    """
+    Return the key of a value in a pool, which has the types of the elements
+    of tuples and frozensets too, because ``(1, 2) == (1.0, 2.0)``.
+    """
+    kind = type(value)
+    if kind is tuple:
+        return (kind, tuple([get_key(element) for element in value]))
+    elif kind is frozenset:
+        return (kind, frozenset([get_key(element) for element in value]))
+    return (kind, value)
+
+class InternPool(object):
+    """
+    The values that interned traits were given during a load, keyed by type
+    and value so that ``1``, ``1.0`` and ``True`` stay apart, also inside of
+    tuples and frozensets (see :func:`get_key`).
+    """
+
+    def __init__(self):
+        self.values = {}
+        self.lookups = 0
+        self.hits = 0
+        self.saved_bytes = 0
+
+    def intern(self, value):
+        """
+        Return the pooled value that is equal to ``value``, adding it to the
+        pool if there isn't one yet.
+        """
+        if type(value) not in PooledTypes and not is_frozen_model(value):
+            return value
+
+        self.lookups += 1
+        try:
+            pooled = self.values.setdefault(get_key(value), value)
+        except TypeError:
+            # a tuple of unhashable values
+            return value
+
+        if pooled is not value:
+            self.hits += 1
+            self.saved_bytes += self.sizeof(value)
+        return pooled
+
+    def is_pooled(self, value):
+        try:
+            return self.values.get(get_key(value)) is value
+        except TypeError:
+            return False
+
+    def sizeof(self, value):
+        """
+        Estimate the memory used by a value, without the pooled values in it,
+        which stay alive when the value is dropped.
+        """
+        size = sys.getsizeof(value)
+        if type(value) is tuple or type(value) is frozenset:
+            elements = value
+        elif is_frozen_model(value):
+            for name in ("__dict__", "_trait_values"):
+                storage = getattr(value, name, None)
+                if isinstance(storage, dict):
+                    size += sys.getsizeof(storage)
+            elements = [getattr(value, name) for name in value._meta.trait_names]
+        else:
+            return size
+
+        for element in elements:
+            if not self.is_pooled(element):
+                size += self.sizeof(element)
+        return size
+
+    def stats(self):
+        """
+        Return a dict with the number of pooled values, of lookups and of
+        lookups that found an equal value, and an estimate of the bytes saved
+        by the values that were replaced.
+        """
+        return {
+            "values": len(self.values),
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "saved_bytes": self.saved_bytes,
+        }
+
+    def clear(self):
+        self.values.clear()
+
+def get_pool():
+    """
+    Return the pool in use in this thread, or None.
+    """
+    return getattr(current, "pool", None)
+
+@contextmanager
+def interning(pool=None):
+    """
+    Use ``pool`` for the interned traits of this thread until the end of the
+    block. Without a pool, the pool already in use is kept, or a new one is
+    made. The pool is given to the block.
+    """
+    previous = get_pool()
+    if pool is None:
+        pool = previous if previous is not None else InternPool()
+
+    current.pool = pool
+    try:
+        yield pool
+    finally:
+        current.pool = previous
+
+def intern_value(value):
+    """
+    Return the shared object for a value of an interned trait.
+    """
+    pool = getattr(current, "pool", None)
+    if pool is not None:
+        return pool.intern(value)
+    elif type(value) is str:
+        return py3compat.intern_string(value)
+    return value
+
+def make_interned(validator):
+    """
+    Wrap the validator of a trait with the ``intern`` metadata, see
+    :meth:`TraitType.get_validator`.
+    """
+    if validator is None:
+        return lambda obj, value: intern_value(value)
+
+    def validate(obj, value):
+        return intern_value(validator(obj, value))
+    return validate
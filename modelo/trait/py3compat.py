@@ -13,6 +13,8 @@ if sys.version_info[0] >= 3:
 
     def iteritems(d):
         return iter(d.items())
+
+    intern_string = sys.intern
 else:
     PY3 = False
 
@@ -30,10 +32,12 @@ else:
     def iteritems(d):
         return d.iteritems()
 
+    intern_string = intern
+
 iteritems.__doc__ = "An iterator over the (key, value) items of the given dictionary."
 
 def with_metaclass(meta, *bases):
     """
     Create a base class with a metaclass.
     """
-    return meta("_NewBase", bases, ())
+    return meta("_NewBase", bases, {"__slots__": ()})
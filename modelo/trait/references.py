@@ -0,0 +1,227 @@
+"""
+Load the models that ``Ref`` traits refer to, many at a time.
+
+A ``Ref`` trait stores the key of another model, and its loader turns a list
+of keys into those models in one call, for example with one database query:
+
+``` python
+def load_users(keys):
+    return dict((user.id, user) for user in db.users_by_id(keys))
+
+class Post(Model):
+    author = field.Ref(User, loader=load_users)
+```
+
+The keys that ``Ref`` traits are given inside of a :func:`loading` block are
+collected by a :class:`LoadSession`. Reading a reference calls its loader
+once with all of the keys that haven't been loaded yet, so reading the
+authors of 1000 posts makes one call instead of 1000. Each key is only
+loaded once per session, and the session keeps the loaded models:
+
+``` python
+with loading() as session:
+    posts = Post.create_many(records)
+    names = [post.author.name for post in posts]
+```
+
+:meth:`LoadSession.resolve` loads the references of some instances ahead of
+time, including instances that were made without validation (like with
+:meth:`Model.from_trusted`). Loaders can also return awaitables, which
+:meth:`LoadSession.resolve_async` waits for with ``asyncio``:
+
+``` python
+with loading() as session:
+    await session.resolve_async(posts)
+    names = [post.author.name for post in posts]
+```
+
+A loader returns either a mapping of key to model, in which missing keys
+load as None, or a sequence with one model (or None) for each key in order.
+Outside of a :func:`loading` block, a reference is loaded by itself each
+time it is read.
+"""
+
+import threading
+from contextlib import contextmanager
+
+# the session in use, per thread
+current = threading.local()
+
+def is_awaitable(value):
+    return hasattr(value, "__await__")
+
+class LoadSession(object):
+    """
+    The keys to load and the models loaded by each loader, see
+    :mod:`modelo.trait.references`.
+    """
+
+    def __init__(self):
+        #: loaded models, by loader and then by key
+        self.cache = {}
+
+        #: keys waiting to be loaded, by loader, in the order they were seen
+        self.pending = {}
+
+        #: futures of the keys that async loaders are loading, by loader
+        self.loading = {}
+
+        #: number of times that a loader was called
+        self.calls = 0
+
+    def add(self, loader, key):
+        """
+        Remember that ``key`` has to be loaded by ``loader``.
+        """
+        if key in self.cache.get(loader, ()):
+            return
+        keys = self.pending.get(loader)
+        if keys is None:
+            keys = self.pending[loader] = {}
+        # each key is kept once, with the order it was seen in
+        keys.setdefault(key, len(keys))
+
+    def take_pending(self, loader):
+        """
+        Forget the pending keys of a loader. Returns the keys that have to be
+        loaded, and the futures of the keys that are already being loaded.
+        """
+        keys = self.pending.pop(loader, {})
+        keys = sorted(keys, key=keys.get)
+        loading = self.loading.get(loader, {})
+        return ([key for key in keys if key not in loading],
+                set([loading[key] for key in keys if key in loading]))
+
+    def store(self, loader, keys, result):
+        """
+        Keep the models that a loader returned for ``keys``.
+        """
+        cache = self.cache.setdefault(loader, {})
+        if hasattr(result, "get") and hasattr(result, "keys"):
+            for key in keys:
+                cache[key] = result.get(key)
+            return
+
+        result = list(result)
+        if len(result) != len(keys):
+            raise ValueError("The loader returned %d values for %d keys" % (len(result), len(keys)))
+        cache.update(zip(keys, result))
+
+    def load(self, loader):
+        """
+        Call ``loader`` with the pending keys of that loader.
+        """
+        (keys, futures) = self.take_pending(loader)
+        if not keys:
+            return
+        self.calls += 1
+        result = loader(keys)
+        if is_awaitable(result):
+            getattr(result, "close", lambda: None)()
+            raise TypeError("The loader %r is asynchronous, use resolve_async to load its keys" % (loader,))
+        self.store(loader, keys, result)
+
+    def get(self, trait, key):
+        """
+        Return the model that ``key`` refers to, loading it along with the
+        other pending keys of the loader of the trait.
+        """
+        loader = trait.get_loader()
+        cache = self.cache.get(loader)
+        if cache is None or key not in cache:
+            if key in self.loading.get(loader, ()):
+                raise TypeError("The %r reference is still being loaded" % trait.name)
+            self.add(loader, key)
+            self.load(loader)
+            cache = self.cache[loader]
+        return cache[key]
+
+    def collect(self, instances, names=None):
+        """
+        Add the keys of the ``Ref`` traits of model instances, or of the traits
+        in ``names``.
+        """
+        from modelo.trait.trait_types import Ref
+
+        for inst in instances:
+            traits = inst._meta.traits
+            for name in inst._meta.trait_names if names is None else names:
+                trait = traits[name]
+                if isinstance(trait, Ref):
+                    key = trait.get_key(inst)
+                    if key is not None:
+                        self.add(trait.get_loader(), key)
+
+    def resolve(self, instances=(), names=None):
+        """
+        Load the references of ``instances`` that haven't been loaded yet,
+        and all of the other pending keys, with one call per loader.
+        """
+        self.collect(instances, names)
+        for loader in list(self.pending):
+            self.load(loader)
+
+    def resolve_async(self, instances=(), names=None):
+        """
+        Like :meth:`resolve`, for loaders that return awaitables. Returns an
+        ``asyncio`` future that is done when every reference is loaded. Keys
+        that another call is already loading aren't loaded again.
+        """
+        import asyncio
+
+        self.collect(instances, names)
+        futures = set()
+        for loader in list(self.pending):
+            (keys, loading) = self.take_pending(loader)
+            futures.update(loading)
+            if not keys:
+                continue
+
+            self.calls += 1
+            result = loader(keys)
+            if not is_awaitable(result):
+                self.store(loader, keys, result)
+                continue
+
+            future = asyncio.ensure_future(result)
+            loading = self.loading.setdefault(loader, {})
+            for key in keys:
+                loading[key] = future
+            future.add_done_callback(lambda future, loader=loader, keys=keys:
+                                     self.finish(loader, keys, future))
+            futures.add(future)
+
+        return asyncio.gather(*futures)
+
+    def finish(self, loader, keys, future):
+        """
+        Keep the result of an async loader.
+        """
+        loading = self.loading[loader]
+        for key in keys:
+            loading.pop(key, None)
+        if not future.cancelled() and future.exception() is None:
+            self.store(loader, keys, future.result())
+
+def get_session():
+    """
+    Return the load session in use in this thread, or None.
+    """
+    return getattr(current, "session", None)
+
+@contextmanager
+def loading(session=None):
+    """
+    Collect and load the references of this thread in ``session`` until the
+    end of the block. Without a session, the session already in use is kept,
+    or a new one is made. The session is given to the block.
+    """
+    previous = get_session()
+    if session is None:
+        session = previous if previous is not None else LoadSession()
+
+    current.session = session
+    try:
+        yield session
+    finally:
+        current.session = previous
@@ -1,8 +1,15 @@
+import itertools
+
+from modelo.trait.interning import make_interned
 from modelo.trait.util import (
     class_of,
     repr_type,
 )
 
+# Every TraitType instance takes a number from this counter when it is created
+# so that the traits of a class can be ordered by declaration.
+_creation_counter = itertools.count()
+
 class NoDefaultSpecified(object):
     pass
 NoDefaultSpecified = NoDefaultSpecified()
@@ -34,6 +41,15 @@ class TraitType(object):
     default_value = Undefined
     info_text = "any value"
 
+    #: Values of exactly these types are valid, and are returned unchanged by
+    #: the validate method of the class that declares this attribute.
+    exact_types = ()
+
+    def __new__(cls, *args, **kwargs):
+        inst = super(TraitType, cls).__new__(cls)
+        inst._order = next(_creation_counter)
+        return inst
+
     def __init__(self, default_value=NoDefaultSpecified, **metadata):
         """
         Create a TraitType.
@@ -67,19 +83,66 @@ class TraitType(object):
         """
         self.set_default_value(obj)
 
-    def _validate(self, obj, value):
+    def get_validator(self):
+        """
+        Return the function that validates values for this trait, as a
+        callable taking ``(obj, value)``, or None if any value is accepted.
+
+        The validation hooks (``validate``, ``is_valid_for`` and ``value_for``)
+        are looked up once here instead of on every assignment. Traits with
+        the ``intern`` metadata also share equal values, see
+        :mod:`modelo.trait.interning`.
+        """
         if hasattr(self, "validate"):
-            return self.validate(obj, value)
+            validator = self.validate
         elif hasattr(self, "is_valid_for"):
-            valid = self.is_valid_for(value)
-            if valid:
-                return value
-            else:
-                raise TraitError("invalid value for type: %r".format(value))
+            is_valid_for = self.is_valid_for
+            def validator(obj, value):
+                if is_valid_for(value):
+                    return value
+                raise TraitError("invalid value for type: %r" % (value,))
         elif hasattr(self, "value_for"):
-            return self.value_for(value)
+            value_for = self.value_for
+            validator = lambda obj, value: value_for(value)
         else:
+            validator = None
+
+        if self.get_metadata("intern"):
+            validator = make_interned(validator)
+        return validator
+
+    def get_exact_types(self):
+        """
+        Return the :attr:`exact_types` of this trait, or an empty tuple when
+        they don't apply because a subclass customized the validation.
+
+        Values of these types can be stored without calling the validator.
+        """
+        if self.get_metadata("intern"):
+            # the values have to go through the pool
+            return ()
+        for klass in type(self).__mro__:
+            if "validate" in klass.__dict__:
+                return klass.__dict__.get("exact_types", ())
+            if "exact_types" in klass.__dict__:
+                break
+        return ()
+
+    def _validate(self, obj, value):
+        try:
+            validator = self._validator
+        except AttributeError:
+            validator = self._validator = self.get_validator()
+
+        if validator is None:
             return value
+        return validator(obj, value)
+
+    def info(self):
+        """
+        Returns a description of the trait.
+        """
+        return self.info_text
 
     def error(self, obj, value):
         if obj is not None:
@@ -93,6 +156,26 @@ class TraitType(object):
     def get_default_value(self):
         return self.default_value
 
+    def find_dynamic_default(self, klass):
+        """
+        Find the deferred initializer (a ``_<name>_default`` method) for this
+        trait on the given :class:`Model` class, or None if there isn't one.
+
+        Only the classes between ``klass`` and the class that declared the
+        trait (inclusive) are searched. This is called once per class by
+        :class:`ModelOptions` when the trait table is built.
+        """
+        mro = klass.mro()
+        this_class = getattr(self, "this_class", klass)
+        if this_class in mro:
+            mro = mro[:mro.index(this_class)+1]
+
+        meth_name = "_%s_default" % self.name
+        for cls in mro:
+            if meth_name in cls.__dict__:
+                return cls.__dict__[meth_name]
+        return None
+
     def set_default_value(self, obj):
         """
         Set the default value on a per instance instance basis.
@@ -102,13 +185,9 @@ class TraitType(object):
         be delayed until the parent :class:`Model` class has been instantiated.
         """
         # Check for a deferred initializer defined in the same class as the
-        # trait declaration or above.
-        mro = type(obj).mro()
-        meth_name = "_%s_default".format(self.name)
-        for cls in mro[:mro.index(self.this_class)+1]:
-            if meth_name in cls.__dict__:
-                break
-        else:
+        # trait declaration or above. These are resolved once per class.
+        initializer = type(obj)._meta.dynamic_defaults.get(self.name)
+        if initializer is None:
             # didn't find one, do static initialization
             default_value = self.get_default_value()
             new_default_value = self._validate(obj, default_value)
@@ -116,7 +195,7 @@ class TraitType(object):
             return
 
         # complete the dynamic initialization
-        obj._trait_dyn_inits[self.name] = cls.__dict__[meth_name]
+        obj._trait_dyn_inits[self.name] = initializer
 
     def get_metadata(self, key):
         return getattr(self, "_metadata", {}).get(key, None)
@@ -128,10 +207,10 @@ class TraitType(object):
         """
         Get the value of the trait by self.name for the instance.
 
-        Default values are instantiated when :meth:`Model.__new__` is called.
-        Thus by the time this method gets called either the default value or a
-        user defined value (they called :meth:`__set__`) is in the
-        :class:`Model` instance.
+        Immutable default values are set when :meth:`Model.__new__` is called.
+        Other default values (new containers or instances) are only made when
+        the trait is first read without having been set, which is done here,
+        as is calling the dynamic initializer of the trait if it has one.
         """
         if obj is None:
             return self
@@ -147,8 +226,13 @@ class TraitType(object):
                     obj._trait_values[self.name] = value
                     return value
                 else:
-                    raise TraitError("Unexpected error in TraitType: "
-                    "both default value and dynamic initializer are absent.")
+                    # make the default value now that it is needed
+                    self.instance_init(obj)
+                    try:
+                        return obj._trait_values[self.name]
+                    except KeyError:
+                        raise TraitError("Unexpected error in TraitType: "
+                        "both default value and dynamic initializer are absent.")
             except Exception:
                 # Model should call set_default_value to populate this. So this
                 # should never be reached. Model calls set_default_value by
@@ -160,6 +244,6 @@ class TraitType(object):
 
     def __set__(self, obj, value):
         new_value = self._validate(obj, value)
-        old_value = self.__get__(obj)
+        # change notifications are sent by the __setattr__ of observed model
+        # classes, see modelo.model.observe
         obj._trait_values[self.name] = new_value
-        # trigger trait change notification stuff here
@@ -6,6 +6,7 @@ import inspect
 import re
 import types
 
+from array import array
 from types import (
     FunctionType,
     MethodType,
@@ -22,14 +23,29 @@ except:
 
 SequenceTypes = (list, tuple, set, frozenset)
 
+try:
+    array("q")
+    INT_TYPECODE = "q"
+except ValueError:
+    # python 2 has no "long long" arrays
+    INT_TYPECODE = "l"
+
 import modelo.trait.py3compat as py3compat
 
 from modelo.trait.util import (
     class_of,
     import_item,
+    repr_type,
 )
 
-from modelo.trait.trait_type import TraitType
+from modelo.trait.trait_type import (
+    TraitType,
+    TraitError,
+)
+from modelo.trait.references import (
+    LoadSession,
+    get_session,
+)
 
 def is_trait(maybe_trait):
     """
@@ -222,8 +238,13 @@ class Instance(ClassBasedTraitType):
 
         if isinstance(value, self.klass):
             return value
-        else:
-            self.error(obj, value)
+
+        # views of the containers of forked models are assigned as a copy,
+        # see modelo.model.sharing
+        unshare = getattr(value, "unshare", None)
+        if unshare is not None:
+            return self.validate(obj, unshare())
+        self.error(obj, value)
 
     def info(self):
         if isinstance(self.klass, py3compat.string_types):
@@ -280,6 +301,144 @@ class This(ClassBasedTraitType):
         else:
             self.error(obj, value)
 
+class Ref(ClassBasedTraitType):
+    """
+    A trait that refers to an instance of another model by its key. The key
+    is stored, and reading the trait returns the model, which the ``loader``
+    loads together with the other pending keys of the same load session, see
+    :mod:`modelo.trait.references`. A model that is assigned is stored as it
+    is and read back without the loader, and only its key is dumped. As the
+    element trait of a container, the key of a model is stored.
+    """
+
+    def __init__(self, klass, loader=None, key=None, key_name="id", allow_none=True, **metadata):
+        """
+        Construct a Ref trait.
+
+        Parameters
+        ----------
+        klass : class, str
+            The model class that is referred to. Class names can also be
+            specified as strings, like 'foo.bar.Bar'.
+        loader : callable
+            Called with a list of keys, returns a mapping of key to model or
+            a sequence of models in the order of the keys, or an awaitable of
+            either.
+        key : trait
+            Validates the keys, if given.
+        key_name : str
+            The attribute of the model that is its key.
+        allow_none : bool
+            Indicates whether None is allowed as a value.
+        """
+        if not (inspect.isclass(klass) or isinstance(klass, py3compat.string_types)):
+            raise TraitError("The klass argument must be a class you gave: %r" % klass)
+        if loader is not None and not callable(loader):
+            raise TraitError("The loader of a Ref trait must be callable, not %s" % repr_type(loader))
+
+        self.klass = klass
+        self.loader = loader
+        self.key_name = key_name
+        self._allow_none = allow_none
+        self._key_trait = None
+        if key is not None:
+            self._key_trait = key() if isinstance(key, type) else key
+            self._key_trait.name = "key"
+
+        super(Ref, self).__init__(None, **metadata)
+
+    def validate(self, obj, value):
+        """
+        Return the model or the key to store. Inside of a load session, a key
+        is added to the keys to load, and an assigned model is kept as the
+        loaded model of its key.
+        """
+        if value is None:
+            if self._allow_none:
+                return value
+            self.error(obj, value)
+
+        self._resolve_classes()
+        session = get_session()
+        if isinstance(value, self.klass):
+            key = getattr(value, self.key_name)
+            if session is not None and self.loader is not None:
+                session.cache.setdefault(self.loader, {})[key] = value
+            # only the traits of a model class are read through __get__,
+            # the element traits of containers aren't bound to one
+            return value if hasattr(self, "this_class") else key
+
+        if hasattr(type(value), "_meta"):
+            # a model of another class
+            self.error(obj, value)
+        if self._key_trait is not None:
+            try:
+                value = self._key_trait._validate(obj, value)
+            except TraitError:
+                self.error(obj, value)
+        try:
+            hash(value)
+        except TypeError:
+            # keys are looked up in the models that were loaded
+            self.error(obj, value)
+        if session is not None and self.loader is not None:
+            session.add(self.loader, value)
+        return value
+
+    def info(self):
+        if isinstance(self.klass, py3compat.string_types):
+            klass = self.klass
+        else:
+            klass = self.klass.__name__
+        result = "a reference to " + class_of(klass)
+        if self._allow_none:
+            return result + " or None"
+        return result
+
+    def instance_init(self, obj):
+        self._resolve_classes()
+        super(Ref, self).instance_init(obj)
+
+    def _resolve_classes(self):
+        if isinstance(self.klass, py3compat.string_types):
+            self.klass = import_item(self.klass)
+
+    def get_loader(self):
+        if self.loader is None:
+            raise TraitError("The '%s' trait has no loader" % self.name)
+        return self.loader
+
+    def to_key(self, value):
+        """
+        Return the key of a stored value, which is a model when one was
+        assigned.
+        """
+        self._resolve_classes()
+        if value is not None and isinstance(value, self.klass):
+            return getattr(value, self.key_name)
+        return value
+
+    def get_key(self, obj):
+        """
+        Return the key of the trait on a model instance, without loading the
+        model.
+        """
+        return self.to_key(super(Ref, self).__get__(obj))
+
+    def __get__(self, obj, cls=None):
+        value = super(Ref, self).__get__(obj, cls)
+        if obj is None or value is None:
+            return value
+        self._resolve_classes()
+        if isinstance(value, self.klass):
+            # an assigned model
+            return value
+        session = get_session()
+        if session is None:
+            # loaded by itself, and not kept
+            session = LoadSession()
+        return session.get(self, value)
+
 class Any(TraitType):
     default_value = None
     info_text = "any value"
@@ -291,6 +450,7 @@ class Int(TraitType):
 
     default_value = 0
     info_text = "an int"
+    exact_types = (int,)
 
     def validate(self, obj, value):
         if isinstance(value, int):
@@ -315,6 +475,7 @@ else:
 
         default_value = 0
         info_text = 'a long'
+        exact_types = (long,)
 
         def validate(self, obj, value):
             if isinstance(value, long):
@@ -340,6 +501,7 @@ else:
 
         default_value = 0
         info_text = 'an integer'
+        exact_types = (int,)
 
         def validate(self, obj, value):
             if isinstance(value, int):
@@ -360,6 +522,7 @@ class Float(TraitType):
 
     default_value = 0.0
     info_text = 'a float'
+    exact_types = (float,)
 
     def validate(self, obj, value):
         if isinstance(value, float):
@@ -382,6 +545,7 @@ class Complex(TraitType):
 
     default_value = 0.0 + 0.0j
     info_text = 'a complex number'
+    exact_types = (complex,)
 
     def validate(self, obj, value):
         if isinstance(value, complex):
@@ -407,6 +571,7 @@ class Bytes(TraitType):
 
     default_value = b''
     info_text = 'a bytes object'
+    exact_types = (bytes,)
 
     def validate(self, obj, value):
         if isinstance(value, bytes):
@@ -427,6 +592,7 @@ class Unicode(TraitType):
 
     default_value = u''
     info_text = 'a unicode string'
+    exact_types = (py3compat.unicode_type,)
 
     def validate(self, obj, value):
         if isinstance(value, py3compat.unicode_type):
@@ -493,6 +659,7 @@ class Bool(TraitType):
 
     default_value = False
     info_text = 'a boolean'
+    exact_types = (bool,)
 
     def validate(self, obj, value):
         if isinstance(value, bool):
@@ -508,22 +675,94 @@ class CBool(Bool):
         except:
             self.error(obj, value)
 
+class EnumCode(int):
+    """
+    The index of a value of an :class:`Enum` trait with coded storage, which
+    is what instances store for the trait. It is a type of its own so that
+    stored codes can't be mistaken for values.
+    """
+
+    __slots__ = ()
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
 class Enum(TraitType):
-    """An enum that whose value must be in a given sequence."""
+    """An enum that whose value must be in a given sequence.
+
+    The values are put in a lookup table when the trait is created, so that
+    validation doesn't scan them. With ``coded=True`` instances store the
+    index of their value (an :class:`EnumCode`) instead of the value, and the
+    value is looked up when the trait is read or dumped.
+    """
 
-    def __init__(self, values, default_value=None, allow_none=True, **metadata):
+    def __new__(cls, *args, **kwargs):
+        if kwargs.get("coded") and not issubclass(cls, CodedEnumStorage):
+            cls = coded_class(cls)
+        return super(Enum, cls).__new__(cls, *args, **kwargs)
+
+    def __init__(self, values, default_value=None, allow_none=True, coded=False, **metadata):
+        self.coded = coded
         self.values = values
         self._allow_none = allow_none
         super(Enum, self).__init__(default_value, **metadata)
 
+    @property
+    def values(self):
+        return self._values
+
+    @values.setter
+    def values(self, values):
+        self._values = values
+        self._sequence = list(values)
+        self._codes = tuple([EnumCode(index) for index in range(len(self._sequence))])
+
+        # unhashable values can only be compared one by one
+        self._lookup = {}
+        self._unhashable = []
+        for (index, value) in enumerate(self._sequence):
+            try:
+                self._lookup.setdefault(self.lookup_key(value), index)
+            except TypeError:
+                self._unhashable.append((value, index))
+
+    def lookup_key(self, value):
+        """
+        Return the key of a value in the lookup table.
+        """
+        return value
+
+    def index(self, value):
+        """
+        Return the index of a value in :attr:`values`, or -1.
+        """
+        try:
+            index = self._lookup.get(self.lookup_key(value))
+        except TypeError:
+            return next((index for (index, element) in enumerate(self._sequence)
+                         if element == value), -1)
+
+        if index is not None:
+            return index
+        for (element, index) in self._unhashable:
+            if element == value:
+                return index
+        return -1
+
     def validate(self, obj, value):
         if value is None:
             if self._allow_none:
                 return value
 
-        if value in self.values:
-            return value
-        self.error(obj, value)
+        index = self.index(value)
+        if index < 0:
+            self.error(obj, value)
+        if self.coded:
+            return self._codes[index]
+        return value
 
     def info(self):
         """ Returns a description of the trait."""
@@ -535,6 +774,9 @@ class Enum(TraitType):
 class CaselessStrEnum(Enum):
     """An enum of strings that are caseless in validate."""
 
+    def lookup_key(self, value):
+        return value.lower()
+
     def validate(self, obj, value):
         if value is None:
             if self._allow_none:
@@ -543,10 +785,54 @@ class CaselessStrEnum(Enum):
         if not isinstance(value, py3compat.string_types):
             self.error(obj, value)
 
-        for v in self.values:
-            if v.lower() == value.lower():
-                return v
-        self.error(obj, value)
+        index = self.index(value)
+        if index < 0:
+            self.error(obj, value)
+        if self.coded:
+            return self._codes[index]
+        return self._sequence[index]
+
+class CodedEnumStorage(object):
+    """
+    Mixin of the :class:`Enum` traits with ``coded=True``, which decodes the
+    stored codes when the trait is read.
+    """
+
+    def decode(self, value):
+        """
+        Return the value of a stored code. Other values are returned as they
+        are.
+        """
+        if type(value) is EnumCode:
+            return self._sequence[value]
+        return value
+
+    def __get__(self, obj, cls=None):
+        value = super(CodedEnumStorage, self).__get__(obj, cls)
+        if obj is None:
+            return value
+        return self.decode(value)
+
+def check_element_trait(container, trait):
+    """
+    Raise if a trait can't validate the elements, keys or values of a
+    container trait. Coded enums only decode their codes when they are read
+    as an attribute of a model, so the codes would end up in the container.
+    """
+    if isinstance(trait, CodedEnumStorage):
+        raise TypeError("A coded Enum can't be the %s trait of %s, use coded=False"
+                        % (trait.name, class_of(container.__class__.__name__)))
+
+# coded subclasses of the Enum classes, see coded_class
+_coded_classes = {}
+
+def coded_class(cls):
+    """
+    Return the subclass of an :class:`Enum` class that stores codes.
+    """
+    if cls not in _coded_classes:
+        _coded_classes[cls] = type("Coded%s" % cls.__name__, (CodedEnumStorage, cls), {})
+    return _coded_classes[cls]
 
 class Container(Instance):
     """An instance of a container (list, set, etc.)
@@ -605,6 +891,7 @@ class Container(Instance):
         if is_trait(trait):
             self._trait = trait() if isinstance(trait, type) else trait
             self._trait.name = 'element'
+            check_element_trait(self, self._trait)
         elif trait is not None:
             raise TypeError("`trait` must be a Trait or None, got %s"%repr_type(trait))
 
@@ -626,12 +913,20 @@ class Container(Instance):
         return value
 
     def validate_elements(self, obj, value):
-        validated = []
         if self._trait is None or isinstance(self._trait, Any):
             return value
+
+        # When every element already has one of the exact types of the element
+        # trait, the container is valid as it is. The types are checked in one
+        # go instead of calling the element validator for each element.
+        exact_types = self._trait.get_exact_types()
+        if exact_types and type(value) is self.klass and set(map(type, value)) <= set(exact_types):
+            return value
+
+        validated = []
         for v in value:
             try:
-                v = self._trait.validate(obj, v)
+                v = self._trait._validate(obj, v)
             except TraitError:
                 self.element_error(obj, v, self._trait)
             else:
@@ -764,6 +1059,7 @@ class Tuple(Container):
         for trait in traits:
             t = trait() if isinstance(trait, type) else trait
             t.name = 'element'
+            check_element_trait(self, t)
             self._traits.append(t)
 
         if self._traits and default_value is None:
@@ -784,22 +1080,243 @@ class Tuple(Container):
         validated = []
         for t, v in zip(self._traits, value):
             try:
-                v = t.validate(obj, v)
+                v = t._validate(obj, v)
             except TraitError:
                 self.element_error(obj, v, t)
             else:
                 validated.append(v)
         return tuple(validated)
 
+class IntArray(Instance):
+    """
+    An ``array.array`` of integers. Lists and tuples of integers are converted,
+    and arrays with the right typecode are used as they are. An array takes
+    much less memory than a list of the same numbers.
+    """
+
+    typecode = INT_TYPECODE
+    info_text = "an array of integers"
+
+    def __init__(self, default_value=None, allow_none=True, **metadata):
+        if default_value is None:
+            args = (self.typecode,)
+        elif isinstance(default_value, SequenceTypes + (array,)):
+            args = (self.typecode, default_value)
+        else:
+            raise TypeError('default value of %s was %s' % (self.__class__.__name__, default_value))
+
+        super(IntArray, self).__init__(klass=array, args=args,
+                                       allow_none=allow_none, **metadata)
+
+    def validate(self, obj, value):
+        if value is None:
+            if self._allow_none:
+                return value
+            self.error(obj, value)
+
+        if type(value) is array and value.typecode == self.typecode:
+            return value
+        if isinstance(value, SequenceTypes + (array,)):
+            try:
+                return array(self.typecode, value)
+            except (TypeError, ValueError, OverflowError):
+                pass
+        self.error(obj, value)
+
+    def info(self):
+        result = self.info_text
+        if self._allow_none:
+            return result + ' or None'
+        return result
+
+class FloatArray(IntArray):
+    """
+    An ``array.array`` of floats. Integers are converted to floats.
+    """
+
+    typecode = "d"
+    info_text = "an array of floats"
+
+class NDArray(TraitType):
+    """
+    A numpy array with an optional dtype and shape.
+
+    Values are checked as a whole: numpy arrays with the right dtype are used
+    as they are, objects that support the buffer protocol (``bytearray``,
+    ``memoryview``, ``array.array`` on python 3) are wrapped without a copy
+    when their item type is the dtype, and other values are converted with
+    one vectorized cast. Only casts that keep the kind of the values (like
+    int to float) are allowed, and narrowing casts only when every value
+    fits in the dtype.
+
+    ``shape`` is a tuple of sizes, where None accepts any size. The default
+    value is None, or a new array made from ``default_value`` for each
+    instance. numpy is only imported when the trait gets an array.
+    """
+
+    info_text = "an array"
+
+    def __init__(self, dtype=None, shape=None, default_value=None, allow_none=True, **metadata):
+        self._dtype = dtype
+        self._shape = None if shape is None else tuple(shape)
+        self._allow_none = allow_none
+
+        if hasattr(default_value, "tolist"):
+            # each instance gets its own array
+            default_value = default_value.tolist()
+        super(NDArray, self).__init__(default_value, **metadata)
+
+    def get_dtype(self):
+        """
+        Return the numpy dtype of the trait, or None if any dtype is accepted.
+        """
+        dtype = self._dtype
+        if dtype is not None and not isinstance(dtype, import_numpy().dtype):
+            dtype = self._dtype = import_numpy().dtype(dtype)
+        return dtype
+
+    def validate(self, obj, value):
+        if value is None:
+            if self._allow_none:
+                return value
+            self.error(obj, value)
+
+        numpy = import_numpy()
+        dtype = self.get_dtype()
+
+        if not isinstance(value, numpy.ndarray):
+            value = self.to_array(obj, value, numpy)
+
+        if value.dtype.kind == "O" and (dtype is None or dtype.kind != "O"):
+            # ragged lists, or elements that aren't numbers
+            self.error(obj, value)
+
+        if dtype is not None and value.dtype != dtype:
+            if not numpy.can_cast(value.dtype, dtype, casting="same_kind"):
+                self.error(obj, value)
+            value = self.cast(obj, value, dtype, numpy)
+
+        shape = self._shape
+        if shape is not None:
+            if value.ndim != len(shape) or any(expected is not None and expected != size
+                                               for (expected, size) in zip(shape, value.shape)):
+                self.error(obj, value)
+
+        return value
+
+    def cast(self, obj, value, dtype, numpy):
+        """
+        Cast an array to the dtype. Narrowing casts are checked, so that
+        integers that don't fit and floats that become infinite are errors
+        instead of being wrapped or rounded silently.
+        """
+        if numpy.can_cast(value.dtype, dtype, casting="safe"):
+            return value.astype(dtype)
+
+        with numpy.errstate(over="ignore", invalid="ignore"):
+            converted = value.astype(dtype)
+        if dtype.kind in "iub":
+            lost = not numpy.array_equal(converted, value)
+        else:
+            lost = bool((numpy.isinf(converted) & ~numpy.isinf(value)).any())
+        if lost:
+            self.error(obj, value)
+        return converted
+
+    def to_array(self, obj, value, numpy):
+        """
+        Make an array of a value that isn't one, without copying buffers.
+        """
+        try:
+            if isinstance(value, (list, tuple)):
+                return numpy.asarray(value)
+            elif isinstance(value, array):
+                # array.array has no buffer protocol on python 2
+                return numpy.frombuffer(value, dtype=value.typecode)
+            elif hasattr(value, "__array_interface__") or hasattr(value, "__array__"):
+                return numpy.asarray(value)
+            # a view of the buffer, in its own item type
+            return numpy.asarray(memoryview(value))
+        except (TypeError, ValueError):
+            self.error(obj, value)
+
+    def info(self):
+        result = self.info_text
+        if self._dtype is not None:
+            result += " of %s" % self.get_dtype()
+        if self._shape is not None:
+            result += " with shape %r" % (self._shape,)
+        if self._allow_none:
+            result += " or None"
+        return result
+
+    def error(self, obj, value):
+        if obj is not None:
+            err = "The \"%s\" trait of %s instance must be %s, but a value of %s was specified."
+            err = err % (self.name, class_of(obj), self.info(), describe_array(value))
+        else:
+            err = "The \"%s\" trait must be %s, but a value of %s was specified."
+            err = err % (self.name, self.info(), describe_array(value))
+        raise TraitError(err)
+
+def import_numpy():
+    """
+    Import numpy for the :class:`NDArray` trait, so that modelo itself doesn't
+    depend on it.
+    """
+    import numpy
+    return numpy
+
+def is_ndarray(value):
+    """
+    Whether the value is a numpy array, without importing numpy.
+    """
+    numpy = sys.modules.get("numpy")
+    return numpy is not None and isinstance(value, numpy.ndarray)
+
+def describe_array(value):
+    """
+    Describe an invalid value for an :class:`NDArray` error message, without
+    the repr of a possibly huge array.
+    """
+    if hasattr(value, "dtype") and hasattr(value, "shape"):
+        return "an array of %s with shape %r" % (value.dtype, value.shape)
+    return repr_type(value)
+
 class Dict(Instance):
     """An instance of a Python dict."""
 
-    def __init__(self, default_value=None, allow_none=True, **metadata):
+    _key_trait = None
+    _value_trait = None
+
+    def __init__(self, key_trait=None, value_trait=None, default_value=None,
+                 allow_none=True, **metadata):
         """Create a dict trait type from a dict.
 
         The default value is created by doing ``dict(default_value)``,
         which creates a copy of the ``default_value``.
+
+        ``key_trait`` and ``value_trait`` can be specified, which restrict the
+        types of the keys and of the values of the dict.
+
+        If the first arg is not a Trait, the positional args are taken the
+        old way, as ``default_value`` and ``allow_none``:
+
+        ``d = Dict({"a": 1})``
+
+        ``d = Dict(None, False)``
+
+        That form is deprecated, pass ``default_value`` and ``allow_none`` by
+        name instead.
         """
+        # allow Dict({...}) and Dict(default_value, allow_none):
+        if not is_trait(key_trait) and (value_trait is None or isinstance(value_trait, bool)):
+            if default_value is None:
+                default_value = key_trait
+            if value_trait is not None:
+                allow_none = value_trait
+            (key_trait, value_trait) = (None, None)
+
         if default_value is None:
             args = ((),)
         elif isinstance(default_value, dict):
@@ -809,9 +1326,79 @@ class Dict(Instance):
         else:
             raise TypeError('default value of Dict was %s' % default_value)
 
+        for (name, trait) in (("key", key_trait), ("value", value_trait)):
+            if is_trait(trait):
+                trait = trait() if isinstance(trait, type) else trait
+                trait.name = name
+                check_element_trait(self, trait)
+                if not isinstance(trait, Any):
+                    setattr(self, "_%s_trait" % name, trait)
+            elif trait is not None:
+                raise TypeError("`%s_trait` must be a Trait or None, got %s" % (name, repr_type(trait)))
+
         super(Dict, self).__init__(klass=dict, args=args,
                                   allow_none=allow_none, **metadata)
 
+    def validate(self, obj, value):
+        value = super(Dict, self).validate(obj, value)
+        if value is None:
+            return value
+
+        return self.validate_items(obj, value)
+
+    def validate_items(self, obj, value):
+        key_trait = self._key_trait
+        value_trait = self._value_trait
+        if key_trait is None and value_trait is None:
+            return value
+
+        # When all of the keys and values already have one of the exact types
+        # of their traits, the dict is valid as it is.
+        if type(value) is dict:
+            if key_trait is None:
+                valid_keys = True
+            else:
+                exact_types = key_trait.get_exact_types()
+                valid_keys = exact_types and set(map(type, value)) <= set(exact_types)
+            if valid_keys:
+                if value_trait is None:
+                    return value
+                exact_types = value_trait.get_exact_types()
+                if exact_types and set(map(type, value.values())) <= set(exact_types):
+                    return value
+
+        validated = {}
+        for (key, element) in py3compat.iteritems(value):
+            validated[self.validate_key(obj, key)] = self.validate_value(obj, element)
+        return validated
+
+    def validate_key(self, obj, key):
+        """
+        Validate one key of the dict.
+        """
+        if self._key_trait is None:
+            return key
+        try:
+            return self._key_trait._validate(obj, key)
+        except TraitError:
+            self.item_error(obj, "Key", key, self._key_trait)
+
+    def validate_value(self, obj, value):
+        """
+        Validate one value of the dict.
+        """
+        if self._value_trait is None:
+            return value
+        try:
+            return self._value_trait._validate(obj, value)
+        except TraitError:
+            self.item_error(obj, "Value", value, self._value_trait)
+
+    def item_error(self, obj, kind, item, validator):
+        e = "%s of the '%s' trait of %s instance must be %s, but a value of %s was specified." \
+            % (kind, self.name, class_of(obj), validator.info(), repr_type(item))
+        raise TraitError(e)
+
 class CRegExp(TraitType):
     """A casting compiled regular expression trait.
 
@@ -0,0 +1,137 @@
+import json
+import unittest
+from array import array
+
+try:
+    from cStringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+from modelo.model.model import Model
+from modelo.trait.trait_type import TraitError
+import modelo.trait.trait_types as field
+
+class Series(Model):
+    ints = field.List(field.Int)
+    floats = field.List(field.Float)
+    names = field.List(field.Unicode)
+    codes = field.Set(field.Int)
+    counts = field.IntArray()
+    weights = field.FloatArray([1.0])
+    maybe = field.IntArray(allow_none=False)
+
+class FrozenSeries(Model):
+    counts = field.IntArray()
+
+    class Meta:
+        frozen = True
+
+class ContainerTests(unittest.TestCase):
+    def test_valid_list_is_kept(self):
+        """
+        A list whose elements are all valid is used as it is.
+        """
+        values = [1, 2, 3]
+        series = Series.create({"ints": values})
+        self.assertTrue(series.ints is values)
+
+        series.floats = values = [1.0, 2.0]
+        self.assertTrue(series.floats is values)
+
+        series.names = values = [u"a", u"b"]
+        self.assertTrue(series.names is values)
+
+        series.codes = values = set([1, 2])
+        self.assertTrue(series.codes is values)
+
+    def test_converted_elements(self):
+        """
+        Elements that need converting make a new list.
+        """
+        values = [1.0, 2]
+        series = Series.create({"floats": values})
+        self.assertEqual(series.floats, [1.0, 2.0])
+        self.assertTrue(type(series.floats[1]) is float)
+        self.assertFalse(series.floats is values)
+
+        series.names = [u"a", b"b"]
+        self.assertEqual(series.names, [u"a", u"b"])
+
+    def test_invalid_elements(self):
+        self.assertRaises(TraitError, Series.create, {"ints": [1, u"a"]})
+        self.assertRaises(TraitError, Series.create, {"floats": [1.0, None]})
+        self.assertRaises(TraitError, Series.create, {"codes": set([1, u"a"])})
+
+    def test_bools(self):
+        """
+        Bools are ints, but aren't of the exact type.
+        """
+        series = Series.create({"ints": [1, True]})
+        self.assertEqual(series.ints, [1, True])
+
+    def test_list_subclass(self):
+        class Values(list):
+            pass
+        values = Values([1, 2])
+        series = Series.create({"ints": values})
+        self.assertEqual(series.ints, [1, 2])
+        self.assertTrue(type(series.ints) is list)
+
+class ArrayTests(unittest.TestCase):
+    def test_defaults(self):
+        series = Series()
+        self.assertEqual(series.counts, array(field.INT_TYPECODE))
+        self.assertEqual(series.weights, array("d", [1.0]))
+        self.assertFalse(Series().weights is series.weights)
+
+    def test_lists_are_converted(self):
+        series = Series.create({"counts": [1, 2, 3], "weights": (1, 2.5)})
+        self.assertTrue(isinstance(series.counts, array))
+        self.assertEqual(series.counts.typecode, field.INT_TYPECODE)
+        self.assertEqual(series.counts.tolist(), [1, 2, 3])
+        self.assertEqual(series.weights.typecode, "d")
+        self.assertEqual(series.weights.tolist(), [1.0, 2.5])
+
+    def test_arrays_are_kept(self):
+        values = array(field.INT_TYPECODE, [1, 2])
+        series = Series.create({"counts": values})
+        self.assertTrue(series.counts is values)
+
+        series.counts = array("b", [1, 2])
+        self.assertEqual(series.counts.typecode, field.INT_TYPECODE)
+
+    def test_invalid_values(self):
+        self.assertRaises(TraitError, Series.create, {"counts": [1.5]})
+        self.assertRaises(TraitError, Series.create, {"counts": [u"a"]})
+        self.assertRaises(TraitError, Series.create, {"counts": b"abcdefgh"})
+        self.assertRaises(TraitError, Series.create, {"counts": 1})
+        self.assertRaises(TraitError, Series.create, {"weights": [u"a"]})
+        self.assertRaises(TraitError, Series.create, {"counts": [2 ** 80]})
+        self.assertRaises(TraitError, Series.create, {"maybe": None})
+        self.assertEqual(Series.create({"counts": None}).counts, None)
+
+    def test_create_many(self):
+        series = Series.create_many([{"counts": [1]}, {"counts": [2, 3]}])
+        self.assertEqual([each.counts.tolist() for each in series], [[1], [2, 3]])
+
+    def test_to_dict(self):
+        series = Series.create({"counts": [1, 2], "weights": [0.5]})
+        result = series.to_dict(include=["counts", "weights"])
+        self.assertEqual(result, {"counts": [1, 2], "weights": [0.5]})
+        self.assertTrue(type(result["counts"]) is list)
+
+        fp = StringIO()
+        series.dump_json(fp)
+        self.assertEqual(json.loads(fp.getvalue())["counts"], [1, 2])
+
+    def test_frozen(self):
+        """
+        Frozen models keep arrays as tuples.
+        """
+        series = FrozenSeries.create({"counts": [1, 2]})
+        self.assertEqual(series.counts, (1, 2))
+        self.assertEqual(series.to_dict(), {"counts": [1, 2]})
+        self.assertEqual(hash(series), hash(FrozenSeries.create({"counts": [1, 2]})))
+
+if __name__ == "__main__":
+    unittest.main()
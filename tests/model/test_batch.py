@@ -0,0 +1,141 @@
+import unittest
+from array import array
+
+from modelo.model.model import Model
+from modelo.model.batch import (
+    ModelBatch,
+    BatchRow,
+)
+from modelo.trait.trait_type import TraitError
+import modelo.trait.trait_types as field
+
+class BatchTests(unittest.TestCase):
+    def setUp(self):
+        class Part(Model):
+            name = field.Unicode()
+
+        class Reading(Model):
+            label = field.Unicode()
+            count = field.Int()
+            value = field.Float()
+            valid = field.Bool()
+            tags = field.List(field.Unicode)
+            part = field.Instance(Part)
+
+        self.part_class = Part
+        self.reading_class = Reading
+
+        self.records = [
+            {"label": u"a", "count": 1, "value": 0.5, "valid": True},
+            {"label": u"b", "count": 2, "tags": [u"x"]},
+            {"label": u"c", "count": 3, "value": 2, "part": Part(name=u"p")},
+        ]
+
+    def test_columns(self):
+        """
+        Int, Float and Bool columns are arrays, the rest are lists.
+        """
+        batch = ModelBatch(self.reading_class, self.records)
+
+        self.assertEqual(len(batch), 3)
+        self.assertTrue(isinstance(batch.column("count"), array))
+        self.assertTrue(isinstance(batch.column("value"), array))
+        self.assertTrue(isinstance(batch.column("valid"), array))
+        self.assertTrue(isinstance(batch.column("label"), list))
+        self.assertEqual(list(batch["count"]), [1, 2, 3])
+        self.assertEqual(list(batch["value"]), [0.5, 0.0, 2.0])
+
+    def test_to_dicts(self):
+        """
+        ModelBatch.to_dicts matches Model.to_dict of each record.
+        """
+        batch = ModelBatch(self.reading_class, self.records)
+        expected = [self.reading_class.create(record).to_dict() for record in self.records]
+        self.assertEqual(batch.to_dicts(), expected)
+        self.assertTrue(batch.to_dicts()[0]["valid"] is True)
+
+    def test_rows(self):
+        """
+        Rows are views with the attributes of the model.
+        """
+        batch = ModelBatch(self.reading_class, self.records)
+        row = batch[1]
+
+        self.assertTrue(isinstance(row, BatchRow))
+        self.assertEqual(row.label, u"b")
+        self.assertEqual(row.tags, [u"x"])
+        self.assertTrue(row.valid is False)
+        self.assertEqual(batch[-1].part.name, u"p")
+        self.assertEqual([each.count for each in batch], [1, 2, 3])
+        self.assertRaises(IndexError, lambda: batch[3])
+
+        row.count = 20
+        self.assertEqual(batch.column("count")[1], 20)
+        with self.assertRaises(TraitError):
+            row.count = "twenty"
+
+        model = row.to_model()
+        self.assertTrue(isinstance(model, self.reading_class))
+        self.assertEqual(model.count, 20)
+        self.assertEqual(row.to_dict(), model.to_dict())
+
+    def test_set_column(self):
+        """
+        Assigning a column validates every value.
+        """
+        batch = ModelBatch(self.reading_class, self.records)
+
+        batch["value"] = [1, 2.5, 3]
+        self.assertEqual(list(batch["value"]), [1.0, 2.5, 3.0])
+
+        batch["count"] = array(batch.column("count").typecode, [7, 8, 9])
+        self.assertEqual(batch[2].count, 9)
+
+        with self.assertRaises(TraitError):
+            batch["count"] = [1, "2", 3]
+        with self.assertRaises(ValueError):
+            batch["count"] = [1, 2]
+        self.assertEqual(list(batch["count"]), [7, 8, 9])
+
+    def test_from_columns(self):
+        """
+        Missing columns are filled with default values.
+        """
+        batch = ModelBatch.from_columns(self.reading_class, {
+            "label": [u"x", u"y"],
+            "count": [1, 2],
+        })
+
+        self.assertEqual(len(batch), 2)
+        self.assertEqual(batch[0].value, 0.0)
+        self.assertEqual(batch[1].tags, [])
+        self.assertFalse(batch[0].tags is batch[1].tags)
+
+        self.assertRaises(ValueError, ModelBatch.from_columns, self.reading_class,
+                          {"label": [u"x"], "count": [1, 2]})
+        self.assertRaises(KeyError, ModelBatch.from_columns, self.reading_class,
+                          {"nope": [1]})
+
+    def test_extend(self):
+        """
+        Records can be dictionaries or model instances, and invalid records
+        can be collected.
+        """
+        batch = ModelBatch(self.reading_class)
+        instance = self.reading_class.create({"label": u"i", "count": 5})
+
+        errors = []
+        batch.extend([{"count": "bad"}, instance, {"label": u"d"}], errors=errors)
+
+        self.assertEqual(len(batch), 2)
+        self.assertEqual([each.label for each in batch], [u"i", u"d"])
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(errors[0].index, 0)
+
+        self.assertRaises(TraitError, batch.append, {"count": "bad"})
+        self.assertEqual(len(batch), 2)
+
+    def test_to_models(self):
+        batch = ModelBatch(self.reading_class, self.records)
+        models = batch.to_models()
+        self.assertEqual([model.to_dict() for model in models], batch.to_dicts())
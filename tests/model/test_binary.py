@@ -0,0 +1,173 @@
+import unittest
+from array import array
+from io import BytesIO
+
+try:
+    from cStringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from modelo.model.binary import SchemaMismatchError
+from modelo.model.model import Model
+import modelo.trait.trait_types as field
+
+class Address(Model):
+    city = field.Unicode()
+    zip_code = field.Int()
+
+class Person(Model):
+    name = field.Unicode()
+    age = field.Int()
+    height = field.Float()
+    active = field.Bool()
+    phase = field.Complex()
+    photo = field.Bytes()
+    role = field.Enum([u"admin", u"user"])
+    kind = field.Enum([u"a", u"b"], coded=True)
+    address = field.Instance(Address)
+    friend = field.This()
+    scores = field.List(field.Int)
+    tags = field.Set(field.Unicode)
+    pair = field.Tuple(field.Int, field.Unicode)
+    stock = field.Dict(field.Unicode, field.Int)
+    homes = field.Dict(field.Unicode, field.Instance(Address))
+    counts = field.IntArray()
+    extra = field.Any()
+    cache = field.Any(transient=True)
+
+class Renamed(Model):
+    name = field.Unicode()
+    years = field.Int()
+
+class Older(Model):
+    name = field.Unicode()
+    age = field.Int()
+
+class FrozenPoint(Model):
+    x = field.Float()
+    tags = field.List(field.Unicode)
+
+    class Meta:
+        frozen = True
+
+def make_person():
+    return Person.create({
+        "name": u"J\xfcrgen",
+        "age": 42,
+        "height": 1.8,
+        "active": True,
+        "phase": 1 + 2j,
+        "photo": b"\x00\xff",
+        "role": u"admin",
+        "kind": u"b",
+        "address": Address(city=u"Berlin", zip_code=10115),
+        "friend": Person.create({"name": u"Ann"}),
+        "scores": [1, 2, 3],
+        "tags": set([u"x", u"y"]),
+        "pair": (1, u"one"),
+        "stock": {u"a": 1},
+        "homes": {u"main": Address(city=u"Rome")},
+        "counts": [4, 5],
+        "extra": {u"nested": [1, 2.5, None, (u"t", b"b")], 2 ** 70: set([1])},
+    })
+
+class BinaryTests(unittest.TestCase):
+    def test_round_trip(self):
+        person = make_person()
+        copy = Person.from_bytes(person.to_bytes())
+        self.assertEqual(copy.to_dict(), person.to_dict())
+        self.assertTrue(isinstance(copy.address, Address))
+        self.assertTrue(isinstance(copy.friend, Person))
+        self.assertEqual(copy.friend.name, u"Ann")
+        self.assertEqual(copy.counts, array(field.INT_TYPECODE, [4, 5]))
+        self.assertEqual(copy.kind, u"b")
+
+    def test_defaults(self):
+        person = Person()
+        copy = Person.from_bytes(person.to_bytes())
+        self.assertEqual(copy.to_dict(), person.to_dict())
+        self.assertEqual(copy.address, None)
+
+    def test_smaller_than_json(self):
+        people = [Older.create({"name": u"name%d" % index, "age": 1000000 + index})
+                  for index in range(100)]
+        (binary, text) = (BytesIO(), StringIO())
+        Older.dump_binary_many(people, binary)
+        Older.dump_json_many(people, text, compact=True)
+        self.assertTrue(len(binary.getvalue()) < len(text.getvalue()) * 0.75)
+
+    def test_transient_traits_are_skipped(self):
+        person = Person.create({"cache": object()})
+        self.assertEqual(Person.from_bytes(person.to_bytes()).cache, None)
+
+    def test_schema_mismatch(self):
+        data = Older.create({"name": u"a", "age": 1}).to_bytes()
+        self.assertRaises(SchemaMismatchError, Renamed.from_bytes, data)
+        self.assertRaises(SchemaMismatchError, Person.from_bytes, data)
+        self.assertEqual(Older.from_bytes(data).age, 1)
+
+    def test_invalid_data(self):
+        data = make_person().to_bytes()
+        self.assertRaises(ValueError, Person.from_bytes, data[:-3])
+        self.assertRaises(ValueError, Person.from_bytes, data + b"x")
+        self.assertRaises(ValueError, Person.from_bytes, bytearray(data[:20]))
+
+    def test_subclass_instances(self):
+        class Office(Address):
+            floor = field.Int()
+        person = Person.create({"address": Office(city=u"x")})
+        self.assertRaises(TypeError, person.to_bytes)
+
+    def test_frozen(self):
+        point = FrozenPoint.create({"x": 1.0, "tags": [u"a"]})
+        copy = FrozenPoint.from_bytes(point.to_bytes())
+        self.assertEqual(copy, point)
+        self.assertEqual(copy.tags, (u"a",))
+
+    @unittest.skipIf(numpy is None, "numpy isn't installed")
+    def test_ndarray(self):
+        class Recording(Model):
+            samples = field.NDArray(dtype="float64", shape=(None, 2))
+        recording = Recording.create({"samples": [[1.0, 2.0], [3.0, 4.0]]})
+        copy = Recording.from_bytes(recording.to_bytes())
+        self.assertEqual(copy.samples.tolist(), [[1.0, 2.0], [3.0, 4.0]])
+        copy.samples[0, 0] = 5.0
+
+class BinaryStreamTests(unittest.TestCase):
+    def test_round_trip(self):
+        people = [make_person(), Person(), Person.create({"name": u"b"})]
+        fp = BytesIO()
+        self.assertEqual(Person.dump_binary_many(iter(people), fp), 3)
+        fp.seek(0)
+        copies = list(Person.iter_binary(fp))
+        self.assertEqual([each.to_dict() for each in copies], [each.to_dict() for each in people])
+
+    def test_empty(self):
+        fp = BytesIO()
+        Person.dump_binary_many([], fp)
+        fp.seek(0)
+        self.assertEqual(list(Person.iter_binary(fp)), [])
+
+    def test_schema_mismatch(self):
+        fp = BytesIO()
+        Older.dump_binary_many([Older()], fp)
+        fp.seek(0)
+        self.assertRaises(SchemaMismatchError, list, Renamed.iter_binary(fp))
+        self.assertRaises(ValueError, list, Older.iter_binary(BytesIO(b"junk")))
+
+    def test_truncated(self):
+        fp = BytesIO()
+        Older.dump_binary_many([Older(), Older()], fp)
+        fp = BytesIO(fp.getvalue()[:-2])
+        self.assertRaises(ValueError, list, Older.iter_binary(fp))
+
+    def test_other_classes(self):
+        self.assertRaises(TypeError, Older.dump_binary_many, [Renamed()], BytesIO())
+
+if __name__ == "__main__":
+    unittest.main()
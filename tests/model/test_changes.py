@@ -0,0 +1,147 @@
+import unittest
+
+from modelo.model.model import Model
+import modelo.trait.trait_types as field
+
+class Address(Model):
+    street = field.Unicode()
+    city = field.Unicode()
+
+    class Meta:
+        track_changes = True
+
+class Person(Model):
+    name = field.Unicode()
+    age = field.Int()
+    address = field.Instance(Address)
+    previous = field.List(field.Instance(Address))
+    friend = field.This()
+    note = field.Unicode(transient=True)
+
+    class Meta:
+        track_changes = True
+
+class ChangesTests(unittest.TestCase):
+    def make_person(self):
+        return Person.create({
+            "name": u"a",
+            "age": 30,
+            "address": Address(street=u"1 main", city=u"x"),
+            "previous": [Address(street=u"2 side")],
+        })
+
+    def test_created_clean(self):
+        """
+        New instances have no changes.
+        """
+        person = self.make_person()
+        self.assertEqual(person.changed_fields(), [])
+        self.assertEqual(person.to_dict(only_changed=True), {})
+
+    def test_changed_fields(self):
+        person = self.make_person()
+        person.age = 31
+        person.name = u"b"
+        self.assertEqual(person.changed_fields(), ["name", "age"])
+        self.assertEqual(person.to_dict(only_changed=True), {"name": u"b", "age": 31})
+
+        person.update({"age": 32})
+        self.assertEqual(person.to_dict(only_changed=True), {"name": u"b", "age": 32})
+
+        person.mark_clean()
+        self.assertEqual(person.changed_fields(), [])
+
+    def test_nested_instance(self):
+        """
+        Changes of submodels count as changes of the trait that holds them.
+        """
+        person = self.make_person()
+        person.address.city = u"y"
+
+        self.assertEqual(person.changed_fields(), ["address"])
+        self.assertEqual(person.to_dict(only_changed=True), {"address": {"city": u"y"}})
+
+        # marking the parent clean marks the submodels clean
+        person.mark_clean()
+        self.assertEqual(person.address.changed_fields(), [])
+        self.assertEqual(person.changed_fields(), [])
+
+        # an assigned submodel is dumped whole
+        person.address = Address(street=u"3 new")
+        self.assertEqual(person.to_dict(only_changed=True)["address"],
+                         {"street": u"3 new", "city": u""})
+
+    def test_nested_list(self):
+        person = self.make_person()
+        person.previous[0].street = u"4 other"
+
+        self.assertEqual(person.changed_fields(), ["previous"])
+        self.assertEqual(person.to_dict(only_changed=True),
+                         {"previous": [{"street": u"4 other", "city": u""}]})
+
+    def test_include_exclude(self):
+        person = self.make_person()
+        person.name = u"b"
+        person.age = 1
+
+        self.assertEqual(person.to_dict(only_changed=True, exclude=["age"]), {"name": u"b"})
+        self.assertEqual(person.to_dict(only_changed=True, include=["age"]), {"age": 1})
+
+    def test_transient(self):
+        person = self.make_person()
+        person.note = u"hi"
+        self.assertEqual(person.changed_fields(), ["note"])
+        self.assertEqual(person.to_dict(only_changed=True), {})
+
+    def test_cycle(self):
+        (first, second) = (Person.create(), Person.create())
+        first.friend = second
+        second.friend = first
+        first.mark_clean()
+
+        self.assertEqual(first.changed_fields(), [])
+        second.age = 3
+        self.assertEqual(first.changed_fields(), ["friend"])
+        self.assertEqual(first.to_dict(only_changed=True), {"friend": {"age": 3}})
+
+    def test_untracked(self):
+        class Plain(Model):
+            name = field.Unicode()
+
+        self.assertTrue(Plain.__setattr__ is object.__setattr__)
+        self.assertRaises(TypeError, Plain.create().changed_fields)
+        self.assertRaises(TypeError, Plain.create().to_dict, only_changed=True)
+
+    def test_compact(self):
+        class Point(Model):
+            x = field.Float()
+            y = field.Float()
+
+            class Meta:
+                compact = True
+                track_changes = True
+
+        point = Point.create({"x": 1.0})
+        self.assertFalse(hasattr(point, "__dict__"))
+        self.assertEqual(point.changed_fields(), [])
+        point.y = 2.0
+        self.assertEqual(point.to_dict(only_changed=True), {"y": 2.0})
+
+    def test_observed(self):
+        """
+        Tracked classes can be observed too.
+        """
+        calls = []
+        handler = calls.append
+        Address.observe(handler)
+        try:
+            address = Address.create()
+            address.city = u"z"
+            self.assertEqual(len(calls), 1)
+        finally:
+            Address.unobserve(handler)
+
+        # the hook stays for change tracking
+        address.street = u"s"
+        self.assertEqual(address.changed_fields(), ["street", "city"])
+        self.assertEqual(len(calls), 1)
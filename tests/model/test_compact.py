@@ -0,0 +1,159 @@
+from copy import (
+    copy,
+    deepcopy,
+)
+
+import unittest
+
+from modelo.model import compact
+from modelo.model.model import Model
+from modelo.trait.trait_type import TraitError
+import modelo.trait.trait_types as field
+
+class CompactModelTests(unittest.TestCase):
+    def setUp(self):
+        class Point(Model):
+            x = field.Float()
+            y = field.Float()
+            label = field.String(u"origin")
+            tags = field.List(field.String)
+
+            class Meta:
+                compact = True
+        self.point_class = Point
+
+    def test_no_dict(self):
+        """
+        Compact instances should not have a __dict__.
+        """
+        point = self.point_class.create({"x": 1.0})
+        self.assertFalse(hasattr(point, "__dict__"))
+        self.assertRaises(AttributeError, setattr, point, "other", 1)
+
+    def test_get_set(self):
+        point = self.point_class.create({"x": 1.0, "y": 2})
+
+        self.assertEqual(point.x, 1.0)
+        self.assertEqual(point.y, 2.0)
+        self.assertEqual(point.label, u"origin")
+        self.assertEqual(point.tags, [])
+
+        point.label = u"somewhere"
+        self.assertEqual(point.label, u"somewhere")
+        self.assertRaises(TraitError, setattr, point, "x", "not a number")
+
+    def test_direct_slot_access(self):
+        """
+        Reading and assigning traits shouldn't go through a SlotValues view.
+        """
+        point = self.point_class.create({"x": 1.0})
+        made = []
+        original = compact.SlotValues.__init__
+
+        def init(values, obj):
+            made.append(obj)
+            original(values, obj)
+
+        compact.SlotValues.__init__ = init
+        try:
+            point.y = 3
+            self.assertEqual((point.x, point.y, point.label), (1.0, 3.0, u"origin"))
+        finally:
+            compact.SlotValues.__init__ = original
+
+        self.assertEqual(made, [])
+        self.assertRaises(TraitError, setattr, point, "x", u"one")
+
+    def test_to_dict(self):
+        point = self.point_class.create({"x": 1.0, "tags": [u"a"]})
+
+        self.assertEqual(point.to_dict(), {
+            "x": 1.0,
+            "y": 0.0,
+            "label": u"origin",
+            "tags": [u"a"],
+        })
+
+    def test_copy(self):
+        point1 = self.point_class.create({"x": 3.0, "tags": [u"a"]})
+        point2 = copy(point1)
+
+        self.assertTrue(point2 is not point1)
+        self.assertEqual(point1.to_dict(), point2.to_dict())
+
+    def test_deepcopy(self):
+        point1 = self.point_class.create({"x": 3.0, "tags": [u"a"]})
+        point2 = deepcopy(point1)
+
+        self.assertEqual(point1.to_dict(), point2.to_dict())
+        self.assertFalse(point1.tags is point2.tags)
+
+    def test_update(self):
+        point = self.point_class.create({"x": 3.0})
+        point.update({"y": 4.0})
+        self.assertEqual((point.x, point.y), (3.0, 4.0))
+
+    def test_inheritance(self):
+        """
+        Subclasses of compact models are compact, and get slots for their own
+        traits.
+        """
+        class Point3D(self.point_class):
+            z = field.Float(1.5)
+
+        point = Point3D.create({"x": 1.0})
+        self.assertFalse(hasattr(point, "__dict__"))
+        self.assertEqual((point.x, point.z), (1.0, 1.5))
+
+    def test_compact_subclass_of_regular_model(self):
+        class Base(Model):
+            name = field.String()
+
+        class Compact(Base):
+            number = field.Integer()
+
+            class Meta:
+                compact = True
+
+        inst = Compact.create({"name": u"a", "number": 2})
+        self.assertEqual(inst.to_dict(), {"name": u"a", "number": 2})
+
+    def test_shared_trait(self):
+        """
+        A trait instance that is also used by a regular model isn't changed
+        for that model.
+        """
+        number = field.Integer()
+
+        class Regular(Model):
+            value = number
+
+        class Compact(Model):
+            value = number
+
+            class Meta:
+                compact = True
+
+        self.assertTrue(type(Regular.value) is field.Integer)
+        self.assertTrue(isinstance(Compact.value, compact.CompactStorage))
+        (regular, small) = (Regular.create({"value": 1}), Compact.create({"value": 2}))
+        self.assertEqual((regular.value, small.value), (1, 2))
+        self.assertEqual(regular._trait_values, {"value": 1})
+
+        class Other(Model):
+            value = Compact.value
+
+            class Meta:
+                compact = True
+
+        self.assertTrue(type(Other.value) is type(Compact.value))
+        self.assertEqual((Other.create({"value": 3}).value, small.value), (3, 2))
+
+    def test_no_new_traits(self):
+        """
+        Traits can't be added to compact models after class creation.
+        """
+        def add_trait():
+            self.point_class.z = field.Float()
+        self.assertRaises(TypeError, add_trait)
+        self.assertFalse("z" in self.point_class.__dict__)
@@ -0,0 +1,97 @@
+import unittest
+
+from modelo.model.model import Model
+from modelo.trait.trait_type import TraitError
+import modelo.trait.trait_types as field
+
+class CreateModelTests(unittest.TestCase):
+    def setUp(self):
+        class Person(Model):
+            name = field.String(u"nobody")
+            age = field.Integer()
+            height = field.Float()
+            tags = field.List(field.String)
+            anything = field.Any()
+        self.person_class = Person
+
+    def test_create(self):
+        person = self.person_class.create({
+            "name": u"alice",
+            "age": 30,
+            "height": 2,
+            "tags": [u"a", u"b"],
+            "anything": 5,
+        })
+
+        self.assertEqual(person.name, u"alice")
+        self.assertEqual(person.age, 30)
+        self.assertEqual(person.height, 2.0)
+        self.assertTrue(isinstance(person.height, float))
+        self.assertEqual(person.tags, [u"a", u"b"])
+        self.assertEqual(person.anything, 5)
+
+    def test_create_and_init_are_equivalent(self):
+        """
+        Model.create and Model.__init__ should build the same instances.
+        """
+        data = {"name": u"bob", "tags": [u"c"]}
+        person1 = self.person_class.create(data)
+        person2 = self.person_class(**data)
+
+        self.assertEqual(person1.to_dict(), person2.to_dict())
+
+    def test_create_defaults(self):
+        person = self.person_class.create({"age": 3})
+
+        self.assertEqual(person.name, u"nobody")
+        self.assertEqual(person.height, 0.0)
+        self.assertEqual(person.tags, [])
+
+    def test_create_invalid(self):
+        """
+        Model.create should validate the given values.
+        """
+        self.assertRaises(TraitError, self.person_class.create, {"age": "thirty"})
+        self.assertRaises(TraitError, self.person_class.create, {"tags": [1]})
+
+    def test_mutable_defaults_are_not_shared(self):
+        person1 = self.person_class.create()
+        person2 = self.person_class.create()
+        person1.tags.append(u"changed")
+
+        self.assertEqual(person2.tags, [])
+        self.assertFalse(person1.tags is person2.tags)
+
+    def test_extra_attributes(self):
+        """
+        Keys that are not traits are set as plain attributes.
+        """
+        person = self.person_class.create({"age": 1, "nickname": "al"})
+        self.assertEqual(person.nickname, "al")
+
+    def test_custom_set(self):
+        """
+        Traits that customize __set__ should still be used.
+        """
+        class Upper(field.Unicode):
+            def __set__(self, obj, value):
+                super(Upper, self).__set__(obj, value.upper())
+
+        class Shouting(Model):
+            word = Upper()
+
+        self.assertEqual(Shouting.create({"word": u"hi"}).word, u"HI")
+
+    def test_custom_init(self):
+        """
+        Model subclasses with their own __init__ should still be used.
+        """
+        class Counted(Model):
+            number = field.Integer()
+
+            def __init__(self, **kwargs):
+                kwargs["number"] = kwargs.get("number", 0) + 1
+                super(Counted, self).__init__(**kwargs)
+
+        self.assertEqual(Counted.create({"number": 1}).number, 2)
+        self.assertEqual(Counted.create().number, 1)
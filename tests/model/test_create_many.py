@@ -0,0 +1,113 @@
+import unittest
+
+from modelo.model.model import Model
+from modelo.model.bulk import RecordError
+from modelo.trait.trait_type import TraitError
+import modelo.trait.trait_types as field
+
+class CreateManyTests(unittest.TestCase):
+    def setUp(self):
+        class Row(Model):
+            name = field.String()
+            number = field.Integer()
+            ratio = field.Float()
+            tags = field.List(field.String)
+        self.row_class = Row
+
+        self.records = [
+            {"name": u"a", "number": 1, "ratio": 0.5},
+            {"name": u"b", "number": 2, "tags": [u"x"]},
+            {"name": u"c", "number": 3, "ratio": 1},
+        ]
+
+    def test_create_many(self):
+        rows = self.row_class.create_many(self.records)
+
+        self.assertEqual(len(rows), 3)
+        self.assertTrue(all(isinstance(row, self.row_class) for row in rows))
+        self.assertEqual([row.name for row in rows], [u"a", u"b", u"c"])
+        self.assertEqual(rows[1].tags, [u"x"])
+        self.assertEqual(rows[1].ratio, 0.0)
+        self.assertEqual(rows[2].ratio, 1.0)
+        self.assertTrue(isinstance(rows[2].ratio, float))
+
+    def test_same_as_create(self):
+        rows = self.row_class.create_many(self.records)
+        for (record, row) in zip(self.records, rows):
+            self.assertEqual(row.to_dict(), self.row_class.create(record).to_dict())
+
+    def test_empty(self):
+        self.assertEqual(self.row_class.create_many([]), [])
+
+    def test_errors_are_collected(self):
+        """
+        Invalid records should be reported without stopping the batch.
+        """
+        records = [
+            {"name": u"a"},
+            {"name": 5, "number": "two"},
+            {"name": u"c", "tags": [1]},
+            "not a record",
+            {"name": u"e"},
+        ]
+        errors = []
+        rows = self.row_class.create_many(records, errors=errors, chunk_size=2)
+
+        self.assertEqual([row.name for row in rows], [u"a", u"e"])
+        self.assertEqual([error.index for error in errors], [1, 2, 3])
+        self.assertEqual(sorted(errors[0].errors.keys()), ["name", "number"])
+        self.assertEqual(list(errors[1].errors.keys()), ["tags"])
+        self.assertTrue(errors[0].record is records[1])
+        self.assertTrue(all(isinstance(error, TraitError) for error in errors))
+
+    def test_errors_are_raised(self):
+        records = [{"name": u"a"}, {"number": "two"}]
+        self.assertRaises(RecordError, self.row_class.create_many, records)
+
+    def test_iter_create_many(self):
+        """
+        The generator variant should consume its input lazily.
+        """
+        consumed = []
+        def records():
+            for index in range(10):
+                consumed.append(index)
+                yield {"number": index}
+
+        rows = self.row_class.iter_create_many(records(), chunk_size=4)
+        first = next(rows)
+
+        self.assertEqual(first.number, 0)
+        self.assertEqual(len(consumed), 4)
+        self.assertEqual([row.number for row in rows], list(range(1, 10)))
+
+    def test_extra_attributes(self):
+        rows = self.row_class.create_many([{"name": u"a", "other": 1}])
+        self.assertEqual(rows[0].other, 1)
+
+    def test_compact(self):
+        class CompactRow(Model):
+            name = field.String()
+            number = field.Integer()
+
+            class Meta:
+                compact = True
+
+        errors = []
+        rows = CompactRow.create_many([{"name": u"a", "number": 1}, {"number": u"x"}], errors=errors)
+        self.assertEqual([row.to_dict() for row in rows], [{"name": u"a", "number": 1}])
+        self.assertEqual(len(errors), 1)
+
+    def test_custom_init(self):
+        class Flagged(Model):
+            number = field.Integer()
+
+            def __init__(self, **kwargs):
+                super(Flagged, self).__init__(**kwargs)
+                self.initialized = True
+
+        errors = []
+        rows = Flagged.create_many([{"number": 1}, {"number": "x"}, {}], errors=errors)
+        self.assertEqual([row.number for row in rows], [1, 0])
+        self.assertTrue(all(row.initialized for row in rows))
+        self.assertEqual(errors[0].index, 1)
@@ -0,0 +1,79 @@
+import unittest
+
+from modelo.model.model import Model
+import modelo.trait.trait_types as field
+
+class Counter(object):
+    made = 0
+
+    def __init__(self):
+        Counter.made += 1
+
+class DefaultValueTests(unittest.TestCase):
+    def setUp(self):
+        class Thing(Model):
+            number = field.Integer(5)
+            names = field.List(field.String, [u"a", u"b"])
+            mapping = field.Dict({"key": "value"})
+            counter = field.Instance(Counter, args=())
+        self.thing_class = Thing
+
+        # the first instance of a class always makes all of its defaults
+        Thing.create()
+        Counter.made = 0
+
+    def test_defaults(self):
+        thing = self.thing_class.create()
+
+        self.assertEqual(thing.number, 5)
+        self.assertEqual(thing.names, [u"a", u"b"])
+        self.assertEqual(thing.mapping, {"key": "value"})
+        self.assertTrue(isinstance(thing.counter, Counter))
+
+    def test_defaults_are_lazy(self):
+        """
+        Container and instance defaults should be made on first access.
+        """
+        thing = self.thing_class.create()
+        self.assertFalse("names" in thing._trait_values)
+        self.assertEqual(Counter.made, 0)
+
+        names = thing.names
+        self.assertTrue(thing._trait_values["names"] is names)
+        self.assertTrue(thing.names is names)
+
+        thing.counter
+        thing.counter
+        self.assertEqual(Counter.made, 1)
+
+    def test_no_defaults_for_given_values(self):
+        """
+        Creating a model from a full payload should not make any defaults.
+        """
+        thing = self.thing_class.create({
+            "number": 1,
+            "names": [],
+            "mapping": {},
+            "counter": Counter(),
+        })
+        self.assertEqual(Counter.made, 1)
+        self.assertEqual(thing.names, [])
+
+    def test_defaults_are_not_shared(self):
+        thing1 = self.thing_class.create()
+        thing2 = self.thing_class.create()
+
+        thing1.names.append(u"c")
+        thing1.mapping["other"] = 1
+
+        self.assertEqual(thing2.names, [u"a", u"b"])
+        self.assertEqual(thing2.mapping, {"key": "value"})
+        self.assertFalse(thing1.counter is thing2.counter)
+
+    def test_to_dict_makes_defaults(self):
+        thing = self.thing_class.create({"number": 2})
+        result = thing.to_dict()
+
+        self.assertEqual(result["number"], 2)
+        self.assertEqual(result["names"], [u"a", u"b"])
+        self.assertEqual(result["mapping"], {"key": "value"})
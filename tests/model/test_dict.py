@@ -0,0 +1,148 @@
+import unittest
+
+from modelo.model.model import Model
+from modelo.trait.trait_type import TraitError
+import modelo.trait.trait_types as field
+
+class Price(Model):
+    amount = field.Float()
+    currency = field.Unicode()
+
+class Catalog(Model):
+    stock = field.Dict(field.Unicode, field.Int)
+    prices = field.Dict(field.Unicode, field.Instance(Price))
+    labels = field.Dict(value_trait=field.Unicode)
+    extra = field.Dict({"a": 1})
+
+    class Meta:
+        track_changes = True
+
+class Counting(field.Int):
+    """
+    An Int trait that counts its validations.
+    """
+    calls = 0
+
+    def validate(self, obj, value):
+        Counting.calls += 1
+        return super(Counting, self).validate(obj, value)
+
+class Counted(Model):
+    counts = field.Dict(field.Unicode, Counting)
+
+class DictTests(unittest.TestCase):
+    def test_valid_dict_is_kept(self):
+        stock = {u"a": 1, u"b": 2}
+        catalog = Catalog.create({"stock": stock})
+        self.assertTrue(catalog.stock is stock)
+
+    def test_converted_items(self):
+        catalog = Catalog.create({"stock": {b"a": 1}, "labels": {1: b"x"}})
+        self.assertEqual(catalog.stock, {u"a": 1})
+        self.assertTrue(type(list(catalog.stock)[0]) is type(u""))
+        self.assertEqual(catalog.labels, {1: u"x"})
+
+    def test_invalid_items(self):
+        self.assertRaises(TraitError, Catalog.create, {"stock": {u"a": u"b"}})
+        self.assertRaises(TraitError, Catalog.create, {"stock": {1: 1}})
+        self.assertRaises(TraitError, Catalog.create, {"prices": {u"a": 1.0}})
+        try:
+            Catalog.create({"stock": {1: 1}})
+        except TraitError as error:
+            self.assertTrue(str(error).startswith("Key of the 'stock' trait"))
+
+    def test_models(self):
+        catalog = Catalog.create({"prices": {u"a": Price(amount=1.0)}})
+        self.assertEqual(catalog.prices[u"a"].amount, 1.0)
+        self.assertEqual(catalog.to_dict()["prices"], {u"a": {"amount": 1.0, "currency": u""}})
+
+    def test_default(self):
+        """
+        A dict given alone is the default value.
+        """
+        self.assertEqual(Catalog().extra, {"a": 1})
+        self.assertEqual(Catalog().stock, {})
+        self.assertRaises(TypeError, field.Dict, field.Int, 1)
+
+    def test_old_positional_form(self):
+        """
+        Dict(default_value, allow_none) still works.
+        """
+        class Old(Model):
+            required = field.Dict(None, False)
+            defaults = field.Dict({"a": 1}, True)
+
+        old = Old()
+        self.assertEqual(old.required, {})
+        self.assertEqual(old.defaults, {"a": 1})
+        self.assertRaises(TraitError, setattr, old, "required", None)
+        old.defaults = None
+        self.assertEqual(old.defaults, None)
+        self.assertRaises(TypeError, field.Dict, None, 1)
+
+    def test_to_dict_copies(self):
+        catalog = Catalog.create({"stock": {u"a": 1}})
+        result = catalog.to_dict()
+        self.assertEqual(result["stock"], {u"a": 1})
+        self.assertFalse(result["stock"] is catalog.stock)
+
+class DictUpdateTests(unittest.TestCase):
+    def test_merge(self):
+        stock = {u"a": 1, u"b": 2}
+        catalog = Catalog.create({"stock": stock})
+        catalog.update({"stock": {u"b": 3, u"c": 4}})
+        self.assertEqual(catalog.stock, {u"a": 1, u"b": 3, u"c": 4})
+        self.assertEqual(stock, {u"a": 1, u"b": 2})
+
+    def test_only_changed_items_are_validated(self):
+        counted = Counted.create({"counts": dict([(u"%d" % index, index) for index in range(1000)])})
+        Counting.calls = 0
+        counted.update({"counts": {u"1": 5, u"new": 6}})
+        self.assertEqual(Counting.calls, 2)
+        self.assertEqual(counted.counts[u"1"], 5)
+        self.assertEqual(len(counted.counts), 1001)
+
+    def test_invalid_merge(self):
+        catalog = Catalog.create({"stock": {u"a": 1}})
+        self.assertRaises(TraitError, catalog.update, {"stock": {u"b": u"x"}})
+        self.assertRaises(TraitError, catalog.update, {"stock": {2: 1}})
+        self.assertEqual(catalog.stock, {u"a": 1})
+
+    def test_models(self):
+        """
+        Models in the values are updated in place, or created from dicts.
+        """
+        price = Price(amount=1.0, currency=u"EUR")
+        catalog = Catalog.create({"prices": {u"a": price}})
+        catalog.update({"prices": {u"a": {"amount": 2.0}, u"b": {"amount": 3.0}}})
+        self.assertTrue(catalog.prices[u"a"] is price)
+        self.assertEqual(price.amount, 2.0)
+        self.assertEqual(price.currency, u"EUR")
+        self.assertTrue(isinstance(catalog.prices[u"b"], Price))
+        self.assertEqual(catalog.prices[u"b"].amount, 3.0)
+
+    def test_apply_patch_removes(self):
+        catalog = Catalog.create({"stock": {u"a": 1, u"b": 2}})
+        other = Catalog.create({"stock": {u"a": 1}})
+        catalog.apply_patch(catalog.diff(other))
+        self.assertEqual(catalog.stock, {u"a": 1})
+
+    def test_changes(self):
+        """
+        Merged dicts are changes, like assignments.
+        """
+        catalog = Catalog.create({"stock": {u"a": 1}})
+        changes = []
+        Catalog.observe(changes.extend, "stock")
+        try:
+            catalog.update({"stock": {u"a": 2}})
+        finally:
+            Catalog.unobserve(changes.extend, "stock")
+
+        self.assertEqual(catalog.changed_fields(), ["stock"])
+        self.assertEqual(len(changes), 1)
+        self.assertEqual(changes[0].old, {u"a": 1})
+        self.assertEqual(changes[0].new, {u"a": 2})
+
+if __name__ == "__main__":
+    unittest.main()
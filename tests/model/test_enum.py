@@ -0,0 +1,133 @@
+import copy
+import json
+import unittest
+
+try:
+    from cStringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+from modelo.model.batch import ModelBatch
+from modelo.model.model import Model
+from modelo.trait.trait_type import TraitError
+import modelo.trait.trait_types as field
+
+COLORS = [u"color%d" % index for index in range(100)]
+
+class Paint(Model):
+    color = field.Enum(COLORS, u"color0", coded=True)
+    finish = field.CaselessStrEnum([u"Matte", u"Gloss"], coded=True)
+    size = field.Enum([1, 2, 3])
+    shape = field.CaselessStrEnum([u"Round", u"Square"])
+
+class FrozenPaint(Model):
+    color = field.Enum(COLORS, coded=True)
+
+    class Meta:
+        frozen = True
+
+class EnumTests(unittest.TestCase):
+    def test_lookup(self):
+        trait = field.Enum(COLORS)
+        self.assertEqual(trait.index(u"color42"), 42)
+        self.assertEqual(trait.index(u"missing"), -1)
+        self.assertEqual(trait.index([]), -1)
+
+    def test_values_can_be_replaced(self):
+        trait = field.Enum([u"a"])
+        trait.values = [u"b", u"c"]
+        self.assertEqual(trait.index(u"c"), 1)
+        self.assertEqual(trait.index(u"a"), -1)
+
+    def test_unhashable_values(self):
+        trait = field.Enum([[1], u"a", {"b": 2}])
+        self.assertEqual(trait.index([1]), 0)
+        self.assertEqual(trait.index({"b": 2}), 2)
+        self.assertEqual(trait.index(u"a"), 1)
+
+    def test_caseless_returns_the_declared_value(self):
+        paint = Paint.create({"shape": u"ROUND"})
+        self.assertEqual(paint.shape, u"Round")
+        self.assertRaises(TraitError, Paint.create, {"shape": u"oval"})
+        self.assertRaises(TraitError, Paint.create, {"shape": 1})
+
+    def test_invalid(self):
+        self.assertRaises(TraitError, Paint.create, {"size": 4})
+        self.assertRaises(TraitError, Paint.create, {"color": u"red"})
+
+class CodedEnumTests(unittest.TestCase):
+    def test_stored_code(self):
+        paint = Paint.create({"color": u"color7", "finish": u"gloss"})
+        self.assertEqual(paint._trait_values["color"], 7)
+        self.assertTrue(type(paint._trait_values["color"]) is field.EnumCode)
+        self.assertEqual(paint.color, u"color7")
+        self.assertEqual(paint.finish, u"Gloss")
+        self.assertEqual(Paint().color, u"color0")
+        self.assertEqual(Paint().finish, None)
+
+    def test_plain_enums_are_not_coded(self):
+        self.assertFalse(isinstance(Paint.__dict__["size"], field.CodedEnumStorage))
+        self.assertTrue(isinstance(Paint.__dict__["color"], field.Enum))
+
+    def test_coded_elements(self):
+        """
+        Containers can't store codes, because only model attributes decode
+        them.
+        """
+        coded = lambda: field.Enum([u"green", u"red"], coded=True)
+        self.assertRaises(TypeError, field.List, coded())
+        self.assertRaises(TypeError, field.Set, coded())
+        self.assertRaises(TypeError, field.Tuple, coded(), field.Int())
+        self.assertRaises(TypeError, field.Dict, coded(), field.Int())
+        self.assertRaises(TypeError, field.Dict, field.Unicode(), coded())
+
+    def test_plain_enum_elements(self):
+        class Palette(Model):
+            tags = field.List(field.Enum([u"green", u"red"]))
+            weights = field.Dict(field.Unicode(), field.Enum([1, 2]))
+
+        palette = Palette.create({"tags": [u"green", u"red"], "weights": {u"a": 2}})
+        self.assertEqual(palette.tags, [u"green", u"red"])
+        copy = Palette.from_bytes(palette.to_bytes())
+        self.assertEqual(copy.tags, [u"green", u"red"])
+        self.assertEqual(copy.weights, {u"a": 2})
+
+    def test_to_dict(self):
+        paint = Paint.create({"color": u"color7", "finish": u"matte"})
+        expected = {"color": u"color7", "finish": u"Matte", "size": None, "shape": None}
+        self.assertEqual(paint.to_dict(), expected)
+        self.assertEqual(paint.__getstate__(), expected)
+
+        fp = StringIO()
+        paint.dump_json(fp)
+        self.assertEqual(json.loads(fp.getvalue())["color"], u"color7")
+
+    def test_create_many(self):
+        paints = Paint.create_many([{"color": u"color1"}, {"color": u"color2"}])
+        self.assertEqual([paint.color for paint in paints], [u"color1", u"color2"])
+        errors = []
+        Paint.create_many([{"color": u"red"}], errors=errors)
+        self.assertEqual(len(errors), 1)
+
+    def test_trusted_and_copies(self):
+        paint = Paint.from_trusted({"color": u"color3"})
+        self.assertEqual(paint.color, u"color3")
+        self.assertEqual(copy.copy(paint).color, u"color3")
+        self.assertEqual(copy.deepcopy(paint).color, u"color3")
+        self.assertEqual(paint.fork().color, u"color3")
+
+    def test_batch(self):
+        batch = ModelBatch(Paint, [{"color": u"color5"}])
+        self.assertEqual(batch[0].color, u"color5")
+        batch["color"] = [u"color6"]
+        self.assertEqual(batch.to_dicts()[0]["color"], u"color6")
+
+    def test_frozen(self):
+        first = FrozenPaint.create({"color": u"color9"})
+        second = FrozenPaint.create({"color": u"color9"})
+        self.assertEqual(first.color, u"color9")
+        self.assertEqual(first, second)
+        self.assertEqual(hash(first), hash(second))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,178 @@
+import pickle
+import unittest
+
+from modelo.model.model import Model
+from modelo.model.sharing import SharedValues
+from modelo.trait.trait_type import TraitError
+import modelo.trait.trait_types as field
+
+class Setting(Model):
+    key = field.Unicode()
+    values = field.List(field.Int)
+
+class Config(Model):
+    name = field.Unicode()
+    size = field.Int()
+    main = field.Instance(Setting)
+    settings = field.List(field.Instance(Setting))
+    extra = field.Dict()
+    parent = field.This()
+
+def make_config():
+    return Config.create({
+        "name": u"base",
+        "size": 1,
+        "main": Setting(key=u"main", values=[1]),
+        "settings": [Setting(key=u"a"), Setting(key=u"b", values=[2, 3])],
+        "extra": {"nested": {"x": [1]}},
+    })
+
+class ForkTests(unittest.TestCase):
+    def test_shares_values(self):
+        """
+        Forking doesn't copy the values.
+        """
+        config = make_config()
+        copy = config.fork()
+
+        self.assertTrue(isinstance(copy, Config))
+        for name in ("main", "settings", "extra"):
+            self.assertTrue(dict.__getitem__(copy._trait_values, name) is
+                            dict.__getitem__(config._trait_values, name))
+        self.assertEqual(copy.to_dict(), config.to_dict())
+
+    def test_reads_dont_copy(self):
+        """
+        Reading the values of a fork, or of its original, copies nothing. Only
+        reading the models in them forks those models.
+        """
+        config = make_config()
+        copy = config.fork()
+        raw = dict(config._trait_values)
+
+        for inst in (copy, config):
+            inst.to_dict()
+            inst.__getstate__()
+            inst.diff(config)
+            self.assertEqual(len(inst.settings), 2)
+            self.assertEqual(inst.extra["nested"]["x"], [1])
+            self.assertEqual(list(inst.extra.items()), [("nested", {"x": [1]})])
+            self.assertTrue("nested" in inst.extra)
+            self.assertEqual(inst.extra, config.extra)
+
+        self.assertEqual(dict(copy._trait_values), raw)
+        self.assertEqual(dict(config._trait_values), raw)
+        for (name, value) in raw.items():
+            self.assertTrue(dict.__getitem__(copy._trait_values, name) is value)
+            self.assertTrue(dict.__getitem__(config._trait_values, name) is value)
+
+    def test_views(self):
+        """
+        Shared containers are read through views, which are assigned and
+        pickled as plain containers.
+        """
+        config = make_config()
+        copy = config.fork()
+
+        extra = copy.extra
+        config.extra = extra
+        self.assertTrue(type(dict.__getitem__(config._trait_values, "extra")) is dict)
+        self.assertEqual(config.extra, {"nested": {"x": [1]}})
+
+        extra["nested"]["x"].append(2)
+        self.assertEqual(copy.extra, {"nested": {"x": [1, 2]}})
+        self.assertEqual(config.extra, {"nested": {"x": [1]}})
+        self.assertEqual(pickle.loads(pickle.dumps(extra)), {"nested": {"x": [1, 2]}})
+
+        settings = copy.settings
+        config.settings = settings + []
+        settings.append(Setting(key=u"c"))
+        self.assertEqual(len(copy.settings), 3)
+        self.assertEqual(len(config.settings), 2)
+
+    def test_copy_on_write(self):
+        """
+        Changes made through either instance don't show up in the other one.
+        """
+        config = make_config()
+        copy = config.fork()
+
+        copy.name = u"copy"
+        copy.main.key = u"changed"
+        copy.settings[1].values.append(4)
+        copy.extra["nested"]["x"].append(2)
+
+        self.assertEqual(config.name, u"base")
+        self.assertEqual(config.main.key, u"main")
+        self.assertEqual(config.settings[1].values, [2, 3])
+        self.assertEqual(config.extra, {"nested": {"x": [1]}})
+
+        config.main.values.append(5)
+        self.assertEqual(copy.main.values, [1])
+
+    def test_reads_keep_copies(self):
+        """
+        A shared value is copied once, on its first read.
+        """
+        config = make_config()
+        copy = config.fork()
+
+        main = copy.main
+        self.assertTrue(copy.main is main)
+        self.assertFalse(config.main is main)
+        self.assertTrue(config.main is config.main)
+
+    def test_references_from_before_the_fork(self):
+        """
+        Containers that something refers to when the instance is forked are
+        copied for the fork, so changing them doesn't change the fork.
+        """
+        config = make_config()
+        values = config.main.values
+        copy = config.fork()
+
+        values.append(4)
+        self.assertEqual(copy.main.values, [1])
+        values.append(5)
+        self.assertEqual(config.main.values, [1, 4, 5])
+
+        settings = config.settings
+        copy = config.fork()
+        settings[0].key = u"changed"
+        self.assertEqual(copy.settings[0].key, u"a")
+
+    def test_fork_of_fork(self):
+        config = make_config()
+        first = config.fork()
+        second = first.fork()
+
+        second.main.key = u"second"
+        first.main.key = u"first"
+        self.assertEqual([c.main.key for c in (config, first, second)], [u"main", u"first", u"second"])
+
+    def test_immutable_values(self):
+        config = Config.create({"name": u"x"})
+        copy = config.fork()
+        self.assertFalse(isinstance(copy._trait_values, SharedValues))
+        self.assertEqual(copy.name, u"x")
+
+    def test_validation(self):
+        copy = make_config().fork()
+        with self.assertRaises(TraitError):
+            copy.size = "big"
+        copy.update({"main": {"key": u"u"}})
+        self.assertEqual(copy.main.key, u"u")
+
+    def test_compact(self):
+        class Point(Model):
+            x = field.Float()
+            tags = field.List(field.Unicode)
+
+            class Meta:
+                compact = True
+
+        point = Point.create({"x": 1.0, "tags": [u"a"]})
+        copy = point.fork()
+        copy.tags.append(u"b")
+        self.assertEqual(point.tags, [u"a"])
+        self.assertEqual(copy.x, 1.0)
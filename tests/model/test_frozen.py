@@ -0,0 +1,208 @@
+import copy
+import unittest
+
+from modelo.model.model import Model
+from modelo.model.frozen import (
+    FrozenDict,
+    FrozenModelError,
+)
+from modelo.trait.trait_type import TraitError
+import modelo.trait.trait_types as field
+
+class Point(Model):
+    x = field.Int()
+    y = field.Int()
+
+    class Meta:
+        frozen = True
+
+class Shape(Model):
+    name = field.Unicode()
+    points = field.List(field.Instance(Point))
+    tags = field.Set()
+    extra = field.Dict()
+    values = field.List()
+
+    class Meta:
+        frozen = True
+
+class CompactPoint(Model):
+    x = field.Int()
+    y = field.Int()
+
+    class Meta:
+        compact = True
+        frozen = True
+
+class FrozenTests(unittest.TestCase):
+    def test_set_raises(self):
+        """
+        Frozen instances can't be changed.
+        """
+        point = Point.create({"x": 1, "y": 2})
+        self.assertRaises(FrozenModelError, setattr, point, "x", 3)
+        self.assertRaises(FrozenModelError, setattr, point, "other", 3)
+        self.assertRaises(FrozenModelError, delattr, point, "x")
+        self.assertEqual(point.x, 1)
+
+    def test_error_types(self):
+        """
+        The error is both an AttributeError and a TraitError.
+        """
+        self.assertTrue(issubclass(FrozenModelError, AttributeError))
+        self.assertTrue(issubclass(FrozenModelError, TraitError))
+
+    def test_update_raises(self):
+        point = Point.create({"x": 1})
+        self.assertRaises(FrozenModelError, point.update, {"x": 2})
+        self.assertRaises(FrozenModelError, point.apply_patch, {"x": 2})
+        self.assertEqual(point.x, 1)
+
+    def test_construction(self):
+        """
+        Values are set by every way of creating instances.
+        """
+        self.assertEqual(Point(x=1, y=2).to_dict(), {"x": 1, "y": 2})
+        self.assertEqual(Point.create({"x": 1}).to_dict(), {"x": 1, "y": 0})
+        self.assertEqual(Point.from_trusted({"x": 1, "y": 2}).to_dict(), {"x": 1, "y": 2})
+        points = Point.create_many([{"x": 1}, {"x": 2, "y": 3}])
+        self.assertEqual([point.to_dict() for point in points], [{"x": 1, "y": 0}, {"x": 2, "y": 3}])
+        self.assertRaises(FrozenModelError, setattr, points[0], "x", 3)
+
+    def test_extra_keys(self):
+        """
+        Keys that aren't traits are set while the instance is created.
+        """
+        point = Point.create({"x": 1, "label": u"a"})
+        self.assertEqual(point.label, u"a")
+        self.assertRaises(FrozenModelError, setattr, point, "label", u"b")
+
+        point = Point.create_many([{"x": 1, "label": u"b"}])[0]
+        self.assertEqual(point.label, u"b")
+
+    def test_invalid_values(self):
+        self.assertRaises(TraitError, Point.create, {"x": u"a"})
+
+    def test_containers(self):
+        """
+        Containers are converted to their immutable counterparts.
+        """
+        shape = Shape.create({
+            "name": u"a",
+            "points": [Point(x=1)],
+            "tags": set([u"a"]),
+            "extra": {"key": [1, {"nested": [2]}]},
+            "values": [[1, 2], set([3])],
+        })
+        self.assertEqual(shape.points, (Point(x=1),))
+        self.assertEqual(shape.tags, frozenset([u"a"]))
+        self.assertTrue(isinstance(shape.extra, FrozenDict))
+        self.assertEqual(shape.extra, {"key": (1, {"nested": (2,)})})
+        self.assertTrue(isinstance(shape.extra["key"][1], FrozenDict))
+        self.assertEqual(shape.values, ((1, 2), frozenset([3])))
+        self.assertRaises(TypeError, shape.extra.__setitem__, "key", 1)
+        self.assertRaises(TypeError, shape.extra.update, {})
+
+    def test_defaults(self):
+        """
+        Default values are made when the instance is created.
+        """
+        shape = Shape.create({})
+        self.assertEqual(shape._trait_values["points"], ())
+        self.assertEqual(shape._trait_values["extra"], {})
+        self.assertEqual(shape.tags, frozenset())
+
+    def test_to_dict(self):
+        """
+        Containers are dumped as their declared types, so that the dump can
+        be used to create an equal instance.
+        """
+        data = {
+            "name": u"a",
+            "points": [{"x": 1, "y": 2}],
+            "tags": set([u"a"]),
+            "extra": {"key": [1]},
+            "values": [1, 2],
+        }
+        shape = Shape.create(dict(data, points=[Point(x=1, y=2)]))
+        dumped = shape.to_dict()
+        self.assertEqual(dumped, dict(data, extra={"key": (1,)}))
+        self.assertEqual(type(dumped["points"]), list)
+        self.assertEqual(type(dumped["tags"]), set)
+        self.assertEqual(type(dumped["extra"]), dict)
+        self.assertEqual(type(dumped["values"]), list)
+
+        dumped["points"] = [Point.create(point) for point in dumped["points"]]
+        self.assertEqual(Shape.create(dumped), shape)
+
+    def test_equality(self):
+        self.assertEqual(Point(x=1, y=2), Point(x=1, y=2))
+        self.assertFalse(Point(x=1, y=2) != Point(x=1, y=2))
+        self.assertNotEqual(Point(x=1, y=2), Point(x=1, y=3))
+        self.assertNotEqual(Point(x=1, y=2), CompactPoint(x=1, y=2))
+        self.assertNotEqual(Point(x=1, y=2), (1, 2))
+
+    def test_hash(self):
+        """
+        Frozen instances can be dict keys and set members, and the hash is
+        computed once.
+        """
+        point = Point(x=1, y=2)
+        self.assertEqual(hash(point), hash(Point(x=1, y=2)))
+        self.assertEqual(point._frozen_hash, hash(point))
+
+        mapping = {point: u"a"}
+        self.assertEqual(mapping[Point(x=1, y=2)], u"a")
+        self.assertEqual(len(set([point, Point(x=1, y=2), Point(x=2)])), 2)
+
+        shape = Shape.create({"points": [point], "extra": {"a": [1]}, "tags": set([u"a"])})
+        same = Shape.create({"points": [Point(x=1, y=2)], "extra": {"a": [1]}, "tags": set([u"a"])})
+        self.assertEqual(len(set([shape, same])), 1)
+
+    def test_copies(self):
+        """
+        Copies of a frozen instance are the instance itself.
+        """
+        point = Point(x=1, y=2)
+        self.assertTrue(copy.copy(point) is point)
+        self.assertTrue(copy.deepcopy(point) is point)
+        self.assertTrue(point.fork() is point)
+
+    def test_compact(self):
+        point = CompactPoint(x=1, y=2)
+        self.assertRaises(FrozenModelError, setattr, point, "x", 3)
+        self.assertEqual(point, CompactPoint.create({"x": 1, "y": 2}))
+        self.assertEqual(len(set([point, CompactPoint(x=1, y=2)])), 1)
+        self.assertFalse(hasattr(point, "__dict__"))
+
+    def test_subclass(self):
+        """
+        Subclasses of frozen classes are frozen.
+        """
+        class Point3(Point):
+            z = field.Int()
+
+        point = Point3(x=1, z=2)
+        self.assertRaises(FrozenModelError, setattr, point, "z", 3)
+        self.assertEqual(point, Point3(x=1, z=2))
+        self.assertNotEqual(point, Point3(x=1, z=3))
+
+    def test_observed(self):
+        """
+        Observing a frozen class doesn't make it changeable.
+        """
+        class Observed(Model):
+            x = field.Int()
+
+            class Meta:
+                frozen = True
+
+        changes = []
+        Observed.observe(changes.extend)
+        point = Observed.create({"x": 1})
+        self.assertRaises(FrozenModelError, setattr, point, "x", 2)
+        self.assertEqual(changes, [])
+        Observed.unobserve(changes.extend)
+
+if __name__ == "__main__":
+    unittest.main()
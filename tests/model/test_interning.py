@@ -0,0 +1,177 @@
+import unittest
+
+from modelo.model.model import Model
+from modelo.trait.interning import (
+    InternPool,
+    get_pool,
+    interning,
+)
+from modelo.trait.trait_type import TraitError
+import modelo.trait.trait_types as field
+
+class Unit(Model):
+    name = field.Unicode()
+    scale = field.Int()
+
+    class Meta:
+        frozen = True
+
+class Sensor(Model):
+    name = field.Unicode()
+
+class Reading(Model):
+    country = field.Unicode(intern=True)
+    kind = field.Enum([u"min", u"max"], intern=True)
+    label = field.Unicode()
+    unit = field.Instance(Unit, intern=True)
+    sensor = field.Instance(Sensor, intern=True)
+    tags = field.List(field.Unicode(intern=True))
+    value = field.Float()
+
+def make_text(text):
+    """
+    Make a new string object equal to ``text``.
+    """
+    return u"".join([text[:1], text[1:]])
+
+class InterningTests(unittest.TestCase):
+    def make_records(self, count):
+        return [{
+            "country": make_text(u"france"),
+            "kind": make_text(u"max"),
+            "label": make_text(u"label"),
+            "unit": Unit(name=make_text(u"meter"), scale=1),
+            "tags": [make_text(u"a"), make_text(u"b")],
+            "value": float(index),
+        } for index in range(count)]
+
+    def test_create_many(self):
+        """
+        Interned traits share one object for equal values across a load.
+        """
+        readings = Reading.create_many(self.make_records(3), chunk_size=2)
+        first = readings[0]
+        for reading in readings[1:]:
+            self.assertTrue(reading.country is first.country)
+            self.assertTrue(reading.kind is first.kind)
+            self.assertTrue(reading.unit is first.unit)
+            self.assertTrue(reading.tags[0] is first.tags[0])
+            self.assertTrue(reading.tags[1] is first.tags[1])
+            self.assertEqual(reading.label, first.label)
+            self.assertFalse(reading.label is first.label)
+
+    def test_loads_use_own_pools(self):
+        """
+        A pool only lives as long as its load.
+        """
+        first = Reading.create_many(self.make_records(1))[0]
+        second = Reading.create_many(self.make_records(1))[0]
+        self.assertFalse(first.country is second.country)
+        self.assertTrue(get_pool() is None)
+
+    def test_mutable_models(self):
+        """
+        Models that aren't frozen are never shared.
+        """
+        records = [{"sensor": Sensor(name=u"a")}, {"sensor": Sensor(name=u"a")}]
+        readings = Reading.create_many(records)
+        self.assertFalse(readings[0].sensor is readings[1].sensor)
+
+    def test_block(self):
+        """
+        A pool can be shared by everything that is created in a block.
+        """
+        with Model.interning() as pool:
+            first = Reading.create({"country": make_text(u"spain")})
+            second = Reading(country=make_text(u"spain"))
+            third = Reading.create_many([{"country": make_text(u"spain")}])[0]
+            fourth = Reading()
+            fourth.country = make_text(u"spain")
+
+        self.assertTrue(second.country is first.country)
+        self.assertTrue(third.country is first.country)
+        self.assertTrue(fourth.country is first.country)
+        self.assertTrue(get_pool() is None)
+
+        stats = pool.stats()
+        self.assertEqual(stats["hits"], 3)
+        self.assertTrue(stats["saved_bytes"] > 0)
+        self.assertTrue(stats["lookups"] >= 4)
+
+    def test_nested_blocks(self):
+        pool = InternPool()
+        with interning(pool):
+            with interning() as inner:
+                self.assertTrue(inner is pool)
+            with interning(InternPool()) as other:
+                self.assertTrue(get_pool() is other)
+            self.assertTrue(get_pool() is pool)
+        self.assertTrue(get_pool() is None)
+
+    def test_stats(self):
+        with interning() as pool:
+            Reading.create_many(self.make_records(10))
+
+        stats = pool.stats()
+        # country, kind, the unit and its two tags
+        self.assertEqual(stats["values"], 5)
+        self.assertEqual(stats["lookups"], 50)
+        self.assertEqual(stats["hits"], 45)
+
+        pool.clear()
+        self.assertEqual(pool.stats()["values"], 0)
+
+    def test_saved_bytes(self):
+        """
+        Values that are already in the pool aren't counted as saved again when
+        the model that holds them is replaced.
+        """
+        pool = InternPool()
+        name = pool.intern(make_text(u"meter"))
+        pool.intern(Unit(name=name))
+        saved = pool.stats()["saved_bytes"]
+        self.assertEqual(saved, 0)
+
+        pool.intern(Unit(name=name))
+        with_name = pool.stats()["saved_bytes"]
+        pool.intern(Unit(name=make_text(u"meter")))
+        self.assertTrue(pool.stats()["saved_bytes"] - with_name > with_name)
+
+    def test_types_kept_apart(self):
+        pool = InternPool()
+        self.assertTrue(type(pool.intern(1.0)) is float)
+        self.assertTrue(type(pool.intern(1)) is int)
+        self.assertTrue(pool.intern(True) is True)
+
+        # including inside of tuples and frozensets
+        self.assertEqual(pool.intern((1, 2)), (1, 2))
+        self.assertEqual([type(element) for element in pool.intern((1.0, 2.0))], [float, float])
+        self.assertTrue(pool.intern((True, (1,)))[0] is True)
+        self.assertTrue(type(pool.intern((1, (1.0,)))[1][0]) is float)
+        self.assertTrue(type(list(pool.intern(frozenset([1.0])))[0]) is float)
+        first = pool.intern(tuple([3, (4.0,)]))
+        self.assertTrue(pool.intern(tuple([3, (4.0,)])) is first)
+
+    def test_unpooled_values(self):
+        """
+        Mutable values are kept as they are.
+        """
+        pool = InternPool()
+        value = [1]
+        self.assertTrue(pool.intern(value) is value)
+        value = (1, [2])
+        self.assertTrue(pool.intern(value) is value)
+        self.assertEqual(pool.stats()["values"], 0)
+
+    def test_validation(self):
+        """
+        Interned traits are still validated.
+        """
+        self.assertRaises(TraitError, Reading.create, {"kind": u"other"})
+        self.assertRaises(TraitError, Reading.create, {"tags": [1]})
+        errors = []
+        Reading.create_many([{"country": 1}], errors=errors)
+        self.assertEqual(len(errors), 1)
+
+if __name__ == "__main__":
+    unittest.main()
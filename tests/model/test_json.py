@@ -0,0 +1,201 @@
+import json
+import unittest
+
+try:
+    from cStringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+from modelo.model.model import Model
+from modelo.model import jsonstream
+from modelo.trait.trait_type import TraitError
+import modelo.trait.trait_types as field
+
+class Part(Model):
+    name = field.Unicode()
+    size = field.Float()
+
+class Machine(Model):
+    name = field.Unicode()
+    count = field.Int()
+    running = field.Bool()
+    main = field.Instance(Part)
+    parts = field.List(field.Instance(Part))
+    grid = field.List(field.List(field.Instance(Part)))
+    labels = field.Set(field.Unicode)
+    extra = field.Dict()
+    secret = field.Unicode(transient=True)
+
+def make_machine(number):
+    return Machine.create({
+        "name": u"machine %d" % number,
+        "count": number,
+        "running": True,
+        "main": Part(name=u"main", size=1.5),
+        "parts": [Part(name=u"a"), Part(name=u"b")],
+        "grid": [[Part(name=u"c")]],
+        "labels": set([u"x"]),
+        "extra": {"nested": {"part": Part(name=u"d")}},
+        "secret": u"hidden",
+    })
+
+def expected(machine):
+    result = machine.to_dict()
+    result["labels"] = list(result["labels"])
+    return result
+
+class DumpJSONTests(unittest.TestCase):
+    def test_dump_json(self):
+        """
+        Model.dump_json writes the same JSON as dumping Model.to_dict.
+        """
+        machine = make_machine(1)
+        output = StringIO()
+        machine.dump_json(output)
+
+        self.assertEqual(json.loads(output.getvalue()), expected(machine))
+        self.assertFalse("secret" in json.loads(output.getvalue()))
+
+    def test_compact(self):
+        machine = make_machine(1)
+        (output, compact_output) = (StringIO(), StringIO())
+        machine.dump_json(output)
+        machine.dump_json(compact_output, compact=True)
+
+        self.assertTrue(" " not in compact_output.getvalue().replace(u"machine 1", u""))
+        self.assertTrue(len(compact_output.getvalue()) < len(output.getvalue()))
+        self.assertEqual(json.loads(compact_output.getvalue()), json.loads(output.getvalue()))
+
+    def test_dump_json_many(self):
+        """
+        Model.dump_json_many writes a JSON array, and takes generators.
+        """
+        machines = [make_machine(number) for number in range(3)]
+
+        for compact in (False, True):
+            output = StringIO()
+            count = Machine.dump_json_many((machine for machine in machines), output, compact=compact)
+
+            self.assertEqual(count, 3)
+            self.assertEqual(json.loads(output.getvalue()), [expected(machine) for machine in machines])
+
+        output = StringIO()
+        self.assertEqual(Machine.dump_json_many([], output), 0)
+        self.assertEqual(json.loads(output.getvalue()), [])
+
+class Reading(Model):
+    name = field.Unicode()
+    value = field.Float()
+    count = field.Int()
+
+class IterJSONTests(unittest.TestCase):
+    def setUp(self):
+        self.records = [{"name": u"r%d \u00e9" % number, "value": number * 1.5, "count": number * 1000}
+                        for number in range(50)]
+
+    def test_iter_json(self):
+        """
+        Model.iter_json yields validated instances of a JSON array.
+        """
+        text = json.dumps(self.records)
+        readings = list(Reading.iter_json(StringIO(text)))
+
+        self.assertEqual([reading.to_dict() for reading in readings], self.records)
+        self.assertTrue(all(isinstance(reading, Reading) for reading in readings))
+
+    def test_chunks(self):
+        """
+        Values can be split between the chunks that are read.
+        """
+        text = json.dumps(self.records, indent=2) + "\n"
+        for read_size in (1, 3, 7, 64):
+            values = list(jsonstream.iter_json(StringIO(text), read_size=read_size))
+            self.assertEqual(values, self.records)
+
+        self.assertEqual(list(jsonstream.iter_json(StringIO("[12345, 678]"), read_size=2)), [12345, 678])
+        self.assertEqual(list(jsonstream.iter_json(StringIO(" [ ] "))), [])
+
+    def test_every_read_size(self):
+        """
+        Numbers, strings and literals are decoded the same wherever the chunks
+        split them.
+        """
+        text = u'[1.5, -20e-3, 12345, "a\\"b", true, null, [0.25, {"k": 1E+2}], 7]'
+        expected = json.loads(text)
+        for read_size in range(1, len(text) + 1):
+            values = list(jsonstream.iter_json(StringIO(text), read_size=read_size))
+            self.assertEqual(values, expected)
+            self.assertEqual([type(value) for value in values], [type(value) for value in expected])
+
+    def test_long_values_are_decoded_once(self):
+        """
+        A value that spans many chunks is decoded once, when its end is read.
+        """
+        expected = [{"numbers": list(range(500)), "text": u'a\\"b]' * 50}, u"\\" * 100, 12345]
+        reader = jsonstream.ArrayReader(StringIO(json.dumps(expected)), read_size=7)
+
+        calls = []
+        raw_decode = reader.decoder.raw_decode
+        def decode(*args):
+            calls.append(args)
+            return raw_decode(*args)
+        reader.decoder.raw_decode = decode
+
+        self.assertEqual(list(reader), expected)
+        self.assertEqual(len(calls), 3)
+
+    def test_invalid_value_stops_reading(self):
+        """
+        A value that can't be decoded raises without reading the rest of the
+        file.
+        """
+        class File(object):
+            def __init__(self):
+                self.reads = 0
+
+            def read(self, size):
+                self.reads += 1
+                if self.reads == 1:
+                    return u'[{"a": 1 2}, '
+                return u'"padding", ' if self.reads < 100 else u""
+
+        fp = File()
+        records = jsonstream.iter_json(fp, read_size=16)
+        self.assertRaises(ValueError, list, records)
+        self.assertEqual(fp.reads, 1)
+
+    def test_round_trip(self):
+        readings = [Reading.create(record) for record in self.records]
+        for compact in (False, True):
+            output = StringIO()
+            Reading.dump_json_many(readings, output, compact=compact)
+            output.seek(0)
+
+            result = list(Reading.iter_json(output))
+            self.assertEqual([reading.to_dict() for reading in result], self.records)
+
+    def test_invalid_json(self):
+        for text in ("", "{}", "[1, 2", "[1 2]", "[1,]", "[1] 2"):
+            with self.assertRaises(ValueError):
+                list(jsonstream.iter_json(StringIO(text)))
+
+    def test_validation(self):
+        """
+        Invalid records raise, unless they are collected in errors.
+        """
+        text = json.dumps([{"count": 1}, {"count": "bad"}, {"count": 3}])
+
+        self.assertRaises(TraitError, list, Reading.iter_json(StringIO(text)))
+
+        errors = []
+        readings = list(Reading.iter_json(StringIO(text), errors=errors))
+        self.assertEqual([reading.count for reading in readings], [1, 3])
+        self.assertEqual(errors[0].index, 1)
+
+    def test_iter_ndjson(self):
+        text = "\n".join([json.dumps(record) for record in self.records]) + "\n\n"
+        readings = list(Reading.iter_ndjson(StringIO(text)))
+        self.assertEqual([reading.to_dict() for reading in readings], self.records)
+
+        with self.assertRaises(ValueError):
+            list(Reading.iter_ndjson(StringIO('{"count": 1}\n{"count":\n')))
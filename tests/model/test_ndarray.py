@@ -0,0 +1,139 @@
+import json
+import unittest
+from array import array
+
+try:
+    from cStringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from modelo.model.model import Model
+from modelo.trait.trait_type import TraitError
+import modelo.trait.trait_types as field
+
+class Series(Model):
+    name = field.Unicode()
+    values = field.NDArray(dtype="float64")
+    points = field.NDArray(dtype="int64", shape=(None, 2))
+    raw = field.NDArray()
+    required = field.NDArray(allow_none=False, default_value=[1, 2])
+
+class LazyImportTests(unittest.TestCase):
+    def test_without_arrays(self):
+        """
+        Models with NDArray traits can be used without numpy as long as the
+        traits don't get arrays.
+        """
+        class Lazy(Model):
+            name = field.Unicode()
+            values = field.NDArray(dtype="float64")
+
+        lazy = Lazy.create({"name": u"a"})
+        self.assertEqual(lazy.values, None)
+        self.assertEqual(lazy.to_dict(), {"name": u"a", "values": None})
+
+@unittest.skipIf(numpy is None, "numpy isn't installed")
+class NDArrayTests(unittest.TestCase):
+    def test_matching_arrays_are_kept(self):
+        values = numpy.arange(5, dtype="float64")
+        series = Series.create({"values": values})
+        self.assertTrue(series.values is values)
+
+    def test_lists_are_converted(self):
+        series = Series.create({"values": [1, 2.5], "points": [[1, 2], [3, 4]]})
+        self.assertEqual(series.values.dtype, numpy.dtype("float64"))
+        self.assertEqual(series.values.tolist(), [1.0, 2.5])
+        self.assertEqual(series.points.shape, (2, 2))
+
+    def test_same_kind_casts(self):
+        """
+        Values are cast to the dtype when no information is lost.
+        """
+        series = Series.create({"values": numpy.arange(3, dtype="int32")})
+        self.assertEqual(series.values.dtype, numpy.dtype("float64"))
+        self.assertRaises(TraitError, Series.create, {"points": numpy.zeros((1, 2), dtype="float64")})
+        self.assertRaises(TraitError, Series.create, {"values": [u"a"]})
+        self.assertRaises(TraitError, Series.create, {"values": [[1], [1, 2]]})
+
+    def test_narrowing_casts(self):
+        """
+        Narrowing casts are only made when the values fit.
+        """
+        class Small(Model):
+            codes = field.NDArray(dtype="int8")
+            ratios = field.NDArray(dtype="float32")
+
+        small = Small.create({"codes": [100, -2], "ratios": numpy.array([0.5, 1e30])})
+        self.assertEqual(small.codes.tolist(), [100, -2])
+        self.assertEqual(small.codes.dtype, numpy.dtype("int8"))
+        self.assertEqual(small.ratios.dtype, numpy.dtype("float32"))
+
+        self.assertRaises(TraitError, Small.create, {"codes": [1000, 2]})
+        self.assertRaises(TraitError, Small.create, {"codes": numpy.array([-129], dtype="int16")})
+        self.assertRaises(TraitError, Small.create, {"ratios": numpy.array([1e300])})
+
+    def test_buffers_are_not_copied(self):
+        """
+        Buffers with the item type of the dtype are wrapped without a copy.
+        """
+        buffer = array("d", [1.0, 2.0])
+        series = Series.create({"values": buffer})
+        buffer[0] = 5.0
+        self.assertEqual(series.values.tolist(), [5.0, 2.0])
+
+        data = bytearray(b"ab")
+        series = Series.create({"raw": data})
+        self.assertEqual(series.raw.dtype, numpy.dtype("uint8"))
+        data[0] = ord(b"c")
+        self.assertEqual(series.raw.tolist(), [ord(b"c"), ord(b"b")])
+
+    def test_shape(self):
+        Series.create({"points": numpy.zeros((10, 2), dtype="int64")})
+        self.assertRaises(TraitError, Series.create, {"points": numpy.zeros((10, 3), dtype="int64")})
+        self.assertRaises(TraitError, Series.create, {"points": numpy.zeros(10, dtype="int64")})
+
+    def test_invalid_values(self):
+        self.assertRaises(TraitError, Series.create, {"values": 1.5})
+        self.assertRaises(TraitError, Series.create, {"values": object()})
+        self.assertRaises(TraitError, Series.create, {"required": None})
+
+    def test_error_message(self):
+        try:
+            Series.create({"points": numpy.zeros((1000, 3), dtype="int64")})
+        except TraitError as error:
+            message = str(error)
+        self.assertTrue("with shape (None, 2)" in message)
+        self.assertTrue("(1000, 3)" in message)
+        self.assertTrue(len(message) < 300)
+
+    def test_default(self):
+        first = Series()
+        second = Series()
+        self.assertEqual(first.required.tolist(), [1, 2])
+        self.assertFalse(first.required is second.required)
+        self.assertEqual(first.values, None)
+
+    def test_to_dict(self):
+        series = Series.create({"values": [1.0, 2.0], "points": [[1, 2]]})
+        result = series.to_dict(include=["values", "points", "raw"])
+        self.assertEqual(result, {"values": [1.0, 2.0], "points": [[1, 2]], "raw": None})
+        self.assertTrue(type(result["values"]) is list)
+
+        fp = StringIO()
+        series.dump_json(fp)
+        self.assertEqual(json.loads(fp.getvalue())["points"], [[1, 2]])
+
+    def test_create_many(self):
+        series = Series.create_many([{"values": [1.0]}, {"values": [1, 2]}])
+        self.assertEqual([each.values.tolist() for each in series], [[1.0], [1.0, 2.0]])
+        errors = []
+        Series.create_many([{"values": [u"a"]}], errors=errors)
+        self.assertEqual(len(errors), 1)
+
+if __name__ == "__main__":
+    unittest.main()
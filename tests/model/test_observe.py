@@ -0,0 +1,146 @@
+import unittest
+
+from modelo.model.model import Model
+from modelo.model.observe import Change
+from modelo.trait.trait_type import TraitError
+import modelo.trait.trait_types as field
+
+class ObserveTests(unittest.TestCase):
+    def setUp(self):
+        class Account(Model):
+            name = field.Unicode()
+            balance = field.Int()
+            tags = field.List(field.Unicode)
+
+        self.account_class = Account
+        self.calls = []
+
+    def handler(self, changes):
+        self.calls.append(changes)
+
+    def test_unobserved(self):
+        """
+        Classes without observers keep the plain __setattr__.
+        """
+        self.assertTrue(self.account_class.__setattr__ is object.__setattr__)
+
+    def test_observe(self):
+        Account = self.account_class
+        account = Account.create({"name": u"a", "balance": 1})
+        Account.observe(self.handler)
+
+        account.balance = 5
+        self.assertEqual(self.calls, [[Change(account, "balance", 1, 5)]])
+
+        # assigning the same value isn't a change
+        account.balance = 5
+        self.assertEqual(len(self.calls), 1)
+
+        # invalid values don't notify
+        with self.assertRaises(TraitError):
+            account.balance = "ten"
+        self.assertEqual(len(self.calls), 1)
+
+        account.update({"name": u"b"})
+        self.assertEqual(self.calls[-1], [Change(account, "name", u"a", u"b")])
+
+        # non-trait attributes don't notify
+        account.other = 1
+        self.assertEqual(len(self.calls), 2)
+
+    def test_create(self):
+        """
+        Values given to create don't notify, and are still validated.
+        """
+        self.account_class.observe(self.handler)
+
+        account = self.account_class.create({"name": u"a", "balance": 3})
+        self.assertEqual(self.calls, [])
+        self.assertEqual(account.balance, 3)
+        self.assertRaises(TraitError, self.account_class.create, {"balance": "x"})
+
+    def test_names(self):
+        Account = self.account_class
+        Account.observe(self.handler, names="balance")
+        account = Account.create()
+
+        account.name = u"x"
+        self.assertEqual(self.calls, [])
+        account.balance = 2
+        self.assertEqual(len(self.calls), 1)
+
+    def test_unobserve(self):
+        Account = self.account_class
+        Account.observe(self.handler)
+        Account.unobserve(self.handler)
+
+        Account.create().balance = 2
+        self.assertEqual(self.calls, [])
+        self.assertTrue(Account.__setattr__ is object.__setattr__)
+        self.assertRaises(ValueError, Account.unobserve, self.handler)
+
+    def test_subclass(self):
+        """
+        Observers of a class also observe its subclasses, once.
+        """
+        Account = self.account_class
+        class Savings(Account):
+            rate = field.Float()
+
+        Account.observe(self.handler)
+        Savings.observe(self.handler, names=["rate"])
+
+        savings = Savings.create()
+        savings.rate = 0.5
+        self.assertEqual(len(self.calls), 2)
+        self.assertEqual(self.calls[0], [Change(savings, "rate", 0.0, 0.5)])
+
+        Account.unobserve(self.handler)
+        savings.rate = 1.0
+        savings.balance = 1
+        self.assertEqual(len(self.calls), 3)
+
+    def test_hold_notifications(self):
+        """
+        Held notifications are delivered once per instance, coalesced.
+        """
+        Account = self.account_class
+        Account.observe(self.handler)
+        (first, second) = (Account.create(), Account.create())
+
+        with Model.hold_notifications():
+            first.balance = 1
+            first.balance = 2
+            first.name = u"x"
+            second.name = u"y"
+            second.name = u""
+            self.assertEqual(self.calls, [])
+
+        self.assertEqual(self.calls, [
+            [Change(first, "balance", 0, 2), Change(first, "name", u"", u"x")],
+        ])
+
+    def test_hold_nested(self):
+        Account = self.account_class
+        Account.observe(self.handler)
+        account = Account.create()
+
+        with Model.hold_notifications():
+            with Model.hold_notifications():
+                account.balance = 1
+            account.balance = 2
+            self.assertEqual(self.calls, [])
+
+        self.assertEqual(self.calls, [[Change(account, "balance", 0, 2)]])
+
+    def test_compact(self):
+        class Point(Model):
+            x = field.Float()
+
+            class Meta:
+                compact = True
+
+        Point.observe(self.handler)
+        point = Point.create({"x": 1.0})
+        point.x = 2.0
+        self.assertEqual(self.calls, [[Change(point, "x", 1.0, 2.0)]])
@@ -0,0 +1,116 @@
+import os
+import subprocess
+import sys
+import unittest
+
+from modelo.model.model import Model
+import modelo.trait.trait_types as field
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+class ModelOptionsTests(unittest.TestCase):
+    def setUp(self):
+        class Base(Model):
+            zebra = field.Integer()
+            apple = field.String()
+            secret = field.String(transient=True)
+
+            def some_method(self):
+                pass
+        self.base_class = Base
+
+        class Child(Base):
+            middle = field.Float()
+            apple = field.Unicode(u"overridden")
+        self.child_class = Child
+
+    def test_declaration_order(self):
+        """
+        Traits should be listed in declaration order.
+        """
+        self.assertEqual(self.base_class._meta.trait_names, ("zebra", "apple", "secret"))
+        self.assertEqual(list(self.base_class.class_traits().keys()), ["zebra", "apple", "secret"])
+
+    def test_inheritance_order(self):
+        """
+        Base class traits come first and overridden traits keep their position.
+        """
+        child = self.child_class
+        self.assertEqual(child._meta.trait_names, ("zebra", "apple", "secret", "middle"))
+        self.assertTrue(child._meta.traits["apple"] is child.__dict__["apple"])
+        self.assertEqual(child().apple, u"overridden")
+
+    def test_trait_classes_order(self):
+        """
+        Traits given as classes come after the instantiated traits, in name
+        order, whatever the hash seed of the process is.
+        """
+        source = ("from modelo.model.model import Model\n"
+                  "import modelo.trait.trait_types as field\n"
+                  "class Row(Model):\n"
+                  "    zebra = field.Int\n"
+                  "    apple = field.Unicode\n"
+                  "    mango = field.Float\n"
+                  "    first = field.Int()\n"
+                  "print(','.join(Row._meta.trait_names))\n")
+        results = set()
+        for seed in ("1", "2", "3"):
+            env = dict(os.environ, PYTHONHASHSEED=seed)
+            env["PYTHONPATH"] = os.pathsep.join(filter(None, [ROOT, env.get("PYTHONPATH")]))
+            output = subprocess.check_output([sys.executable, "-c", source], env=env)
+            results.add(output.decode("ascii").strip())
+        self.assertEqual(results, set(["first,apple,mango,zebra"]))
+
+    def test_shadowed_trait(self):
+        """
+        A non-trait attribute in a subclass hides the inherited trait.
+        """
+        class Shadow(self.base_class):
+            zebra = None
+
+        self.assertEqual(Shadow._meta.trait_names, ("apple", "secret"))
+
+    def test_methods_are_not_traits(self):
+        """
+        Only traits should be in the trait table.
+        """
+        traits = self.base_class().traits()
+        self.assertFalse("some_method" in traits)
+        self.assertFalse("to_dict" in traits)
+
+    def test_transient(self):
+        """
+        Transient traits should not be part of the instance state.
+        """
+        self.assertEqual(self.base_class._meta.state_names, ("zebra", "apple"))
+
+        instance = self.base_class.create({"secret": u"hidden"})
+        self.assertEqual(instance.secret, u"hidden")
+        self.assertFalse("secret" in instance.to_dict())
+
+    def test_trait_added_after_class_creation(self):
+        """
+        Adding a trait to an existing class should update its trait table and
+        the tables of its subclasses.
+        """
+        self.base_class.extra = field.Integer(5)
+
+        self.assertTrue("extra" in self.base_class._meta.traits)
+        self.assertTrue("extra" in self.child_class._meta.traits)
+        self.assertEqual(self.child_class().extra, 5)
+
+        del self.base_class.extra
+        self.assertFalse("extra" in self.child_class._meta.traits)
+
+    def test_dynamic_default(self):
+        """
+        A _<name>_default method should be used as a deferred initializer.
+        """
+        class Dynamic(Model):
+            number = field.Integer()
+
+            def _number_default(self):
+                return 42
+
+        self.assertEqual(Dynamic().number, 42)
+        self.assertEqual(Dynamic.create({"number": 3}).number, 3)
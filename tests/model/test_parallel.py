@@ -0,0 +1,116 @@
+import unittest
+
+from modelo.model.model import Model
+from modelo.model.bulk import RecordError
+from modelo.model import parallel
+import modelo.trait.trait_types as field
+
+#: values validated by CountedInt in this process
+validated = []
+
+class CountedInt(field.Int):
+    def validate(self, obj, value):
+        validated.append(value)
+        return super(CountedInt, self).validate(obj, value)
+
+class Row(Model):
+    name = field.String()
+    number = field.Integer()
+    tags = field.List(field.String)
+    kind = field.Enum([u"a", u"b"], coded=True)
+
+class Flagged(Model):
+    number = field.Integer()
+
+    def __init__(self, **kwargs):
+        super(Flagged, self).__init__(**kwargs)
+        self.initialized = True
+
+class Counted(Model):
+    number = CountedInt()
+
+class CountedFlagged(Flagged):
+    count = CountedInt()
+
+class ParallelTests(unittest.TestCase):
+    def setUp(self):
+        # the records of the tests are sent to the pool in small chunks
+        self.min_chunk_size = parallel.MIN_CHUNK_SIZE
+        parallel.MIN_CHUNK_SIZE = 1
+
+    def tearDown(self):
+        parallel.MIN_CHUNK_SIZE = self.min_chunk_size
+        del validated[:]
+
+    def test_same_as_create_many(self):
+        records = [{"name": u"n%d" % index, "number": index, "tags": [u"x"] * (index % 3),
+                    "kind": u"ab"[index % 2]} for index in range(50)]
+        rows = Row.create_many(records, workers=2, chunk_size=7)
+        self.assertEqual([row.to_dict() for row in rows],
+                         [row.to_dict() for row in Row.create_many(records)])
+        self.assertTrue(all(type(row) is Row for row in rows))
+
+    def test_errors_are_collected(self):
+        records = [{"number": index} for index in range(20)]
+        records[3] = {"number": u"x"}
+        records[11] = "not a record"
+        records[12] = {"name": 5, "tags": [1]}
+        errors = []
+        rows = Row.create_many(records, errors=errors, workers=3, chunk_size=4)
+
+        self.assertEqual(len(rows), 17)
+        self.assertEqual([error.index for error in errors], [3, 11, 12])
+        self.assertTrue(errors[0].record is records[3])
+        self.assertEqual(sorted(errors[2].errors.keys()), ["name", "tags"])
+
+    def test_errors_are_raised(self):
+        records = [{"number": 1}, {"number": u"x"}]
+        self.assertRaises(RecordError, Row.create_many, records, workers=2, chunk_size=1)
+
+    def test_extra_attributes(self):
+        rows = Row.create_many([{"name": u"a", "other": 1}], workers=2)
+        self.assertEqual(rows[0].other, 1)
+
+    def test_custom_init(self):
+        errors = []
+        rows = Flagged.create_many([{"number": 1}, {"number": "x"}, {}], errors=errors, workers=2)
+        self.assertEqual([row.number for row in rows], [1, 0])
+        self.assertTrue(all(row.initialized for row in rows))
+        self.assertEqual(errors[0].index, 1)
+
+    def test_iter_create_many(self):
+        rows = Row.iter_create_many(({"number": index} for index in range(100)),
+                                    chunk_size=10, workers=2)
+        self.assertEqual(next(rows).number, 0)
+        self.assertEqual([row.number for row in rows], list(range(1, 100)))
+
+    def test_not_validated_again(self):
+        """
+        The instances made from the values sent by the workers aren't
+        validated again.
+        """
+        # default values are validated once, for the first instance of a class
+        (Counted(), CountedFlagged())
+        del validated[:]
+
+        rows = Counted.create_many([{"number": index} for index in range(20)], workers=2, chunk_size=5)
+        self.assertEqual([row.number for row in rows], list(range(20)))
+        self.assertEqual(validated, [])
+
+        rows = CountedFlagged.create_many([{"count": index} for index in range(20)], workers=2, chunk_size=5)
+        self.assertEqual([row.count for row in rows], list(range(20)))
+        self.assertTrue(all(row.initialized for row in rows))
+        self.assertEqual(validated, [])
+
+    def test_small_chunks_are_serial(self):
+        parallel.MIN_CHUNK_SIZE = 10
+        rows = Counted.create_many([{"number": index} for index in range(20)], workers=2, chunk_size=5)
+        self.assertEqual(validated, list(range(20)))
+
+        del validated[:]
+        rows = Counted.create_many([{"number": index} for index in range(5)], workers=2, chunk_size=10)
+        self.assertEqual([row.number for row in rows], list(range(5)))
+        self.assertEqual(validated, list(range(5)))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,131 @@
+import unittest
+
+from modelo.model.model import Model
+from modelo.trait.trait_type import TraitError
+import modelo.trait.trait_types as field
+
+class Engine(Model):
+    power = field.Int()
+    fuel = field.Unicode()
+
+class Car(Model):
+    name = field.Unicode()
+    engine = field.Instance(Engine)
+    spare = field.Instance(Engine)
+    engines = field.List(field.Instance(Engine))
+    options = field.Dict()
+    tags = field.List(field.Unicode)
+    secret = field.Unicode(transient=True)
+
+def make_car():
+    return Car.create({
+        "name": u"a",
+        "engine": Engine(power=100, fuel=u"gas"),
+        "engines": [Engine(power=1)],
+        "options": {"color": u"red", "seats": {"front": 2, "back": 3}},
+        "tags": [u"x"],
+    })
+
+class UpdateTests(unittest.TestCase):
+    def test_nested_model(self):
+        """
+        Model.update updates nested models in place.
+        """
+        car = make_car()
+        engine = car.engine
+        car.update({"engine": {"power": 200}})
+
+        self.assertTrue(car.engine is engine)
+        self.assertEqual((engine.power, engine.fuel), (200, u"gas"))
+
+        # models are created where there were none
+        car.update({"spare": {"power": 5}})
+        self.assertEqual(car.spare.power, 5)
+
+        with self.assertRaises(TraitError):
+            car.update({"engine": {"power": "lots"}})
+
+    def test_nested_dict(self):
+        """
+        Dicts are merged recursively, without changing the old dict.
+        """
+        car = make_car()
+        options = car.options
+        car.update({"options": {"seats": {"back": 4}, "roof": True}})
+
+        self.assertEqual(car.options, {"color": u"red", "seats": {"front": 2, "back": 4}, "roof": True})
+        self.assertEqual(options["seats"]["back"], 3)
+
+    def test_list_of_models(self):
+        car = make_car()
+        car.update({"engines": [{"power": 7}, Engine(power=8)]})
+        self.assertEqual([engine.power for engine in car.engines], [7, 8])
+        self.assertTrue(all(isinstance(engine, Engine) for engine in car.engines))
+
+    def test_unknown_keys(self):
+        car = make_car()
+        car.update({"unknown": 1})
+        self.assertFalse(hasattr(car, "unknown"))
+
+    def test_only_patched_traits(self):
+        """
+        Traits that aren't in the patch are never read.
+        """
+        class Counting(field.Unicode):
+            reads = 0
+
+            def __get__(self, obj, cls=None):
+                if obj is not None:
+                    Counting.reads += 1
+                return super(Counting, self).__get__(obj, cls)
+
+        class Wide(Model):
+            watched = Counting()
+            other = field.Int()
+
+        wide = Wide.create()
+        wide.update({"other": 1})
+        self.assertEqual(Counting.reads, 0)
+
+class DiffTests(unittest.TestCase):
+    def test_diff(self):
+        (first, second) = (make_car(), make_car())
+        self.assertEqual(first.diff(second), {})
+
+        second.name = u"b"
+        second.engine.power = 150
+        second.options = {"color": u"blue", "seats": {"front": 2}}
+        second.tags = [u"x", u"y"]
+        second.secret = u"s"
+
+        self.assertEqual(first.diff(second), {
+            "name": u"b",
+            "engine": {"power": 150},
+            "options": {"color": u"blue", "seats": {"back": None}},
+            "tags": [u"x", u"y"],
+        })
+
+    def test_apply_patch(self):
+        """
+        Applying the diff of two models makes them the same.
+        """
+        (first, second) = (make_car(), make_car())
+        second.engine = None
+        second.spare = Engine(power=3)
+        second.engines.append(Engine(power=4))
+        second.options = {"seats": {"front": 1}, "new": [1]}
+
+        patch = first.diff(second)
+        first.apply_patch(patch)
+
+        self.assertEqual(first.diff(second), {})
+        self.assertEqual(first.to_dict(), second.to_dict())
+        self.assertEqual(first.options, {"seats": {"front": 1}, "new": [1]})
+
+    def test_models_compared_by_value(self):
+        (first, second) = (make_car(), make_car())
+        self.assertFalse(first.engines[0] is second.engines[0])
+        self.assertFalse("engines" in first.diff(second))
+
+    def test_different_classes(self):
+        self.assertRaises(TypeError, make_car().diff, Engine())
@@ -0,0 +1,188 @@
+import pickle
+import unittest
+from array import array
+
+try:
+    from pickle import PickleBuffer
+except ImportError:
+    PickleBuffer = None
+
+from modelo.model.model import Model
+import modelo.trait.trait_types as field
+
+class Counting(field.Int):
+    """
+    An Int trait that counts its validations.
+    """
+    calls = 0
+
+    def validate(self, obj, value):
+        Counting.calls += 1
+        return super(Counting, self).validate(obj, value)
+
+class Address(Model):
+    city = field.Unicode()
+
+class Person(Model):
+    name = field.Unicode()
+    age = Counting()
+    photo = field.Bytes()
+    kind = field.Enum([u"admin", u"user"], coded=True)
+    counts = field.IntArray()
+    address = field.Instance(Address)
+    friend = field.This()
+    tags = field.List(field.Unicode)
+    cache = field.Any(transient=True)
+
+class Point(Model):
+    x = field.Float()
+    tags = field.List(field.Unicode)
+
+    class Meta:
+        frozen = True
+
+class CompactPoint(Model):
+    x = field.Float()
+    y = field.Float()
+
+    class Meta:
+        compact = True
+
+class Custom(Model):
+    name = field.Unicode()
+
+    def __init__(self, **kwargs):
+        super(Custom, self).__init__(**kwargs)
+        self.initialized = True
+
+def round_trip(value, protocol=pickle.HIGHEST_PROTOCOL):
+    return pickle.loads(pickle.dumps(value, protocol))
+
+class PickleTests(unittest.TestCase):
+    def make_person(self):
+        return Person.create({
+            "name": u"ann",
+            "age": 30,
+            "photo": b"\x00\x01",
+            "kind": u"user",
+            "counts": [1, 2],
+            "address": Address(city=u"Rome"),
+            "tags": [u"a"],
+        })
+
+    def test_round_trip(self):
+        person = self.make_person()
+        for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+            copy = round_trip(person, protocol)
+            self.assertEqual(copy.to_dict(), person.to_dict())
+            self.assertTrue(isinstance(copy.address, Address))
+            self.assertEqual(copy.kind, u"user")
+            self.assertEqual(copy.counts, array(field.INT_TYPECODE, [1, 2]))
+
+    def test_defaults_and_transient_traits(self):
+        person = Person.create({"cache": object()})
+        copy = round_trip(person)
+        self.assertEqual(copy.to_dict(), Person().to_dict())
+        self.assertEqual(copy.cache, None)
+
+    def test_values_are_not_validated(self):
+        person = self.make_person()
+        Counting.calls = 0
+        round_trip([person] * 3)
+        self.assertEqual(Counting.calls, 0)
+
+    def test_positional_state(self):
+        """
+        The state is a tuple of values, coded enums are pickled as their code.
+        """
+        person = self.make_person()
+        (key, values) = person.__reduce_ex__(2)[2]
+        self.assertEqual(len(values), len(Person._meta.state_names))
+        self.assertEqual(values[Person._meta.state_names.index("kind")], 1)
+        self.assertTrue(type(values[Person._meta.state_names.index("kind")]) is int)
+
+    def test_smaller(self):
+        people = [self.make_person() for index in range(10)]
+        states = [person.__getstate__() for person in people]
+        self.assertTrue(len(pickle.dumps(people, 2)) < len(pickle.dumps(states, 2)))
+
+    def test_shared_references_and_cycles(self):
+        person = self.make_person()
+        person.friend = person
+        other = Person.create({"address": person.address})
+        (copy, other_copy) = round_trip((person, other))
+        self.assertTrue(copy.friend is copy)
+        self.assertTrue(other_copy.address is copy.address)
+
+    def test_other_traits(self):
+        person = self.make_person()
+        (reconstruct, args, (key, values)) = person.__reduce_ex__(2)
+        inst = reconstruct(*args)
+        self.assertRaises(ValueError, inst.__setstate__, (key + 1, values))
+        self.assertRaises(ValueError, inst.__setstate__, (key, values[:-1]))
+
+    def test_frozen(self):
+        point = Point.create({"x": 1.0, "tags": [u"a"]})
+        copy = round_trip(point)
+        self.assertEqual(copy, point)
+        self.assertEqual(hash(copy), hash(point))
+        self.assertEqual(copy.tags, (u"a",))
+
+    def test_compact(self):
+        point = CompactPoint(x=1.0, y=2.0)
+        copy = round_trip(point)
+        self.assertEqual((copy.x, copy.y), (1.0, 2.0))
+
+    def test_fork(self):
+        person = self.make_person()
+        fork = person.fork()
+        copy = round_trip(fork)
+        self.assertEqual(copy.to_dict(), person.to_dict())
+        self.assertFalse(copy.address is person.address)
+
+    def test_custom_init(self):
+        custom = Custom(name=u"a")
+        copy = round_trip(custom)
+        self.assertEqual(copy.name, u"a")
+        self.assertTrue(copy.initialized)
+
+    def test_restore_buffers(self):
+        """
+        Bytes and arrays that come back as buffers, like the out of band
+        buffers of protocol 5, are restored as bytes and arrays.
+        """
+        person = self.make_person()
+        person.photo = b"x" * 10
+        person.counts = array(field.INT_TYPECODE, range(300))
+        (reconstruct, args, (key, values)) = person.__reduce_ex__(2)
+
+        values = list(values)
+        for name in ("photo", "counts"):
+            index = Person._meta.state_names.index(name)
+            data = getattr(person, name)
+            data = data.tostring() if hasattr(data, "tostring") else data
+            values[index] = memoryview(bytearray(data))
+
+        copy = reconstruct(*args)
+        copy.__setstate__((key, tuple(values)))
+        self.assertTrue(type(copy.photo) is bytes)
+        self.assertEqual(copy.photo, person.photo)
+        self.assertTrue(type(copy.counts) is array)
+        self.assertEqual(copy.counts, person.counts)
+
+    @unittest.skipIf(PickleBuffer is None, "pickle protocol 5 isn't available")
+    def test_out_of_band_buffers(self):
+        person = self.make_person()
+        person.photo = b"x" * 4096
+        person.counts = array(field.INT_TYPECODE, range(1000))
+        buffers = []
+        data = pickle.dumps(person, protocol=5, buffer_callback=buffers.append)
+        self.assertEqual(len(buffers), 2)
+        self.assertTrue(len(data) < 1000)
+        copy = pickle.loads(data, buffers=buffers)
+        self.assertEqual(copy.photo, person.photo)
+        self.assertTrue(type(copy.photo) is bytes)
+        self.assertEqual(copy.counts, person.counts)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,262 @@
+import copy
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+
+try:
+    import asyncio
+except ImportError:
+    asyncio = None
+
+from modelo.model.batch import ModelBatch
+from modelo.model.model import Model
+from modelo.model.store import ModelStore
+from modelo.trait.references import (
+    LoadSession,
+    loading,
+)
+from modelo.trait.trait_type import TraitError
+import modelo.trait.trait_types as field
+
+class User(Model):
+    id = field.Int()
+    name = field.Unicode()
+
+class Database(object):
+    """
+    An in-memory loader that records the keys of each call.
+    """
+
+    def __init__(self, count=10):
+        self.users = dict([(index, User(id=index, name=u"user%d" % index)) for index in range(count)])
+        self.calls = []
+
+    def load(self, keys):
+        self.calls.append(list(keys))
+        return dict([(key, self.users[key]) for key in keys if key in self.users])
+
+    def load_list(self, keys):
+        self.calls.append(list(keys))
+        return [self.users.get(key) for key in keys]
+
+    def load_async(self, keys):
+        self.calls.append(list(keys))
+        return asyncio.sleep(0, result=[self.users.get(key) for key in keys])
+
+database = Database()
+
+class Post(Model):
+    title = field.Unicode()
+    author = field.Ref(User, loader=database.load, key=field.Int())
+    editor = field.Ref(User, loader=database.load_list)
+
+class RefTests(unittest.TestCase):
+    def setUp(self):
+        database.calls = []
+        self.records = [{"title": u"p%d" % index, "author": index % 4, "editor": 1}
+                        for index in range(20)]
+
+    def test_batched(self):
+        with loading() as session:
+            posts = Post.create_many(self.records)
+            self.assertEqual(database.calls, [])
+            self.assertEqual([post.author.name for post in posts],
+                             [u"user%d" % (index % 4) for index in range(20)])
+            self.assertEqual([post.editor.id for post in posts], [1] * 20)
+
+        # one call per loader, with each key once
+        self.assertEqual(database.calls, [[0, 1, 2, 3], [1]])
+        self.assertEqual(session.calls, 2)
+        self.assertTrue(posts[0].author is posts[4].author)
+
+    def test_cached_per_session(self):
+        with loading():
+            post = Post.create({"author": 1})
+            self.assertEqual(post.author.id, 1)
+            other = Post.create({"author": 1})
+            self.assertTrue(other.author is post.author)
+        self.assertEqual(database.calls, [[1]])
+
+        with loading():
+            self.assertEqual(post.author.id, 1)
+        self.assertEqual(database.calls, [[1], [1]])
+
+    def test_without_session(self):
+        post = Post.create({"author": 2})
+        self.assertEqual(post.author.name, u"user2")
+        self.assertEqual(post.author.name, u"user2")
+        self.assertEqual(database.calls, [[2], [2]])
+
+    def test_resolve(self):
+        """
+        Instances made without validation are loaded by resolve.
+        """
+        posts = [Post.from_trusted({"author": index, "editor": index + 1}) for index in range(3)]
+        with loading() as session:
+            session.resolve(posts)
+            self.assertEqual(sorted(database.calls), [[0, 1, 2], [1, 2, 3]])
+            self.assertEqual([post.editor.id for post in posts], [1, 2, 3])
+        self.assertEqual(len(database.calls), 2)
+
+    def test_missing(self):
+        with loading():
+            posts = Post.create_many([{"author": 1}, {"author": 100}])
+            self.assertEqual(posts[1].author, None)
+            self.assertEqual(posts[0].author.id, 1)
+        self.assertEqual(database.calls, [[1, 100]])
+
+    def test_keys(self):
+        user = database.users[3]
+        with loading():
+            post = Post.create({"author": user})
+            self.assertTrue(post.author is user)
+        self.assertEqual(database.calls, [])
+        self.assertEqual(Post.author.get_key(post), 3)
+        self.assertEqual(post.to_dict()["author"], 3)
+        self.assertEqual(Post.from_trusted(post.to_dict()).author.id, 3)
+        self.assertEqual(Post.create({}).author, None)
+
+        self.assertRaises(TraitError, Post.create, {"author": u"x"})
+        self.assertRaises(TraitError, Post.create, {"author": Post()})
+
+    def test_no_loader(self):
+        class Draft(Model):
+            author = field.Ref(User)
+
+        draft = Draft.create({"author": 1})
+        self.assertEqual(Draft.author.get_key(draft), 1)
+        self.assertRaises(TraitError, getattr, draft, "author")
+
+    def test_assigned_models(self):
+        """
+        An assigned model is read back without the loader, and its key is
+        dumped.
+        """
+        class Draft(Model):
+            author = field.Ref(User)
+            readers = field.List(field.Ref(User))
+
+        user = database.users[3]
+        post = Post.create({"author": user})
+        self.assertTrue(post.author is user)
+        self.assertTrue(copy.copy(post).author is user)
+        draft = Draft.create({"author": user, "readers": [user]})
+        self.assertTrue(draft.author is user)
+        self.assertEqual(draft.readers, [3])
+        self.assertEqual(database.calls, [])
+
+        self.assertEqual(post.__getstate__()["author"], 3)
+        self.assertEqual(draft.to_dict(), {"author": 3, "readers": [3]})
+        self.assertEqual(Post.author.get_key(pickle.loads(pickle.dumps(post, 2))), 3)
+        self.assertEqual(Post.author.get_key(Post.from_bytes(post.to_bytes())), 3)
+
+    def test_frozen_and_observed(self):
+        """
+        Freezing, comparing and observing instances doesn't load their
+        references.
+        """
+        class Pin(Model):
+            author = field.Ref(User, loader=database.load)
+
+            class Meta:
+                frozen = True
+
+        class Review(Model):
+            author = field.Ref(User, loader=database.load)
+
+        changes = []
+        Review.observe(changes.extend)
+
+        pins = Pin.create_many([{"author": 1}, {"author": 1}, {"author": database.users[2]}])
+        self.assertEqual(pins[0], pins[1])
+        self.assertEqual(pins[2], Pin.create({"author": 2}))
+        self.assertEqual(len(set(pins)), 2)
+
+        review = Review.create({"author": 1})
+        review.author = database.users[2]
+        review.author = 2
+        self.assertEqual([(change.old, change.new) for change in changes], [(1, 2)])
+        self.assertEqual(database.calls, [])
+
+    def test_binary_and_store(self):
+        """
+        References that aren't set are encoded as None.
+        """
+        posts = [Post.create({"title": u"a"}), Post.create({"author": 2, "editor": 3})]
+        self.assertEqual([Post.from_bytes(post.to_bytes()).to_dict() for post in posts],
+                         [post.to_dict() for post in posts])
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, "posts.store")
+        ModelStore.write(path, Post, posts)
+        with ModelStore.open(path, Post) as store:
+            self.assertEqual([post.to_dict() for post in store], [post.to_dict() for post in posts])
+            self.assertEqual(store.column("author"), [None, 2])
+        self.assertEqual(database.calls, [])
+
+    def test_batch(self):
+        posts = [Post.create({"author": index}) for index in range(5)]
+        posts.append(Post.create({"author": database.users[5]}))
+        batch = ModelBatch(Post, posts)
+        self.assertEqual(list(batch["author"]), [0, 1, 2, 3, 4, 5])
+        self.assertEqual(batch.to_dicts()[5]["author"], 5)
+        self.assertEqual(database.calls, [])
+
+    def test_diff_and_patch(self):
+        """
+        References are diffed and patched as their keys, without loading.
+        """
+        first = Post.create({"author": 1, "editor": 1})
+        second = Post.create({"author": database.users[2], "editor": 1})
+        patch = first.diff(second)
+        self.assertEqual(patch, {"author": 2})
+        self.assertEqual(second.diff(Post.create({"author": 2, "editor": 1})), {})
+
+        first.apply_patch(patch)
+        self.assertEqual(first.__getstate__()["author"], 2)
+        self.assertEqual(database.calls, [])
+        self.assertEqual(first.author.id, 2)
+
+        self.assertRaises(TraitError, first.apply_patch, {"author": {"id": 3}})
+        self.assertEqual(Post.author.get_key(first), 2)
+
+    def test_async_loader_needs_resolve_async(self):
+        class Comment(Model):
+            author = field.Ref(User, loader=lambda keys: FakeAwaitable())
+
+        with loading():
+            comment = Comment.create({"author": 1})
+            self.assertRaises(TypeError, getattr, comment, "author")
+
+    @unittest.skipIf(asyncio is None, "asyncio isn't available")
+    def test_resolve_async(self):
+        class Comment(Model):
+            author = field.Ref(User, loader=database.load_async)
+            editor = field.Ref(User, loader=database.load)
+
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self.addCleanup(loop.close)
+
+        comments = Comment.create_many([{"author": index % 3, "editor": 4} for index in range(10)])
+        session = LoadSession()
+        first = session.resolve_async(comments)
+        # the keys that are being loaded aren't loaded twice
+        second = session.resolve_async(comments)
+        loop.run_until_complete(asyncio.gather(first, second))
+
+        with loading(session):
+            self.assertEqual([comment.author.id for comment in comments], [0, 1, 2, 0, 1, 2, 0, 1, 2, 0])
+            self.assertEqual(comments[0].editor.id, 4)
+        self.assertEqual(sorted(database.calls), [[0, 1, 2], [4]])
+        self.assertEqual(session.calls, 2)
+
+class FakeAwaitable(object):
+    def __await__(self):
+        return iter(())
+
+if __name__ == "__main__":
+    unittest.main()
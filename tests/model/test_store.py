@@ -0,0 +1,107 @@
+import os
+import shutil
+import tempfile
+import unittest
+from array import array
+
+from modelo.model.binary import SchemaMismatchError
+from modelo.model.model import Model
+from modelo.model.store import ModelStore
+from modelo.trait.trait_type import TraitError
+import modelo.trait.trait_types as field
+
+class Address(Model):
+    city = field.Unicode()
+
+class Place(Model):
+    name = field.Unicode()
+    code = field.Bytes()
+    population = field.Int()
+    area = field.Float()
+    capital = field.Bool()
+    kind = field.Enum([u"city", u"town"], coded=True)
+    address = field.Instance(Address)
+    tags = field.List(field.Unicode)
+    cache = field.Any(transient=True)
+
+class Other(Model):
+    name = field.Unicode()
+
+def make_places(count):
+    return [Place.create({
+        "name": u"place \xe9%d" % index,
+        "code": b"c%d" % index,
+        "population": index * 1000,
+        "area": index / 2.0,
+        "capital": index % 2 == 0,
+        "kind": u"town" if index % 3 else u"city",
+        "address": Address(city=u"c%d" % index) if index % 2 else None,
+        "tags": [u"t"] * index,
+    }) for index in range(count)]
+
+class ModelStoreTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "places.store")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_rows(self):
+        places = make_places(5)
+        self.assertEqual(ModelStore.write(self.path, Place, places), 5)
+        with ModelStore.open(self.path, Place) as store:
+            self.assertEqual(len(store), 5)
+            self.assertEqual([place.to_dict() for place in store], [place.to_dict() for place in places])
+            self.assertEqual(store[-1].to_dict(), places[4].to_dict())
+            self.assertEqual([place.name for place in store[1:3]], [u"place \xe91", u"place \xe92"])
+            self.assertTrue(isinstance(store[1].address, Address))
+            self.assertEqual(store[2].kind, u"town")
+            self.assertRaises(IndexError, store.__getitem__, 5)
+
+    def test_rows_are_new_instances(self):
+        ModelStore.write(self.path, Place, make_places(2))
+        with ModelStore.open(self.path, Place) as store:
+            first = store[0]
+            first.name = u"changed"
+            self.assertEqual(store[0].name, u"place \xe90")
+
+    def test_columns(self):
+        ModelStore.write(self.path, Place, make_places(4))
+        with ModelStore.open(self.path, Place) as store:
+            population = store.column("population")
+            self.assertTrue(isinstance(population, array))
+            self.assertEqual(list(population), [0, 1000, 2000, 3000])
+            self.assertEqual(list(store["area"]), [0.0, 0.5, 1.0, 1.5])
+            self.assertEqual([bool(value) for value in store["capital"]], [True, False, True, False])
+            self.assertEqual(store["name"][3], u"place \xe93")
+            self.assertEqual(store["code"], [b"c0", b"c1", b"c2", b"c3"])
+            self.assertEqual(store["kind"], [u"city", u"town", u"town", u"city"])
+            self.assertEqual(store["tags"][2], [u"t", u"t"])
+            self.assertRaises(KeyError, store.column, "cache")
+
+    def test_dicts_are_validated(self):
+        ModelStore.write(self.path, Place, [{"name": u"a", "population": 3}])
+        with ModelStore.open(self.path, Place) as store:
+            self.assertEqual(store[0].population, 3)
+        self.assertRaises(TraitError, ModelStore.write, self.path, Place, [{"population": u"x"}])
+
+    def test_empty(self):
+        ModelStore.write(self.path, Place, [])
+        with ModelStore.open(self.path, Place) as store:
+            self.assertEqual(len(store), 0)
+            self.assertEqual(list(store), [])
+            self.assertEqual(list(store["population"]), [])
+            self.assertEqual(store["name"], [])
+
+    def test_schema_mismatch(self):
+        ModelStore.write(self.path, Place, make_places(1))
+        self.assertRaises(SchemaMismatchError, ModelStore.open, self.path, Other)
+
+    def test_not_a_store(self):
+        with open(self.path, "wb") as fp:
+            fp.write(b"not a store file")
+        self.assertRaises(ValueError, ModelStore.open, self.path, Place)
+
+if __name__ == "__main__":
+    unittest.main()
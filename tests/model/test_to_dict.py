@@ -0,0 +1,102 @@
+import unittest
+
+from modelo.model.model import Model
+import modelo.trait.trait_types as field
+
+class Leaf(Model):
+    name = field.Unicode()
+
+class Tree(Model):
+    title = field.Unicode()
+    count = field.Int()
+    leaf = field.Instance(Leaf)
+    parent = field.This()
+    leaves = field.List(field.Instance(Leaf))
+    grid = field.List(field.List(field.Instance(Leaf)))
+    pair = field.Tuple(field.Instance(Leaf), field.Int)
+    bag = field.Set(field.Instance(Leaf))
+    numbers = field.List(field.Int)
+    anything = field.List()
+    mapping = field.Dict()
+    secret = field.Unicode(transient=True)
+
+class ToDictTests(unittest.TestCase):
+    def test_nested(self):
+        """
+        Models are converted however deeply they are nested.
+        """
+        (a, b) = (Leaf(name=u"a"), Leaf(name=u"b"))
+        tree = Tree.create({
+            "title": u"t",
+            "leaf": a,
+            "parent": Tree(title=u"root"),
+            "leaves": [a, None],
+            "grid": [[a], [b, a]],
+            "pair": (b, 2),
+            "bag": set([a]),
+            "anything": [[a], (b,), set([1])],
+            "mapping": {"x": a, "y": {"z": [b]}},
+        })
+        result = tree.to_dict()
+
+        self.assertEqual(result["leaf"], {"name": u"a"})
+        self.assertEqual(result["parent"]["title"], u"root")
+        self.assertEqual(result["parent"]["parent"], None)
+        self.assertEqual(result["leaves"], [{"name": u"a"}, None])
+        self.assertEqual(result["grid"], [[{"name": u"a"}], [{"name": u"b"}, {"name": u"a"}]])
+        self.assertEqual(result["pair"], ({"name": u"b"}, 2))
+        self.assertEqual(result["bag"], [{"name": u"a"}])
+        self.assertEqual(result["anything"], [[{"name": u"a"}], ({"name": u"b"},), set([1])])
+        self.assertEqual(result["mapping"], {"x": {"name": u"a"}, "y": {"z": [{"name": u"b"}]}})
+        self.assertFalse("secret" in result)
+
+    def test_copies(self):
+        """
+        The containers in the result aren't the ones on the instance.
+        """
+        tree = Tree.create({"numbers": [1, 2], "mapping": {"a": 1}})
+        result = tree.to_dict()
+
+        self.assertEqual(result["numbers"], [1, 2])
+        self.assertFalse(result["numbers"] is tree.numbers)
+        self.assertFalse(result["mapping"] is tree.mapping)
+
+    def test_defaults(self):
+        result = Tree.create().to_dict()
+        self.assertEqual(result["count"], 0)
+        self.assertEqual(result["leaves"], [])
+        self.assertEqual(result["leaf"], None)
+
+    def test_include_exclude(self):
+        tree = Tree.create({"title": u"t", "count": 3})
+
+        self.assertEqual(tree.to_dict(include=["title", "count"]), {"title": u"t", "count": 3})
+        self.assertEqual(tree.to_dict(include=["title", "count"], exclude=["count"]), {"title": u"t"})
+
+        result = tree.to_dict(exclude=set(["leaves", "grid"]))
+        self.assertFalse("leaves" in result)
+        self.assertEqual(result["count"], 3)
+
+        # transient traits stay out
+        self.assertEqual(tree.to_dict(include=["secret"]), {})
+
+    def test_subclass(self):
+        """
+        Nested models are dumped with their own traits.
+        """
+        class ColoredLeaf(Leaf):
+            color = field.Unicode()
+
+        tree = Tree.create({"leaves": [ColoredLeaf(name=u"c", color=u"red")]})
+        self.assertEqual(tree.to_dict()["leaves"], [{"name": u"c", "color": u"red"}])
+
+    def test_compact(self):
+        class Point(Model):
+            x = field.Float()
+            tags = field.List(field.Unicode)
+
+            class Meta:
+                compact = True
+
+        self.assertEqual(Point.create({"x": 1.0}).to_dict(), {"x": 1.0, "tags": []})
+        self.assertEqual(Point.create({"x": 1.0}).to_dict(exclude=["tags"]), {"x": 1.0})
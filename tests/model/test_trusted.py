@@ -0,0 +1,84 @@
+import unittest
+
+from modelo.model.model import Model
+from modelo.trait.trait_type import TraitError
+import modelo.trait.trait_types as field
+
+class TrustedTests(unittest.TestCase):
+    def setUp(self):
+        class Item(Model):
+            name = field.Unicode()
+            count = field.Int()
+            tags = field.List(field.Unicode)
+        self.item_class = Item
+
+    def test_from_trusted(self):
+        """
+        Values are stored without validation, and containers aren't copied.
+        """
+        tags = [u"a", u"b"]
+        item = self.item_class.from_trusted({"name": u"x", "count": 2, "tags": tags})
+
+        self.assertTrue(isinstance(item, self.item_class))
+        self.assertEqual(item.name, u"x")
+        self.assertEqual(item.count, 2)
+        self.assertTrue(item.tags is tags)
+        self.assertEqual(item.to_dict(), self.item_class.create(item.to_dict()).to_dict())
+
+    def test_defaults(self):
+        item = self.item_class.from_trusted({"name": u"x"})
+        self.assertEqual(item.count, 0)
+        self.assertEqual(item.tags, [])
+        self.assertEqual(self.item_class.from_trusted().name, u"")
+
+    def test_no_validation(self):
+        item = self.item_class.from_trusted({"count": "not a number"})
+        self.assertEqual(item.count, "not a number")
+
+        # assignment still validates
+        with self.assertRaises(TraitError):
+            item.count = "three"
+
+    def test_extra_keys(self):
+        item = self.item_class.from_trusted({"name": u"x", "other": 1})
+        self.assertEqual(item.other, 1)
+
+    def test_sample(self):
+        """
+        The trusted_sample option validates a fraction of trusted data.
+        """
+        class Checked(self.item_class):
+            class Meta:
+                trusted_sample = 1.0
+
+        self.assertRaises(TraitError, Checked.from_trusted, {"count": "bad"})
+        self.assertEqual(Checked.from_trusted({"count": 3}).count, 3)
+
+        # the option is inherited
+        class SubChecked(Checked):
+            pass
+        self.assertRaises(TraitError, SubChecked.from_trusted, {"count": "bad"})
+
+    def test_custom_set(self):
+        """
+        Traits with a customized __set__ still go through it.
+        """
+        class Upper(field.Unicode):
+            def __set__(self, obj, value):
+                super(Upper, self).__set__(obj, value.upper())
+
+        class Shouting(Model):
+            word = Upper()
+
+        self.assertEqual(Shouting.from_trusted({"word": u"hi"}).word, u"HI")
+
+    def test_compact(self):
+        class Point(Model):
+            x = field.Float()
+            y = field.Float()
+
+            class Meta:
+                compact = True
+
+        point = Point.from_trusted({"x": 1.5})
+        self.assertEqual((point.x, point.y), (1.5, 0.0))
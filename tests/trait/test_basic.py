@@ -1,8 +1,45 @@
 import unittest
 
-from modelo.trait.trait_type import TraitType
+import modelo.trait.trait_types as field
+
+from modelo.trait.trait_type import (
+    TraitType,
+    TraitError,
+)
 
 class BasicTraitTypeTests(unittest.TestCase):
     def test_instantiation(self):
         trait_type = TraitType()
         self.assertIsInstance(trait_type, TraitType)
+
+    def test_validation_hooks(self):
+        """
+        is_valid_for and value_for should be used when there is no validate.
+        """
+        class Positive(TraitType):
+            def is_valid_for(self, value):
+                return value > 0
+
+        class Doubled(TraitType):
+            def value_for(self, value):
+                return value * 2
+
+        self.assertEqual(Positive()._validate(None, 3), 3)
+        self.assertRaises(TraitError, Positive()._validate, None, -3)
+        self.assertEqual(Doubled()._validate(None, 3), 6)
+        self.assertEqual(TraitType()._validate(None, "x"), "x")
+
+    def test_exact_types(self):
+        """
+        exact_types should not apply to subclasses that customize validate.
+        """
+        class Positive(field.Int):
+            def validate(self, obj, value):
+                value = super(Positive, self).validate(obj, value)
+                if value <= 0:
+                    self.error(obj, value)
+                return value
+
+        self.assertEqual(field.Int().get_exact_types(), (int,))
+        self.assertEqual(Positive().get_exact_types(), ())
+        self.assertEqual(field.CInt().get_exact_types(), ())